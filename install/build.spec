@@ -5,8 +5,9 @@ a = Analysis(
     ['wizvod/main.py'],
     pathex=[],
     binaries=[],
-    datas=[('wizvod/gui/assets/app_icon.ico', 'wizvod/gui/assets')],
-    hiddenimports=['fitz'],
+    datas=[('wizvod/gui/assets/app_icon.ico', 'wizvod/gui/assets'),
+           ('wizvod/core/bank_rules/rules.json', 'wizvod/core/bank_rules')],
+    hiddenimports=['fitz', 'wizvod.core.bank_rules.generic'],
     hookspath=[],
     runtime_hooks=[],
     excludes=[],
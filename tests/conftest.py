@@ -0,0 +1,33 @@
+"""
+Zajednička podešavanja testova.
+
+wizvod pri importu pravi ~/.wizvod (baza, logovi, keševi), pa se HOME
+preusmjerava u privremeni folder prije nego što test importuje paket.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+_HOME = tempfile.mkdtemp(prefix="wizvod-tests-")
+os.environ["HOME"] = _HOME
+os.environ["USERPROFILE"] = _HOME
+os.environ.pop("WIZVOD_KEY_B64", None)
+os.environ.pop("WIZVOD_KEY_PASSPHRASE", None)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Prazna baza u privremenom folderu (svaki test dobija svoju), sa tabelama sesija kao u aplikaciji."""
+    from wizvod.core import db as db_module
+    from wizvod.core.sync_sessions import SyncSessionManager
+
+    monkeypatch.setattr(db_module, "DB_PATH", tmp_path / "wizvod.db")
+    database = db_module.Database()
+    SyncSessionManager(database)
+    yield database
+    database.close()
@@ -0,0 +1,246 @@
+"""
+Minimalni asyncio IMAP server za testove AsyncImapClient-a.
+
+Podržava samo ono što klijent koristi (LOGIN, AUTHENTICATE XOAUTH2, SELECT,
+UID SEARCH/FETCH/STORE, CLOSE, LOGOUT). UID FETCH vraća RFC822 ili
+BODYSTRUCTURE sa headerima i BODY.PEEK[n] dijelove, a uz odgovore šalje i
+nepozvane odgovore (FLAGS promjene drugog klijenta, EXISTS) kao pravi serveri.
+"""
+import asyncio
+import base64
+import json
+import re
+import threading
+from contextlib import contextmanager
+from email import message_from_bytes, policy
+from email.message import EmailMessage
+from typing import Dict, List, Optional
+
+_FROM_RE = re.compile(r'FROM "?([^" )]+)"?', re.I)
+_MIN_UID_RE = re.compile(r"\bUID (\d+):\*", re.I)
+_SECTION_RE = re.compile(r"BODY\.PEEK\[([\d.]+)\]", re.I)
+
+GOOD_TOKEN = "ispravan-token"
+
+
+def make_message(uid: int, sender: str, html: bool = False) -> bytes:
+    """Poruka sa PDF prilogom; uz `html` tijelo je multipart/alternative (tekst + HTML) kao iz banke."""
+    msg = EmailMessage()
+    msg["From"] = sender
+    msg["To"] = "knjigovodstvo@example.com"
+    msg["Subject"] = f"Izvod {uid}"
+    msg["Date"] = "Mon, 05 Oct 2026 10:00:00 +0000"
+    msg.set_content("Izvod u prilogu.")
+    if html:
+        msg.add_alternative("<p>Izvod u prilogu.</p>", subtype="html")
+    msg.add_attachment(b"%PDF-1.4 izvod " + str(uid).encode(), maintype="application",
+                       subtype="pdf", filename=f"izvod_{uid}.pdf")
+    return msg.as_bytes()
+
+
+def _quote(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _params(pairs) -> str:
+    pairs = [(k, v) for k, v in pairs if v]
+    if not pairs:
+        return "NIL"
+    return "(" + " ".join(f"{_quote(k.upper())} {_quote(v)}" for k, v in pairs) + ")"
+
+
+def bodystructure(part) -> str:
+    """
+    BODYSTRUCTURE jednog MIME dijela sa proširenim poljima (RFC 3501, 7.4.2).
+
+    Multipart: djeca, podtip, parametri (BOUNDARY), disposition, jezik, lokacija —
+    isti raspored kao kod Gmail-a i Dovecot-a.
+    """
+    if part.is_multipart():
+        children = "".join(bodystructure(p) for p in part.get_payload())
+        return (f"({children} {_quote(part.get_content_subtype().upper())} "
+                f"{_params([('boundary', part.get_boundary())])} NIL NIL NIL)")
+
+    body = part.get_payload().encode("ascii")
+    params = [(k, v) for k, v in part.get_params()[1:]]
+    encoding = (part.get("Content-Transfer-Encoding") or "7bit").upper()
+    fields = (f"{_quote(part.get_content_maintype().upper())} {_quote(part.get_content_subtype().upper())} "
+              f"{_params(params)} NIL NIL {_quote(encoding)} {len(body)}")
+    if part.get_content_maintype() == "text":
+        fields += " %d" % body.count(b"\n")
+    disposition = part.get_content_disposition()
+    if disposition:
+        filename = part.get_param("filename", header="content-disposition")
+        disposition = f"({_quote(disposition.upper())} {_params([('filename', filename)])})"
+    return f"({fields} NIL {disposition or 'NIL'} NIL NIL)"
+
+
+def _section(msg, part_id: str) -> bytes:
+    """Sadržaj dijela `part_id` (npr. "1.2") kako ga vraća BODY[n] — još kodiran."""
+    part = msg
+    for index in part_id.split("."):
+        part = part.get_payload()[int(index) - 1]
+    return part.get_payload().encode("ascii")
+
+
+def _uid_set(spec: str, known: List[int]) -> List[int]:
+    out = []
+    for part in spec.split(","):
+        lo, _, hi = part.partition(":")
+        top = max(known, default=0)
+        lo_v = top if lo == "*" else int(lo)
+        hi_v = top if hi == "*" else int(hi or lo)
+        lo_v, hi_v = min(lo_v, hi_v), max(lo_v, hi_v)
+        out += [u for u in known if lo_v <= u <= hi_v and u not in out]
+    return out
+
+
+class ImapStandIn:
+    """
+    IMAP server na 127.0.0.1 sa slučajnim portom.
+
+    Args:
+        messages: {uid: (pošiljalac, sirova poruka)}
+        sasl_ir: Da li server najavljuje SASL-IR (XOAUTH2 token u prvoj liniji)
+        unsolicited: Da li uz UID FETCH šalje nepozvane FETCH/EXISTS odgovore
+    """
+
+    def __init__(self, messages: Dict[int, tuple], sasl_ir: bool = True, unsolicited: bool = True):
+        self.messages = messages
+        self.sasl_ir = sasl_ir
+        self.unsolicited = unsolicited
+        self.commands: List[str] = []
+        self.fetch_items: List[str] = []  # šta je klijent tražio u svakom UID FETCH
+        self.port: Optional[int] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        def send(line: str):
+            writer.write(line.encode("utf-8") + b"\r\n")
+
+        send("* OK test IMAP4rev1 server spreman")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                tag, _, rest = line.decode("utf-8").rstrip("\r\n").partition(" ")
+                name, _, args = rest.partition(" ")
+                name = name.upper()
+                if name == "UID":
+                    sub, _, args = args.partition(" ")
+                    name = f"UID {sub.upper()}"
+                self.commands.append(name)
+
+                if name == "CAPABILITY":
+                    caps = "IMAP4rev1 AUTH=XOAUTH2" + (" SASL-IR" if self.sasl_ir else "")
+                    send(f"* CAPABILITY {caps}")
+                    send(f"{tag} OK CAPABILITY završen")
+                elif name == "LOGIN":
+                    ok = args.split()[-1].strip('"') == "lozinka"
+                    send(f"{tag} OK LOGIN završen" if ok else f"{tag} NO [AUTHENTICATIONFAILED] pogrešna lozinka")
+                elif name == "AUTHENTICATE":
+                    _, _, initial = args.partition(" ")
+                    if not initial:
+                        send("+ ")
+                        await writer.drain()
+                        initial = (await reader.readline()).decode("ascii").strip()
+                    auth = base64.b64decode(initial).decode("utf-8")
+                    if f"auth=Bearer {GOOD_TOKEN}\1" in auth:
+                        send(f"{tag} OK AUTHENTICATE završen")
+                    else:
+                        error = json.dumps({"status": "401", "schemes": "Bearer"})
+                        send("+ " + base64.b64encode(error.encode()).decode("ascii"))
+                        await writer.drain()
+                        if (await reader.readline()).strip():
+                            send(f"{tag} BAD očekivana prazna linija")
+                        else:
+                            send(f"{tag} NO [AUTHENTICATIONFAILED] Invalid credentials")
+                elif name == "SELECT":
+                    send(f"* {len(self.messages)} EXISTS")
+                    send("* OK [UIDVALIDITY 4242] UIDs valid")
+                    send(f"{tag} OK [READ-WRITE] SELECT završen")
+                elif name == "UID SEARCH":
+                    senders = {s.lower() for s in _FROM_RE.findall(args)}
+                    m = _MIN_UID_RE.search(args)
+                    min_uid = int(m.group(1)) if m else 0
+                    found = [uid for uid, (sender, _) in sorted(self.messages.items())
+                             if uid >= min_uid and (not senders or sender.lower() in senders)]
+                    send("* SEARCH " + " ".join(str(u) for u in found))
+                    send(f"{tag} OK SEARCH završen")
+                elif name == "UID FETCH":
+                    await self._fetch(args, tag, writer, send)
+                elif name == "UID STORE":
+                    for uid in _uid_set(args.split()[0], sorted(self.messages)):
+                        send(f"* {uid} FETCH (UID {uid} FLAGS (\\Seen))")
+                    send(f"{tag} OK STORE završen")
+                elif name == "LOGOUT":
+                    send("* BYE odjava")
+                    send(f"{tag} OK LOGOUT završen")
+                    await writer.drain()
+                    return
+                else:
+                    send(f"{tag} OK {name} završen")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def _fetch(self, args: str, tag: str, writer: asyncio.StreamWriter, send):
+        spec, _, items = args.partition(" ")
+        self.fetch_items.append(items)
+        known = sorted(self.messages)
+        for uid in _uid_set(spec, known):
+            seq = known.index(uid) + 1
+            raw = self.messages[uid][1]
+            if self.unsolicited:
+                # drugi klijent je označio poruku, stigla je nova poruka i promjena za sljedeći UID
+                send(f"* {seq} FETCH (FLAGS (\\Seen))")
+                send(f"* {len(known) + 1} EXISTS")
+                nxt = uid + 1 if uid + 1 in self.messages else uid
+                send(f"* {known.index(nxt) + 1} FETCH (UID {nxt} FLAGS (\\Seen))")
+            msg = message_from_bytes(raw, policy=policy.default)
+            if "BODYSTRUCTURE" in items.upper():
+                header = "".join(f"{k}: {msg[k]}\r\n" for k in ("From", "Subject", "Date")).encode() + b"\r\n"
+                writer.write(f"* {seq} FETCH (UID {uid} BODYSTRUCTURE {bodystructure(msg)} "
+                             f"BODY[HEADER.FIELDS (FROM SUBJECT DATE)] {{{len(header)}}}\r\n".encode()
+                             + header + b")\r\n")
+                continue
+            sections = _SECTION_RE.findall(items)
+            if sections:
+                response = f"* {seq} FETCH (UID {uid}".encode()
+                for part_id in sections:
+                    data = _section(msg, part_id)
+                    response += f" BODY[{part_id}] {{{len(data)}}}\r\n".encode() + data
+                writer.write(response + b")\r\n")
+                continue
+            if uid % 2:
+                writer.write(f"* {seq} FETCH (UID {uid} RFC822 {{{len(raw)}}}\r\n".encode() + raw + b")\r\n")
+            else:
+                # UID posle literala — dozvoljeno, pa se klijent ne smije oslanjati na redoslijed
+                writer.write(f"* {seq} FETCH (RFC822 {{{len(raw)}}}\r\n".encode() + raw + f" UID {uid})\r\n".encode())
+        send(f"{tag} OK FETCH završen")
+
+
+@contextmanager
+def serve_in_thread(server: ImapStandIn):
+    """Pokreće server u zasebnoj niti (za sinhroni imaplib klijent); vraća port."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(server.__aenter__(), loop).result(5)
+    try:
+        yield server.port
+    finally:
+        asyncio.run_coroutine_threadsafe(server.__aexit__(None, None, None), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+        loop.close()
@@ -0,0 +1,130 @@
+"""AsyncImapClient / AsyncEmailFetcher protiv lokalnog IMAP servera (tests/imap_server.py)."""
+import asyncio
+import threading
+from datetime import datetime
+
+import pytest
+
+from imap_server import GOOD_TOKEN, ImapStandIn, make_message
+from wizvod.core import async_email_fetcher
+from wizvod.core.async_email_fetcher import AsyncEmailFetcher, AsyncImapClient, AsyncImapError
+
+SENDERS = {1: "izvodi@banka-a.ba", 2: "izvodi@banka-b.ba", 3: "izvodi@banka-a.ba",
+           4: "newsletter@primjer.ba", 5: "izvodi@banka-b.ba", 6: "izvodi@banka-a.ba"}
+
+
+def _mailbox():
+    return {uid: (sender, make_message(uid, sender)) for uid, sender in SENDERS.items()}
+
+
+def _run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 10))
+
+
+async def _client(server: ImapStandIn) -> AsyncImapClient:
+    client = AsyncImapClient(timeout=5)
+    await client.connect("127.0.0.1", server.port, use_ssl=False)
+    return client
+
+
+def test_login_select_and_search():
+    async def scenario():
+        async with ImapStandIn(_mailbox()) as server:
+            fetcher = AsyncEmailFetcher(timeout=5)
+            fetcher.imap = await _client(server)
+            await fetcher.imap.login("korisnik", "lozinka")
+            await fetcher.select_folder("INBOX")
+            uids = await fetcher._uid_search(["FROM", "izvodi@banka-b.ba"], datetime(2026, 1, 1), False)
+            await fetcher.close()
+            return fetcher.uidvalidity, uids
+
+    uidvalidity, uids = _run(scenario())
+    assert uidvalidity == 4242
+    assert uids == [b"2", b"5"]
+
+
+def test_wrong_password_raises():
+    async def scenario():
+        async with ImapStandIn(_mailbox()) as server:
+            client = await _client(server)
+            with pytest.raises(AsyncImapError):
+                await client.login("korisnik", "pogresna")
+
+    _run(scenario())
+
+
+@pytest.mark.parametrize("fetch_depth", [1, 4])
+def test_fetch_with_unsolicited_responses(fetch_depth):
+    """Nepozvani FETCH/EXISTS odgovori ne smiju zamijeniti niti izgubiti poruke u letu."""
+    async def scenario():
+        async with ImapStandIn(_mailbox()) as server:
+            fetcher = AsyncEmailFetcher(timeout=5, pipeline_depth=fetch_depth)
+            fetcher.imap = await _client(server)
+            await fetcher.imap.login("korisnik", "lozinka")
+            await fetcher.select_folder("INBOX")
+            got = [(sender, msg) async for sender, msg in fetcher.iter_messages(
+                datetime(2026, 1, 1), ["izvodi@banka-a.ba", "izvodi@banka-b.ba"], unread_only=False)]
+            unsolicited = fetcher.imap.untagged
+            await fetcher.close()
+            return got, unsolicited
+
+    got, unsolicited = _run(scenario())
+    by_uid = {int(msg._wiz_uid): (sender, msg) for sender, msg in got}
+    assert sorted(by_uid) == [1, 2, 3, 5, 6]
+    for uid, (sender, msg) in by_uid.items():
+        assert sender == SENDERS[uid]
+        assert msg["Subject"] == f"Izvod {uid}"
+        assert msg._wiz_attachments == [(f"izvod_{uid}.pdf", b"%PDF-1.4 izvod " + str(uid).encode())]
+    assert "EXISTS" in unsolicited and "FETCH" in unsolicited
+
+
+@pytest.mark.parametrize("sasl_ir", [True, False])
+def test_xoauth2_failure_raises_instead_of_hanging(sasl_ir):
+    async def scenario():
+        async with ImapStandIn(_mailbox(), sasl_ir=sasl_ir) as server:
+            client = await _client(server)
+            with pytest.raises(AsyncImapError, match="AUTHENTICATE"):
+                await client.authenticate_xoauth2("user=korisnik\1auth=Bearer istekao\1\1")
+            # konekcija ostaje upotrebljiva nakon odbijene autentifikacije
+            status, _ = await client.command("NOOP")
+            return status
+
+    assert _run(scenario()) == "OK"
+
+
+@pytest.mark.parametrize("sasl_ir", [True, False])
+def test_xoauth2_success(sasl_ir):
+    async def scenario():
+        async with ImapStandIn(_mailbox(), sasl_ir=sasl_ir) as server:
+            client = await _client(server)
+            await client.authenticate_xoauth2(f"user=korisnik\1auth=Bearer {GOOD_TOKEN}\1\1")
+            return server.commands
+
+    assert _run(scenario()).count("AUTHENTICATE") == 1
+
+
+@pytest.mark.parametrize("fetch_mode, worker", [("rfc822", "_parse_message"), ("bodystructure", "_decode_parts")])
+def test_message_decoding_runs_off_the_event_loop(monkeypatch, fetch_mode, worker):
+    threads = []
+    real = getattr(async_email_fetcher, worker)
+
+    def recording(*args):
+        threads.append(threading.get_ident())
+        return real(*args)
+
+    monkeypatch.setattr(async_email_fetcher, worker, recording)
+
+    async def scenario():
+        async with ImapStandIn(_mailbox()) as server:
+            fetcher = AsyncEmailFetcher(fetch_mode=fetch_mode, timeout=5)
+            fetcher.imap = await _client(server)
+            await fetcher.imap.login("korisnik", "lozinka")
+            await fetcher.select_folder("INBOX")
+            got = [item async for item in fetcher.iter_messages(
+                datetime(2026, 1, 1), ["izvodi@banka-a.ba"], unread_only=False)]
+            await fetcher.close()
+            return len(got), threading.get_ident()
+
+    count, loop_thread = _run(scenario())
+    assert count == 3 and len(threads) == 3
+    assert loop_thread not in threads
@@ -0,0 +1,86 @@
+"""Registar obrađenih priloga (attachment_hashes) i verzije pravila/parsera."""
+import sqlite3
+import threading
+from types import SimpleNamespace
+
+from test_extract_stage import _job
+from wizvod.core import db as db_module
+from wizvod.core.pdf_parser import PARSER_VERSION
+from wizvod.worker import _Work, _extract_stage, _rule_versions
+
+SENDER = "izvodi@banka.ba"
+
+
+def _client(db):
+    return db.add_client("Firma", "1990000000000001", "BNK", SENDER, "/tmp/izvodi")
+
+
+def _flush_attachment(db, client_id, *versions):
+    logs = db.log_writer()
+    logs.add_attachment("a" * 64, client_id, "7", "/tmp/izvodi/7.pdf", *versions)
+    logs.flush()
+
+
+def test_versions_round_trip(db):
+    client_id = _client(db)
+    _flush_attachment(db, client_id, "generic", 3, PARSER_VERSION)
+    assert db.load_attachment_hashes() == {
+        "a" * 64: (client_id, "7", "/tmp/izvodi/7.pdf", "generic", 3, PARSER_VERSION)
+    }
+
+
+def test_prune_drops_stale_rule_and_parser_versions(db):
+    client_id = _client(db)
+    logs = db.log_writer()
+    logs.add_attachment("1" * 64, client_id, "1", None, "generic", 1, PARSER_VERSION)
+    logs.add_attachment("2" * 64, client_id, "2", None, "generic", 2, PARSER_VERSION)
+    logs.add_attachment("3" * 64, client_id, "3", None, "generic", 2, PARSER_VERSION - 1)
+    logs.add_attachment("4" * 64, client_id, "4", None)
+    logs.flush()
+
+    assert db.prune_parse_cache({"generic": 2}, PARSER_VERSION) == 3
+    assert set(db.load_attachment_hashes()) == {"2" * 64}
+
+
+def test_existing_table_gets_version_columns(tmp_path, monkeypatch):
+    path = tmp_path / "stara.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE attachment_hashes (
+            sha256 TEXT PRIMARY KEY, client_id INTEGER NOT NULL, statement_number TEXT,
+            file_path TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        INSERT INTO attachment_hashes (sha256, client_id, statement_number) VALUES ('abc', 1, '9');
+    """)
+    conn.close()
+
+    monkeypatch.setattr(db_module, "DB_PATH", path)
+    db = db_module.Database()
+    try:
+        assert db.load_attachment_hashes() == {"abc": (1, "9", None, None, None, None)}
+        # zapis bez verzija je nepoznatog porijekla — ide ponovo kroz parser
+        assert db.prune_parse_cache({}, PARSER_VERSION) == 1
+    finally:
+        db.close()
+
+
+def _extract(hashes):
+    job = _job([("a.pdf", b"isti pdf")])
+    ctx = SimpleNamespace(db_lock=threading.Lock(), attachment_hashes=hashes)
+    return _extract_stage(ctx, _Work(job, 5, "s", SENDER, [], msg=object()))[0]
+
+
+def test_current_hit_skips_parsing():
+    import hashlib
+    sha = hashlib.sha256(b"isti pdf").hexdigest()
+    item = _extract({sha: (1, "7", "/x/7.pdf", *_rule_versions(SENDER))})
+    assert item.status == "skipped" and item.stmt_no == "7"
+
+
+def test_stale_hit_is_parsed_again():
+    import hashlib
+    sha = hashlib.sha256(b"isti pdf").hexdigest()
+    rule, version, parser = _rule_versions(SENDER)
+    for stale in [(rule, version - 1, parser), (rule, version, parser - 1), (None, None, None)]:
+        item = _extract({sha: (1, "7", "/x/7.pdf", *stale)})
+        assert item.status is None and item.content == b"isti pdf"
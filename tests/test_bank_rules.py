@@ -0,0 +1,88 @@
+"""RuleRegistry: izbor pravila po pošiljaocu i ponovno učitavanje fajlova sa pravilima."""
+import json
+import os
+
+import pytest
+
+from wizvod.core import bank_rules
+from wizvod.core.bank_rules import RuleRegistry
+from wizvod.core.bank_rules.declarative import DeclarativeRule
+
+
+def _rule(name, *senders, version=1):
+    return DeclarativeRule({"name": name, "version": version, "senders": list(senders)}, origin="test")
+
+
+def test_exact_address_and_substring():
+    registry = RuleRegistry({}, [_rule("a", "izvodi@banka-a.ba"), _rule("b", "banka-b.ba")])
+    assert registry.resolve("Banka A <IZVODI@banka-a.ba>").name == "a"
+    assert registry.resolve("noreply@izvodi.banka-b.ba").name == "b"
+    assert registry.resolve("info@example.com") is registry.generic
+    assert registry.resolve("") is registry.generic
+
+
+def test_priority_wins_over_position_in_sender():
+    # "izvodi" se u pošiljaocu pojavljuje prije "banka.ba", ali "banka.ba" ima prednost
+    registry = RuleRegistry({}, [_rule("domen", "banka.ba"), _rule("ime", "izvodi")])
+    assert registry.resolve("Izvodi <noreply@banka.ba>").name == "domen"
+    assert registry.resolve("Izvodi <noreply@druga.ba>").name == "ime"
+
+
+def test_priority_matches_linear_scan():
+    rules = [_rule("r1", "bank"), _rule("r2", "izvodi@bank"), _rule("r3", "x@"), _rule("r4", ".ba")]
+    registry = RuleRegistry({}, rules)
+    senders = ["Izvodi <izvodi@bank.ba>", "x@y.ba", "a@b.ba", "ana <x@bank.ba>", "nista@example.com"]
+    for sender in senders:
+        expected = next((r.name for r in rules for key in r.senders if key in sender.lower()), "generic")
+        assert registry.resolve(sender).name == expected, sender
+
+
+def test_first_rule_with_same_name_wins():
+    registry = RuleRegistry({}, [_rule("banka", "korisnik@banka.ba", version=2), _rule("banka", "ugradjeno@banka.ba")])
+    assert registry.rules["banka"].version == 2
+    assert registry.resolve("ugradjeno@banka.ba") is registry.generic
+
+
+@pytest.fixture
+def user_rules(tmp_path, monkeypatch):
+    path = tmp_path / "bank_rules.json"
+    monkeypatch.setattr(bank_rules, "USER_RULES_FILE", path)
+    monkeypatch.setattr(bank_rules, "RELOAD_CHECK_SECONDS", 0.0)
+    monkeypatch.setattr(bank_rules, "_registry", None)
+    monkeypatch.setattr(bank_rules, "_signature", None)
+    monkeypatch.setattr(bank_rules, "_checked_at", 0.0)
+    return path
+
+
+def _write_rules(path, version, mtime):
+    path.write_text(json.dumps({"format": 1, "rules": [
+        {"name": "moja", "version": version, "senders": ["izvodi@moja-banka.ba"],
+         "statement": [{"pattern": "Izvod (\\d+)"}]}
+    ]}), encoding="utf-8")
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_user_rules_reload_on_mtime_change(user_rules):
+    _write_rules(user_rules, 1, 1_000_000_000)
+    assert bank_rules.get_rule_info("izvodi@moja-banka.ba") == ("moja", 1)
+
+    _write_rules(user_rules, 2, 2_000_000_000)
+    assert bank_rules.get_rule_info("izvodi@moja-banka.ba") == ("moja", 2)
+    assert bank_rules.extract_statement_number("izvodi@moja-banka.ba", "Izvod 17") == "17"
+
+
+def test_invalid_user_rules_keep_previous_registry(user_rules):
+    _write_rules(user_rules, 1, 1_000_000_000)
+    registry = bank_rules.get_registry()
+
+    user_rules.write_text("{neispravan json", encoding="utf-8")
+    os.utime(user_rules, ns=(3_000_000_000, 3_000_000_000))
+    assert bank_rules.get_registry() is registry
+    assert bank_rules.get_rule_info("izvodi@moja-banka.ba") == ("moja", 1)
+
+
+def test_registry_matches_frozen_legacy_dispatch():
+    from wizvod.benchmarks import legacy_bank_rules, rule_dispatch
+
+    for sender in rule_dispatch._senders(legacy_bank_rules):
+        assert rule_dispatch._extract(bank_rules, sender) == rule_dispatch._extract(legacy_bank_rules, sender), sender
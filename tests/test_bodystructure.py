@@ -0,0 +1,107 @@
+"""BODYSTRUCTURE režim: pronalaženje PDF dijelova i preuzimanje samo njih (oba IMAP engine-a)."""
+import asyncio
+import base64
+import imaplib
+from datetime import datetime
+
+import pytest
+
+from imap_server import ImapStandIn, make_message, serve_in_thread
+from wizvod.core.async_email_fetcher import AsyncEmailFetcher, AsyncImapClient
+from wizvod.core.email_fetcher import EmailFetcher, _decode_transfer, _find_pdf_parts, _parse_fetch_response
+
+# Gmail: multipart/alternative u multipart/mixed, proširena polja bez jezika/lokacije
+GMAIL = (b'12 (UID 4021 BODYSTRUCTURE ((("TEXT" "PLAIN" ("CHARSET" "UTF-8") NIL NIL "QUOTED-PRINTABLE" 312 10 '
+         b'NIL NIL NIL)("TEXT" "HTML" ("CHARSET" "UTF-8") NIL NIL "QUOTED-PRINTABLE" 1410 30 NIL NIL NIL) '
+         b'"ALTERNATIVE" ("BOUNDARY" "000000000000a1b2") NIL NIL)("APPLICATION" "PDF" ("NAME" "izvod 12.pdf") '
+         b'"<f_lx1>" NIL "BASE64" 53124 NIL ("ATTACHMENT" ("FILENAME" "izvod 12.pdf")) NIL) "MIXED" '
+         b'("BOUNDARY" "000000000000c3d4") NIL NIL))')
+
+# Dovecot: mala slova, RFC 2231 ime fajla, sva proširena polja (disposition, jezik, lokacija)
+DOVECOT = (b'3 (UID 77 BODYSTRUCTURE (("text" "plain" ("charset" "utf-8") NIL NIL "7bit" 20 2 NIL NIL NIL NIL)'
+           b'("image" "png" ("name" "logo.png") NIL NIL "base64" 900 NIL ("inline" ("filename" "logo.png")) NIL NIL)'
+           b'("application" "octet-stream" ("name" "=?UTF-8?Q?izvod_=C5=A1.pdf?=") NIL NIL "base64" 1000 NIL '
+           b'("attachment" ("filename*" "UTF-8\'\'izvod%20%C5%A1.pdf")) NIL NIL) "mixed" ("boundary" "b1") NIL NIL NIL))')
+
+# Samo PDF kao tijelo poruke (nije multipart)
+SINGLE = (b'5 (UID 9 BODYSTRUCTURE ("APPLICATION" "PDF" ("NAME" "izvod.pdf") NIL NIL "BASE64" 4000 NIL '
+          b'("ATTACHMENT" ("FILENAME" "izvod.pdf")) NIL NIL))')
+
+
+def _structure(response):
+    return _parse_fetch_response([response])[0]["BODYSTRUCTURE"]
+
+
+@pytest.mark.parametrize("response, expected", [
+    (GMAIL, [("2", "izvod 12.pdf", "base64")]),
+    (DOVECOT, [("3", "izvod š.pdf", "base64")]),
+    (SINGLE, [("1", "izvod.pdf", "base64")]),
+])
+def test_pdf_parts_with_extension_data(response, expected):
+    assert _find_pdf_parts(_structure(response)) == expected
+
+
+def test_pdf_inside_nested_multipart():
+    response = (b'1 (UID 1 BODYSTRUCTURE ((("TEXT" "PLAIN" ("CHARSET" "UTF-8") NIL NIL "7BIT" 5 1 NIL NIL NIL)'
+                b'("APPLICATION" "PDF" NIL NIL NIL "BASE64" 10 NIL ("ATTACHMENT" ("FILENAME" "a.pdf")) NIL NIL) '
+                b'"MIXED" ("BOUNDARY" "in") NIL NIL NIL)("APPLICATION" "PDF" NIL NIL NIL "BASE64" 10 NIL '
+                b'("ATTACHMENT" ("FILENAME" "b.pdf")) NIL NIL) "MIXED" ("BOUNDARY" "out") NIL NIL NIL))')
+    assert _find_pdf_parts(_structure(response)) == [("1.2", "a.pdf", "base64"), ("2", "b.pdf", "base64")]
+
+
+def test_decode_fetched_part():
+    pdf = b"%PDF-1.4 " + bytes(range(256)) * 40
+    wrapped = base64.encodebytes(pdf).replace(b"\n", b"\r\n")
+    assert _decode_transfer(wrapped, "base64") == pdf
+    assert _decode_transfer(wrapped.rstrip().rstrip(b"="), "base64") == pdf  # odsječeni '='
+    assert _decode_transfer(b"Izvod=20broj=3D7", "quoted-printable") == b"Izvod broj=7"
+
+
+SENDERS = {1: "izvodi@banka-a.ba", 2: "izvodi@banka-b.ba", 3: "izvodi@banka-a.ba", 4: "newsletter@primjer.ba"}
+
+
+def _mailbox():
+    return {uid: (sender, make_message(uid, sender, html=uid % 2 == 1)) for uid, sender in SENDERS.items()}
+
+
+def _check(got, server):
+    by_uid = {int(msg._wiz_uid): (sender, msg) for sender, msg in got}
+    assert len(got) == 3 and sorted(by_uid) == [1, 2, 3]
+    for uid, (sender, msg) in by_uid.items():
+        assert sender == SENDERS[uid]
+        assert msg["Subject"] == f"Izvod {uid}"
+        assert msg._wiz_attachments == [(f"izvod_{uid}.pdf", b"%PDF-1.4 izvod " + str(uid).encode())]
+    # jedan BODYSTRUCTURE FETCH + jedan BODY.PEEK po poruci — bez preuzimanja cijele poruke
+    assert len(server.fetch_items) == 1 + 3
+    assert not any("RFC822" in items.upper() for items in server.fetch_items)
+
+
+def test_sync_engine_fetches_only_pdf_parts():
+    server = ImapStandIn(_mailbox())
+    with serve_in_thread(server) as port:
+        fetcher = EmailFetcher(fetch_mode="bodystructure")
+        fetcher.imap = imaplib.IMAP4("127.0.0.1", port, timeout=5)
+        try:
+            fetcher.imap.login("korisnik", "lozinka")
+            fetcher.select_folder("INBOX")
+            got = list(fetcher.iter_messages(datetime(2026, 1, 1), ["izvodi@banka-a.ba", "izvodi@banka-b.ba"],
+                                             unread_only=False))
+        finally:
+            fetcher.imap.logout()
+    _check(got, server)
+
+
+def test_async_engine_fetches_only_pdf_parts():
+    async def scenario():
+        async with ImapStandIn(_mailbox()) as server:
+            fetcher = AsyncEmailFetcher(fetch_mode="bodystructure", timeout=5, pipeline_depth=2)
+            fetcher.imap = AsyncImapClient(timeout=5)
+            await fetcher.imap.connect("127.0.0.1", server.port, use_ssl=False)
+            await fetcher.imap.login("korisnik", "lozinka")
+            await fetcher.select_folder("INBOX")
+            got = [item async for item in fetcher.iter_messages(
+                datetime(2026, 1, 1), ["izvodi@banka-a.ba", "izvodi@banka-b.ba"], unread_only=False)]
+            await fetcher.close()
+            return got, server
+
+    _check(*asyncio.run(asyncio.wait_for(scenario(), 10)))
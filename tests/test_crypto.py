@@ -0,0 +1,88 @@
+"""Ključ iz passphrase-a: bez keša u čistom tekstu, DPAPI keš samo na Windows-u."""
+import base64
+
+import pytest
+
+from wizvod.core import crypto
+
+
+@pytest.fixture
+def key_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(crypto, "KEY_CACHE_FILE", tmp_path / "kdf_key.dpapi")
+    monkeypatch.setattr(crypto, "_LEGACY_KEY_CACHE_FILE", tmp_path / "kdf_key.json")
+    monkeypatch.setenv("WIZVOD_KEY_PASSPHRASE", "tajna fraza")
+    monkeypatch.delenv("WIZVOD_KEY_B64", raising=False)
+    monkeypatch.delenv("WIZVOD_KEY_CACHE", raising=False)
+    derived = []
+    real_derive = crypto._derive_key_from_passphrase
+
+    def derive(passphrase):
+        derived.append(passphrase)
+        return real_derive(passphrase)
+
+    monkeypatch.setattr(crypto, "_derive_key_from_passphrase", derive)
+    return tmp_path, derived
+
+
+class _FakeDpapi:
+    """DPAPI zamjena: blob se otvara samo uz istu entropiju (kao CryptUnprotectData)."""
+
+    def __init__(self):
+        self.blobs = {}
+
+    def __call__(self, data, entropy, protect):
+        if protect:
+            blob = b"blob-%d" % len(self.blobs)
+            self.blobs[blob] = (entropy, data)
+            return blob
+        stored = self.blobs.get(data)
+        return stored[1] if stored and stored[0] == entropy else None
+
+
+def test_without_dpapi_key_stays_in_memory(key_files, monkeypatch):
+    tmp_path, derived = key_files
+    monkeypatch.setattr(crypto, "_DPAPI", False)
+    legacy = tmp_path / "kdf_key.json"
+    legacy.write_text('{"id": "x", "key": "y"}', encoding="utf-8")
+
+    key = crypto._load_fernet_key()
+    assert len(base64.urlsafe_b64decode(key)) == 32
+    assert derived == ["tajna fraza"]
+    assert list(tmp_path.iterdir()) == []  # stari keš obrisan, novi se ne pravi
+
+
+def test_dpapi_cache_is_reused_and_tied_to_passphrase(key_files, monkeypatch):
+    tmp_path, derived = key_files
+    monkeypatch.setattr(crypto, "_DPAPI", True)
+    monkeypatch.setattr(crypto, "_dpapi", _FakeDpapi())
+
+    first = crypto._load_fernet_key()
+    assert crypto._load_fernet_key() == first
+    assert derived == ["tajna fraza"]
+    assert first not in (tmp_path / "kdf_key.dpapi").read_bytes()
+
+    monkeypatch.setenv("WIZVOD_KEY_PASSPHRASE", "nova fraza")
+    second = crypto._load_fernet_key()
+    assert second != first
+    assert derived == ["tajna fraza", "nova fraza"]
+
+
+def test_dpapi_cache_can_be_disabled(key_files, monkeypatch):
+    tmp_path, derived = key_files
+    monkeypatch.setattr(crypto, "_DPAPI", True)
+    monkeypatch.setattr(crypto, "_dpapi", _FakeDpapi())
+    monkeypatch.setenv("WIZVOD_KEY_CACHE", "0")
+
+    crypto._load_fernet_key()
+    crypto._load_fernet_key()
+    assert len(derived) == 2
+    assert not (tmp_path / "kdf_key.dpapi").exists()
+
+
+def test_round_trip_with_passphrase(key_files, monkeypatch):
+    monkeypatch.setattr(crypto, "_DPAPI", False)
+    monkeypatch.setattr(crypto, "_FERNET_LOADED", False)
+    monkeypatch.setattr(crypto, "_FERNET", None)
+    cipher = crypto.encrypt_secret("lozinka")
+    assert cipher != b"lozinka"
+    assert crypto.decrypt_secret(cipher) == "lozinka"
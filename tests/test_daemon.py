@@ -0,0 +1,138 @@
+"""run_daemon: ciklusi po intervalu, zaustavljanje, push buđenje i zamjena resursa."""
+import threading
+
+import pytest
+
+from wizvod import worker
+from wizvod.core.config_manager import AppConfig
+
+
+class _Resources(worker._WorkerResources):
+    created = []
+
+    def __init__(self, settings, persistent=False):
+        super().__init__(settings, persistent)
+        self.closed = False
+        _Resources.created.append(self)
+
+    def close(self):
+        self.closed = True
+        super().close()
+
+
+class _Watchers:
+    """Zamjena za _PushWatchers: test sam javlja naloge sa novom poštom."""
+
+    def __init__(self, wake):
+        self.wake = wake
+        self.changed = set()
+        self.synced = []
+        self.closed = False
+
+    def notify(self, account_id):
+        self.changed.add(account_id)
+        self.wake.set()
+
+    def take_changed(self):
+        changed, self.changed = self.changed, set()
+        return changed
+
+    def sync(self, accounts):
+        self.synced.append(accounts)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def daemon(db, monkeypatch):
+    """Pokreće run_daemon u niti; _run_cycle samo bilježi pozive (i poziva on_cycle)."""
+    _Resources.created = []
+    cycles, watchers = [], []
+    state = {"on_cycle": lambda n: None, "closed": False}
+    stop, cycle_done = threading.Event(), threading.Semaphore(0)
+
+    def run_cycle(db_, settings, resources, only_accounts=None):
+        cycles.append((resources, only_accounts))
+        state["on_cycle"](len(cycles))
+        cycle_done.release()
+
+    def watchers_factory(wake):
+        watchers.append(_Watchers(wake))
+        return watchers[-1]
+
+    original_close = db.close
+
+    def close():
+        state["closed"] = True
+        original_close()
+
+    monkeypatch.setattr(db, "close", close)
+    monkeypatch.setattr(worker, "_startup", lambda mode: (db, AppConfig(db), None))
+    monkeypatch.setattr(worker, "_check_license", lambda lic: True)
+    monkeypatch.setattr(worker, "_run_cycle", run_cycle)
+    monkeypatch.setattr(worker, "_WorkerResources", _Resources)
+    monkeypatch.setattr(worker, "_PushWatchers", watchers_factory)
+
+    def start(interval, push=False, on_cycle=None):
+        if on_cycle:
+            state["on_cycle"] = on_cycle
+        thread = threading.Thread(target=worker.run_daemon,
+                                  kwargs={"interval": interval, "stop": stop, "push": push}, daemon=True)
+        thread.start()
+        return thread
+
+    def wait_cycle():
+        assert cycle_done.acquire(timeout=5), "ciklus nije pokrenut"
+
+    daemon = type("Daemon", (), {})()
+    daemon.start, daemon.wait_cycle, daemon.stop = start, wait_cycle, stop
+    daemon.cycles, daemon.watchers, daemon.state = cycles, watchers, state
+    yield daemon
+    stop.set()
+
+
+def test_cycles_repeat_until_stopped(daemon):
+    thread = daemon.start(interval=0.05, on_cycle=lambda n: n == 3 and daemon.stop.set())
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert len(daemon.cycles) == 3
+    assert all(only is None for _, only in daemon.cycles)  # puni ciklusi
+    resources = _Resources.created
+    assert len(resources) == 1 and all(r is resources[0] for r, _ in daemon.cycles)  # resursi žive između ciklusa
+    assert resources[0].closed and daemon.state["closed"]
+
+
+def test_stop_interrupts_wait_between_cycles(daemon):
+    thread = daemon.start(interval=3600)
+    daemon.wait_cycle()
+    daemon.stop.set()
+    thread.join(5)
+
+    assert not thread.is_alive() and len(daemon.cycles) == 1
+    assert _Resources.created[0].closed and daemon.state["closed"]
+
+
+def test_push_wake_runs_cycle_for_changed_accounts(daemon):
+    thread = daemon.start(interval=3600, push=True)
+    daemon.wait_cycle()
+    daemon.watchers[0].notify(7)
+    daemon.wait_cycle()
+    daemon.stop.set()
+    thread.join(5)
+
+    assert [only for _, only in daemon.cycles] == [None, {7}]
+    assert len(daemon.watchers[0].synced) == 2  # nalozi se usklađuju prije svakog ciklusa
+    assert daemon.watchers[0].closed
+
+
+def test_changed_settings_rebuild_resources(daemon, db):
+    thread = daemon.start(interval=0.05, on_cycle=lambda n: (
+        db.set_setting("pdf_text_mode", "full") if n == 1 else n == 3 and daemon.stop.set()))
+    thread.join(5)
+
+    first, second = _Resources.created
+    assert first.closed and second.closed
+    assert [r for r, _ in daemon.cycles] == [first, second, second]
+    assert second.parse_pool.text_mode == "full"
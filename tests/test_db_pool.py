@@ -0,0 +1,149 @@
+"""ConnectionPool: group commit, izolacija poslova (SAVEPOINT) i zatvaranje."""
+import sqlite3
+import threading
+
+import pytest
+
+from wizvod import worker
+from wizvod.core import db as db_module
+from wizvod.core.db import ConnectionPool
+
+
+def _setup(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS t (v INTEGER UNIQUE)")
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(tmp_path / "pool.db", setup=_setup)
+    yield pool
+    pool.close()
+
+
+def _values(pool):
+    return sorted(r[0] for r in pool.reader().execute("SELECT v FROM t"))
+
+
+def _insert(v):
+    return lambda conn: conn.execute("INSERT INTO t (v) VALUES (?)", (v,)).lastrowid
+
+
+def test_queued_jobs_share_one_commit(pool):
+    gate, started = threading.Event(), threading.Event()
+
+    def blocker(conn):
+        started.set()
+        gate.wait(5)
+
+    first = threading.Thread(target=pool.write, args=(blocker,))
+    first.start()
+    started.wait(5)
+    writers = [threading.Thread(target=pool.write, args=(_insert(i),)) for i in range(50)]
+    for t in writers:
+        t.start()
+    while pool._queue.qsize() < 50:
+        threading.Event().wait(0.01)
+    groups = pool.groups
+    gate.set()
+    for t in [first] + writers:
+        t.join(5)
+
+    assert _values(pool) == list(range(50))
+    assert pool.groups - groups == 2  # posao koji je blokirao + svih 50 iz reda
+
+
+def test_failing_job_does_not_undo_others_in_group(pool):
+    gate, started = threading.Event(), threading.Event()
+    errors = []
+
+    def blocker(conn):
+        started.set()
+        gate.wait(5)
+
+    def partial_then_fail(conn):
+        conn.execute("INSERT INTO t (v) VALUES (100)")
+        conn.execute("INSERT INTO t (v) VALUES (1)")  # UNIQUE — posao pada poslije prvog upisa
+
+    def run(fn):
+        try:
+            pool.write(fn)
+        except sqlite3.IntegrityError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(fn,))
+               for fn in (blocker, _insert(1), partial_then_fail, _insert(2))]
+    threads[0].start()
+    started.wait(5)
+    for t in threads[1:]:
+        t.start()
+        while pool._queue.qsize() < threads.index(t):
+            threading.Event().wait(0.01)  # redoslijed u redu kao u listi
+    gate.set()
+    for t in threads:
+        t.join(5)
+
+    assert len(errors) == 1
+    assert _values(pool) == [1, 2]  # upis 100 iz palog posla je poništen
+
+
+def test_reader_is_read_only(pool):
+    with pytest.raises(sqlite3.OperationalError):
+        pool.reader().execute("INSERT INTO t (v) VALUES (1)")
+
+
+def test_nested_write_runs_in_callers_transaction(pool):
+    def outer(conn):
+        conn.execute("INSERT INTO t (v) VALUES (1)")
+        return pool.write(_insert(2))
+
+    pool.write(outer)
+    assert _values(pool) == [1, 2]
+
+
+def test_plain_job_runs_outside_transaction(pool):
+    pool.write(lambda conn: conn.execute("VACUUM"), transaction=False)
+
+
+def test_write_after_close_raises(pool):
+    pool.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        pool.write(_insert(1))
+
+
+def test_writes_racing_close_never_hang(tmp_path):
+    for round_no in range(20):
+        pool = ConnectionPool(tmp_path / f"race{round_no}.db", setup=_setup)
+        outcomes = []
+
+        def writer(v):
+            try:
+                pool.write(_insert(v))
+                outcomes.append("ok")
+            except sqlite3.ProgrammingError:
+                outcomes.append("closed")
+
+        threads = [threading.Thread(target=writer, args=(i,), daemon=True) for i in range(20)]
+        for t in threads:
+            t.start()
+        pool.close()
+        for t in threads:
+            t.join(5)
+        assert not any(t.is_alive() for t in threads)
+        assert len(outcomes) == 20
+
+
+def test_run_worker_closes_only_its_own_database(db, monkeypatch):
+    monkeypatch.setattr(worker, "_check_license", lambda lic: False)
+    worker.run_worker(db)
+    assert db.list_mail_accounts() == []  # baza pozivaoca ostaje otvorena
+
+    opened = []
+
+    class _Database(db_module.Database):
+        def __init__(self):
+            super().__init__()
+            opened.append(self)
+
+    monkeypatch.setattr(worker, "Database", _Database)
+    worker.run_worker()
+    assert len(opened) == 1 and opened[0].pool._closed
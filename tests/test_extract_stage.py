@@ -0,0 +1,66 @@
+"""Brojač stavki naloga (_AccountJob) kad se poruka razbija na priloge."""
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from wizvod.worker import _AccountJob, _Work, _extract_stage
+
+
+class _Fetcher:
+    def __init__(self, attachments):
+        self.attachments = attachments
+
+    def extract_attachments(self, msg):
+        return list(self.attachments)
+
+
+class _FailingHashes(dict):
+    """Registar koji pukne na drugom prilogu."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def get(self, key, default=None):
+        self.calls += 1
+        if self.calls == 2:
+            raise RuntimeError("registar nedostupan")
+        return default
+
+
+def _job(attachments):
+    job = _AccountJob({"id": 1}, _Fetcher(attachments))
+    job.track(5)
+    return job
+
+
+def _pending(job):
+    return job._pending
+
+
+def test_expand_counts_every_attachment():
+    job = _job([("a.pdf", b"1"), ("b.pdf", b"2"), ("c.pdf", b"3")])
+    ctx = SimpleNamespace(db_lock=threading.Lock(), attachment_hashes={})
+    items = _extract_stage(ctx, _Work(job, 5, "s", "x@y", [], msg=object()))
+    assert len(items) == 3 and _pending(job) == 3
+    for item in items:
+        job.release(item.uid, "ok")
+    assert _pending(job) == 0
+
+
+def test_failure_mid_message_does_not_leak_pending():
+    job = _job([("a.pdf", b"1"), ("b.pdf", b"2"), ("c.pdf", b"3")])
+    ctx = SimpleNamespace(db_lock=threading.Lock(), attachment_hashes=_FailingHashes())
+    with pytest.raises(RuntimeError):
+        _extract_stage(ctx, _Work(job, 5, "s", "x@y", [], msg=object()))
+    assert _pending(job) == 1
+
+    # on_error šalje samu poruku u log fazu, koja je oslobađa jednom
+    job.release(5, "error")
+    abort = threading.Event()
+    waiter = threading.Thread(target=job.wait, args=(abort,))
+    waiter.start()
+    waiter.join(timeout=2)
+    assert not waiter.is_alive()
+    assert job.failed_uids == {5}
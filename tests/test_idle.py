@@ -0,0 +1,112 @@
+"""IMAP IDLE (EmailFetcher.wait_for_new_mail) preko para socketa umjesto servera."""
+import imaplib
+import socket
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from wizvod.core.email_fetcher import EmailFetcher
+
+
+def _fetcher():
+    client, server = socket.socketpair()
+    client.settimeout(5)
+    server.settimeout(5)
+    fetcher = EmailFetcher()
+    fetcher.imap = SimpleNamespace(sock=client, send=client.sendall, capabilities=("IMAP4REV1", "IDLE"))
+    return fetcher, server
+
+
+def _serve(server, *, before=b"", after=b"", on_done=b"", reply=b"+ idling\r\n"):
+    """Odgovara na IDLE, šalje `after` i završava IDLE na DONE; vraća primljene komande."""
+    received = []
+
+    def run():
+        buf = b""
+        while b"\r\n" not in buf:
+            buf += server.recv(1024)
+        tag = buf.split(b" ", 1)[0]
+        received.append(buf)
+        server.sendall(before + reply)
+        if not reply.startswith(b"+"):
+            return
+        server.sendall(after)
+        buf = b""
+        while b"DONE\r\n" not in buf:
+            buf += server.recv(1024)
+        received.append(buf)
+        server.sendall(on_done + tag + b" OK IDLE terminated\r\n")
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread, received
+
+
+def test_exists_during_idle_returns_true():
+    fetcher, server = _fetcher()
+    thread, received = _serve(server, after=b"* 3 FETCH (FLAGS (\\Seen))\r\n* 6 EXISTS\r\n",
+                              on_done=b"* 7 EXISTS\r\n")
+    assert fetcher.wait_for_new_mail(timeout=5) is True
+    thread.join(2)
+    assert received[0].endswith(b" IDLE\r\n") and received[1] == b"DONE\r\n"
+    assert fetcher.exists == 7  # EXISTS stigao i prije tagovanog odgovora na DONE
+
+
+def test_exists_before_continuation_is_not_lost():
+    fetcher, server = _fetcher()
+    thread, _ = _serve(server, before=b"* 4 EXISTS\r\n")
+    assert fetcher.wait_for_new_mail(timeout=5) is True
+    thread.join(2)
+
+
+def test_timeout_without_mail_and_reuse_of_connection():
+    fetcher, server = _fetcher()
+    tags = []
+    for _ in range(2):
+        thread, received = _serve(server)
+        start = time.monotonic()
+        assert fetcher.wait_for_new_mail(timeout=0.3) is False
+        assert time.monotonic() - start < 3
+        thread.join(2)
+        assert received[1] == b"DONE\r\n"
+        tags.append(received[0].split(b" ", 1)[0])
+    assert tags[0] != tags[1]
+
+
+def test_stop_event_ends_idle():
+    fetcher, server = _fetcher()
+    thread, received = _serve(server)
+    stop = threading.Event()
+    threading.Timer(0.2, stop.set).start()
+    start = time.monotonic()
+    assert fetcher.wait_for_new_mail(timeout=60, stop=stop) is False
+    assert time.monotonic() - start < 5
+    thread.join(2)
+    assert received[1] == b"DONE\r\n"
+
+
+def test_rejected_idle_raises():
+    fetcher, server = _fetcher()
+
+    def run():
+        data = server.recv(1024)
+        server.sendall(data.split(b" ", 1)[0] + b" BAD IDLE nije podrzan\r\n")
+
+    threading.Thread(target=run, daemon=True).start()
+    with pytest.raises(imaplib.IMAP4.error):
+        fetcher.wait_for_new_mail(timeout=5)
+
+
+def test_closed_connection_aborts():
+    fetcher, server = _fetcher()
+
+    def run():
+        server.recv(1024)
+        server.sendall(b"+ idling\r\n")
+        server.close()
+
+    threading.Thread(target=run, daemon=True).start()
+    with pytest.raises(imaplib.IMAP4.abort):
+        fetcher.wait_for_new_mail(timeout=5)
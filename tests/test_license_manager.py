@@ -0,0 +1,114 @@
+"""Provjera licence i zapamćena provjera potpisa (license_verification)."""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+
+from wizvod.core import crypto, license_manager
+from wizvod.core.license_manager import LicenseManager, get_fingerprint
+
+
+@pytest.fixture(scope="module")
+def private_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture
+def manager(db, private_key, tmp_path, monkeypatch):
+    pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode("ascii")
+    monkeypatch.setattr(license_manager, "PUBLIC_KEY_PEM", pem)
+    monkeypatch.setattr(crypto, "LOCAL_SECRET_DIR", tmp_path / "secrets")
+    crypto.get_local_secret.cache_clear()
+    yield LicenseManager(db)
+    crypto.get_local_secret.cache_clear()
+
+
+@pytest.fixture
+def verify_calls(monkeypatch):
+    calls = []
+    real = LicenseManager._verify_signature
+
+    def verify(self, lic, signature_hex):
+        calls.append(signature_hex)
+        return real(self, lic, signature_hex)
+
+    monkeypatch.setattr(LicenseManager, "_verify_signature", verify)
+    return calls
+
+
+def _license(private_key, days=30, fingerprint=None, **extra):
+    lic = {"customer": "Firma d.o.o.", "fingerprint": fingerprint or get_fingerprint(),
+           "expires_at": (datetime.now() + timedelta(days=days)).isoformat(timespec="seconds"), **extra}
+    payload = json.dumps(lic, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    lic["signature"] = private_key.sign(payload, padding.PKCS1v15(), hashes.SHA256()).hex()
+    return json.dumps(lic)
+
+
+def test_valid_license_is_verified_once(manager, private_key, verify_calls):
+    manager.save(_license(private_key))
+    assert manager.validate() is True
+    assert manager.validate() is True
+    assert len(verify_calls) == 1
+
+
+def test_expiry_comes_from_signed_license(manager, private_key, db):
+    manager.save(_license(private_key, days=30))
+    assert manager.validate() is True
+    # izmjena informativne kolone u bazi ne produžava niti skraćuje licencu
+    db.execute_write("UPDATE license_verification SET expires_at='2000-01-01T00:00:00'")
+    assert manager.validate() is True
+
+
+def test_expired_license_fails_even_with_cached_verification(manager, private_key, db):
+    license_json = _license(private_key, days=-1)
+    manager.save(license_json)
+    db.save_license_verification(manager._cache_key(license_json, get_fingerprint()), "2999-01-01T00:00:00")
+    assert manager.validate() is False
+
+
+def test_forged_row_without_local_secret_is_ignored(manager, private_key, db, verify_calls):
+    import hashlib
+
+    license_json = _license(private_key)
+    tampered = json.loads(license_json)
+    tampered["customer"] = "Neko drugi"  # potpis više ne odgovara
+    tampered_json = json.dumps(tampered)
+    manager.save(tampered_json)
+    # ključ izračunat samo iz javnih podataka (raniji način) nije dovoljan
+    h = hashlib.sha256()
+    for part in (license_manager.PUBLIC_KEY_PEM, tampered_json, get_fingerprint()):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    db.save_license_verification(h.hexdigest(), None)
+
+    assert manager.validate() is False
+    assert len(verify_calls) == 1
+
+
+def test_wrong_fingerprint_fails(manager, private_key):
+    manager.save(_license(private_key, fingerprint="0" * 64))
+    assert manager.validate() is False
+
+
+def test_new_local_secret_invalidates_cache(manager, private_key, verify_calls, tmp_path, monkeypatch):
+    manager.save(_license(private_key))
+    assert manager.validate() is True
+    monkeypatch.setattr(crypto, "LOCAL_SECRET_DIR", tmp_path / "drugi")
+    crypto.get_local_secret.cache_clear()
+    assert manager.validate() is True
+    assert len(verify_calls) == 2
+
+
+def test_local_secret_is_persistent_and_private(tmp_path, monkeypatch):
+    monkeypatch.setattr(crypto, "LOCAL_SECRET_DIR", tmp_path)
+    monkeypatch.setattr(crypto, "_DPAPI", False)
+    crypto.get_local_secret.cache_clear()
+    first = crypto.get_local_secret("test")
+    crypto.get_local_secret.cache_clear()
+    assert crypto.get_local_secret("test") == first
+    assert (tmp_path / "test.secret").stat().st_mode & 0o077 == 0
+    crypto.get_local_secret.cache_clear()
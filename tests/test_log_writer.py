@@ -0,0 +1,75 @@
+"""LogWriter: upis logova u grupama i pražnjenje bafera pri gašenju."""
+import time
+
+import pytest
+
+from wizvod.core import db as db_module
+from wizvod.core.sync_sessions import SyncSessionManager
+
+
+def _count(database):
+    return database.conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
+
+
+def _add(logs, n, start=0):
+    for i in range(start, start + n):
+        logs.add(None, f"Izvod {i}", "izvodi@banka.ba", str(i), None, "ok", "Sačuvan")
+
+
+def test_batch_is_written_when_full(db):
+    logs = db.log_writer(batch_size=3, max_delay=60)
+    _add(logs, 2)
+    assert _count(db) == 0 and logs.pending == 2
+    _add(logs, 1, start=2)
+    assert _count(db) == 3 and logs.pending == 0 and logs.written == 3
+
+
+def test_old_rows_are_written_after_max_delay(db):
+    logs = db.log_writer(batch_size=100, max_delay=0.05)
+    _add(logs, 1)
+    time.sleep(0.1)
+    _add(logs, 1, start=1)
+    assert _count(db) == 2
+
+
+def test_with_block_flushes_on_exit(db):
+    with db.log_writer(batch_size=100, max_delay=60) as logs:
+        _add(logs, 5)
+        assert _count(db) == 0
+    assert _count(db) == 5
+
+
+def test_database_close_flushes_pending_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_module, "DB_PATH", tmp_path / "wizvod.db")
+    database = db_module.Database()
+    SyncSessionManager(database)
+    logs = database.log_writer(batch_size=100, max_delay=60)
+    _add(logs, 4)
+    client_id = database.add_client("Firma", "1990000000000001", "BNK", "izvodi@banka.ba", str(tmp_path))
+    logs.add_attachment("a" * 64, client_id, "1", None, "generic", 1, 1)
+    database.close()
+
+    reopened = db_module.Database()
+    try:
+        assert _count(reopened) == 4
+        assert list(reopened.load_attachment_hashes()) == ["a" * 64]
+    finally:
+        reopened.close()
+
+
+def test_failed_write_keeps_rows_for_next_flush(db, monkeypatch):
+    logs = db.log_writer(batch_size=100, max_delay=60)
+    _add(logs, 2)
+    real_write = db.write
+
+    def failing(*args, **kwargs):
+        raise RuntimeError("disk pun")
+
+    monkeypatch.setattr(db, "write", failing)
+    with pytest.raises(RuntimeError):
+        logs.flush()
+    assert logs.pending == 2
+
+    monkeypatch.setattr(db, "write", real_write)
+    logs.flush()
+    assert _count(db) == 2 and logs.pending == 0
@@ -0,0 +1,92 @@
+"""parse_statement ("header" i "full" režim, ključ keša) i ParsePool."""
+import os
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from wizvod.benchmarks.statement_corpus import LINES_PER_PAGE, build_corpus, render_pdf
+from wizvod.core.pdf_parser import ParsePool, parse_cache_key, parse_statement
+
+UNICREDIT = "UniCredit Bank <izvodi.pravne@unicreditgroup.ba>"
+SUBJECT = "Izvod po racunu 3380000000000042"
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    return build_corpus(per_bank=2, seed=7, max_pages=6)
+
+
+def test_header_mode_matches_full_mode(corpus):
+    assert any(case.pages > 3 for case in corpus)
+    for case in corpus:
+        header = parse_statement(case.pdf_bytes, case.sender, case.subject, case.filename, "header")
+        full = parse_statement(case.pdf_bytes, case.sender, case.subject, case.filename, "full")
+        assert header[:2] == full[:2], case
+        assert header[:2] == case.expected, case
+
+
+def test_fallback_on_header_does_not_stop_escalation():
+    # prva stranica ima broj koji nalazi samo generički fallback, a pravilo banke tek peta
+    lines = ["UniCredit Bank d.d. Mostar", "Izvod broj: 15"]
+    lines += [f"Transakcija {i}" for i in range(4 * LINES_PER_PAGE - len(lines))]
+    lines += ["IZVADAK / IZVOD br: 42"]
+    pdf = render_pdf(lines)
+
+    full = parse_statement(pdf, UNICREDIT, SUBJECT, "izvod.pdf", "full")
+    assert full[:2] == ("3380000000000042", "42")
+    assert parse_statement(pdf, UNICREDIT, SUBJECT, "izvod.pdf", "header")[:2] == full[:2]
+
+
+def test_cache_key_depends_on_text_mode():
+    header = parse_cache_key("a" * 64, UNICREDIT, SUBJECT, "izvod.pdf", "header")
+    full = parse_cache_key("a" * 64, UNICREDIT, SUBJECT, "izvod.pdf", "full")
+    assert header != full and header[:4] == full[:4]
+
+
+def test_resolve_workers():
+    assert ParsePool.resolve_workers(None) == 0
+    assert ParsePool.resolve_workers(" 3 ") == 3
+    assert ParsePool.resolve_workers("nesto") == 0
+    assert ParsePool.resolve_workers("auto") == max(1, (os.cpu_count() or 2) - 1)
+
+
+def _parse(pool, case):
+    future = pool.submit(case.pdf_bytes, case.sender, case.subject, case.filename)
+    return pool.result(future, case.pdf_bytes, case.sender, case.subject, case.filename)
+
+
+def test_in_process_and_process_pool_agree(corpus):
+    local, processes = ParsePool(0), ParsePool(2)
+    try:
+        assert processes._pool is not None
+        for case in corpus[:6]:
+            assert _parse(processes, case) == _parse(local, case) == parse_statement(
+                case.pdf_bytes, case.sender, case.subject, case.filename)
+    finally:
+        processes.shutdown()
+    assert processes._pool is None
+
+
+def test_broken_pool_falls_back_to_in_process(corpus):
+    case = corpus[0]
+    pool = ParsePool(1)
+    broken: Future = Future()
+    broken.set_exception(BrokenProcessPool("proces je ubijen"))
+
+    assert pool.result(broken, case.pdf_bytes, case.sender, case.subject, case.filename)[:2] == case.expected
+    assert pool._pool is None  # dalje se parsira u procesu
+    assert _parse(pool, case)[:2] == case.expected
+
+
+def test_pool_that_cannot_accept_work_falls_back(corpus):
+    case = corpus[0]
+    pool = ParsePool(1)
+    pool._pool.shutdown()  # submit sada baca RuntimeError
+    assert _parse(pool, case)[:2] == case.expected and pool._pool is None
+
+
+def test_parse_errors_reach_the_caller():
+    pool = ParsePool(0)
+    with pytest.raises(ValueError):
+        _parse(pool, type("Case", (), {"pdf_bytes": b"nije pdf", "sender": "", "subject": "", "filename": "x.pdf"}))
@@ -0,0 +1,112 @@
+"""Usmjeravanje priloga klijentima i UID watermark za poruke bez klijenta."""
+import threading
+from types import SimpleNamespace
+
+from wizvod.core.routing import AccountRouter, routing_key
+from wizvod.worker import (ROUTE_RETRY_ATTEMPTS, _AccountJob, _Work, _build_sender_plan, _next_watermark,
+                           _save_stage, _senders_hash, _watermark_holds)
+
+SENDER = "izvodi@sparkasse.ba"
+
+
+def _client(cid, account, name=None):
+    return {"id": cid, "name": name or f"k{cid}", "account_number": account,
+            "sender_email": SENDER, "folder_path": f"/tmp/k{cid}"}
+
+
+def test_routing_key_normalizes_formats():
+    assert routing_key("567-651-00001145-06") == "5676510000114506"
+    assert routing_key("BA39 5676 5100 0011 4506") == "5676510000114506"
+    assert routing_key("5676510000114506") == "5676510000114506"
+    assert routing_key(None) == ""
+
+
+def test_route_prefers_account_match_over_sender():
+    a, b = _client(1, "1990490000000001"), _client(2, "1990490000000002")
+    router = AccountRouter([a, b])
+    assert router.route("199-049-00000000-02", [a, b]) is b
+    # račun pripada klijentu koji nije naveo ovog pošiljaoca
+    assert router.route("1990490000000002", [a]) is b
+
+
+def test_route_shared_account_prefers_sender_candidate():
+    a, b = _client(1, "1990490000000001"), _client(2, "1990490000000001")
+    router = AccountRouter([a, b])
+    assert router.route("1990490000000001", [b]) is b
+
+
+def test_route_unknown_account():
+    a, b = _client(1, "1990490000000001"), _client(2, "1990490000000002")
+    router = AccountRouter([a, b])
+    assert router.route(None, [a]) is a          # jedini klijent pošiljaoca
+    assert router.route(None, [a, b]) is None    # ne može se odrediti
+    assert router.route("1111111111111111", [a, b]) is None
+
+
+def test_next_watermark_stops_before_failed_or_retry():
+    assert _next_watermark(10, [11, 12, 13], []) == 13
+    assert _next_watermark(10, [11, 12, 13], [12]) == 11
+    assert _next_watermark(10, [11, 12], [11]) == 10
+
+
+def _ctx(clients):
+    return SimpleNamespace(router=AccountRouter(clients), db_lock=threading.Lock(),
+                           downloaded=set(), attachment_hashes={})
+
+
+def test_unrouted_attachment_is_marked_for_retry():
+    a, b = _client(1, "1990490000000001"), _client(2, "1990490000000002")
+    job = _AccountJob({"id": 1}, fetcher=None)
+    job.track(21)
+    work = _Work(job, 21, "Izvod", SENDER, [a, b]).for_attachment("izvod.pdf", b"%PDF")
+    work.parsed = (None, "7", {})
+
+    [out] = _save_stage(_ctx([a, b]), work)
+    assert out.status == "skipped" and out.retry and out.client_id is None
+
+    job.release(out.uid, out.status, retry=out.retry)
+    assert job.retry_uids == {21} and not job.read_uids
+
+
+def _run_job(account_id, uids, retry=(), failed=()):
+    job = _AccountJob({"id": account_id, "email": "ana@firma.ba"}, fetcher=None)
+    for uid in uids:
+        job.track(uid)
+        job.release(uid, "error" if uid in failed else "skipped" if uid in retry else "ok", retry=uid in retry)
+    return job
+
+
+def test_unroutable_message_holds_watermark_only_for_limited_runs(db):
+    db.add_mail_account("imap", "ana@firma.ba", "imap.firma.ba", 993, True, "ana", b"x")
+    account_id = db.list_mail_accounts()[0]["id"]
+
+    for _ in range(ROUTE_RETRY_ATTEMPTS - 1):
+        job = _run_job(account_id, [21, 22], retry={21})
+        assert _next_watermark(20, job.seen_uids, _watermark_holds(db, job, "INBOX", 7)) == 20
+
+    job = _run_job(account_id, [21, 22, 23], retry={21})
+    assert _next_watermark(20, job.seen_uids, _watermark_holds(db, job, "INBOX", 7)) == 23
+
+
+def test_failed_message_always_holds_watermark(db):
+    db.add_mail_account("imap", "ana@firma.ba", "imap.firma.ba", 993, True, "ana", b"x")
+    account_id = db.list_mail_accounts()[0]["id"]
+    for _ in range(ROUTE_RETRY_ATTEMPTS + 1):
+        job = _run_job(account_id, [21, 22], failed={22})
+        assert _next_watermark(20, job.seen_uids, _watermark_holds(db, job, "INBOX", 7)) == 21
+
+
+def test_retry_count_resets_when_routed_or_uidvalidity_changes(db):
+    db.add_mail_account("imap", "ana@firma.ba", "imap.firma.ba", 993, True, "ana", b"x")
+    account_id = db.list_mail_accounts()[0]["id"]
+    assert db.record_retry_uids(account_id, "INBOX", 7, {21, 22}, [21, 22]) == {21: 1, 22: 1}
+    assert db.record_retry_uids(account_id, "INBOX", 7, {21}, [21, 22]) == {21: 2}  # 22 raspoređena
+    assert db.record_retry_uids(account_id, "INBOX", 7, {22}, [22]) == {22: 1}
+    assert db.record_retry_uids(account_id, "INBOX", 8, {21}, [21]) == {21: 1}  # novi UIDVALIDITY
+
+
+def test_new_client_account_resets_watermark_fingerprint():
+    a, b = _client(1, "1990490000000001"), _client(2, "1990490000000002")
+    before = _senders_hash(_build_sender_plan([a]))
+    assert _senders_hash(_build_sender_plan([a, b])) != before
+    assert _senders_hash(_build_sender_plan([dict(a, name="novo ime")])) == before
@@ -0,0 +1,45 @@
+"""Pravila banaka na sintetičkom korpusu izvoda (benchmarks/statement_corpus, rule_corpus)."""
+import pytest
+
+from wizvod.benchmarks import rule_corpus
+from wizvod.benchmarks.statement_corpus import PROFILES, build_corpus, load_corpus, save_corpus
+from wizvod.core.pdf_parser import PDFParser, parse_statement
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    return build_corpus(per_bank=4, seed=2026, max_pages=5)
+
+
+def _assert_all_recognized(cases, results):
+    banks, misses = rule_corpus.score(cases, results)
+    assert set(banks) == set(PROFILES)
+    assert not misses, [(case.bank, case.expected, got) for case, got in misses]
+
+
+def test_extract_all_recognizes_every_bank(corpus):
+    parser = PDFParser()
+    results = [parser.extract_all(case.sender, case.subject, case.filename,
+                                  parser.read_text_from_pdf_bytes(case.pdf_bytes)) for case in corpus]
+    _assert_all_recognized(corpus, results)
+
+
+@pytest.mark.parametrize("mode", rule_corpus.TEXT_MODES)
+def test_parse_statement_recognizes_every_bank(corpus, mode):
+    results = [parse_statement(case.pdf_bytes, case.sender, case.subject, case.filename, text_mode=mode)[:2]
+               for case in corpus]
+    _assert_all_recognized(corpus, results)
+
+
+def test_corpus_is_deterministic_and_round_trips(corpus, tmp_path):
+    again = build_corpus(per_bank=4, seed=2026, max_pages=5)
+    assert [c.manifest_entry() for c in again] == [c.manifest_entry() for c in corpus]
+
+    save_corpus(corpus[:3], tmp_path)
+    loaded = load_corpus(tmp_path)
+    assert [(c.expected, c.pdf_bytes) for c in loaded] == [(c.expected, c.pdf_bytes) for c in corpus[:3]]
+
+
+def test_harness_reports_success(corpus, capsys):
+    assert rule_corpus.main(["--per-bank", "1", "--rounds", "1", "--pdf-rounds", "1"]) == 0
+    assert "Svi izvodi prepoznati" in capsys.readouterr().out
@@ -0,0 +1,62 @@
+"""Snimanje PDF-a: indeks foldera klijenta i upis bez prepisivanja postojećih fajlova."""
+import os
+import threading
+
+from wizvod import worker
+from wizvod.worker import _FolderIndex, _write_pdf
+
+
+def test_reserve_skips_existing_names_case_insensitive(tmp_path):
+    (tmp_path / "12.PDF").write_bytes(b"stari")
+    (tmp_path / "12_2.pdf").write_bytes(b"stari")
+    folders = _FolderIndex()
+    assert folders.reserve(tmp_path, "12") == "12_3.pdf"
+    assert folders.reserve(tmp_path, "12") == "12_4.pdf"
+    assert folders.reserve(tmp_path, "13") == "13.pdf"
+
+
+def test_folder_is_listed_once_and_created_if_missing(tmp_path, monkeypatch):
+    calls = []
+    real_scandir = os.scandir
+
+    def scandir(path):
+        calls.append(path)
+        return real_scandir(path)
+
+    monkeypatch.setattr(worker.os, "scandir", scandir)
+    folder = tmp_path / "klijent" / "izvodi"
+    folders = _FolderIndex()
+    names = [folders.reserve(folder, "7") for _ in range(3)]
+    assert names == ["7.pdf", "7_2.pdf", "7_3.pdf"]
+    assert folder.is_dir() and len(calls) == 1
+
+
+def test_write_never_overwrites_file_created_after_listing(tmp_path):
+    folders = _FolderIndex()
+    folders.reserve(tmp_path, "probe")  # folder je učitan prije nego što je fajl nastao
+    (tmp_path / "5.pdf").write_bytes(b"tudji")
+
+    path, name = _write_pdf(folders, tmp_path, "5", "izvod.pdf", b"%PDF novi")
+    assert name == "5_2.pdf" and path.read_bytes() == b"%PDF novi"
+    assert (tmp_path / "5.pdf").read_bytes() == b"tudji"
+
+
+def test_unknown_statement_number_uses_attachment_name(tmp_path):
+    path, name = _write_pdf(_FolderIndex(), tmp_path, "unknown", "Izvod_mart.pdf", b"%PDF")
+    assert name == "Izvod_mart.pdf" and path.exists()
+
+
+def test_concurrent_writes_get_distinct_files(tmp_path):
+    folders = _FolderIndex()
+    written = []
+
+    def save(i):
+        written.append(_write_pdf(folders, tmp_path, "9", "x.pdf", b"%%PDF %d" % i)[1])
+
+    threads = [threading.Thread(target=save, args=(i,)) for i in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert len(set(written)) == 20
+    assert sorted(p.read_bytes() for p in tmp_path.iterdir()) == sorted(b"%%PDF %d" % i for i in range(20))
@@ -0,0 +1,85 @@
+"""Pretraga po pošiljaocima: IMAP OR kriterij i grupisanje SEARCH komandi."""
+from datetime import datetime
+from email.message import Message
+
+import pytest
+
+from wizvod.core.email_fetcher import EmailFetcher, _SenderMatcher, _build_or_criteria
+
+
+def _matches(criteria, from_header):
+    """Evaluira prefiksni IMAP izraz (OR / FROM) nad From headerom kao što bi server."""
+    tokens = iter(criteria)
+
+    def expr():
+        key = next(tokens)
+        if key == "OR":
+            left, right = expr(), expr()
+            return left or right
+        assert key == "FROM"
+        return next(tokens) in from_header
+
+    result = expr()
+    assert next(tokens, None) is None  # nema viška tokena
+    return result
+
+
+def test_single_sender_has_no_or():
+    assert _build_or_criteria(["a@x.ba"]) == ["FROM", "a@x.ba"]
+
+
+@pytest.mark.parametrize("count", [2, 3, 7, 50])
+def test_or_criteria_match_any_sender(count):
+    senders = [f"izvodi{i}@banka.ba" for i in range(count)]
+    criteria = _build_or_criteria(senders)
+    assert criteria.count("OR") == count - 1
+    for sender in senders:
+        assert _matches(criteria, f"Banka <{sender}>")
+    assert not _matches(criteria, "info@drugo.ba")
+
+
+def test_one_search_per_chunk_of_unique_senders():
+    fetcher = EmailFetcher()
+    searches = []
+    fetcher._uid_search = lambda criteria, since, unread_only, min_uid: searches.append(criteria) or []
+    senders = [f"s{i}@banka.ba" for i in range(5)] + ["S0@banka.ba", " <s1@banka.ba> ", ""]
+
+    assert list(fetcher.iter_messages(datetime(2024, 1, 1), senders, False, chunk_size=2)) == []
+    assert searches == [_build_or_criteria(["s0@banka.ba", "s1@banka.ba"]),
+                        _build_or_criteria(["s2@banka.ba", "s3@banka.ba"]),
+                        _build_or_criteria(["s4@banka.ba"])]
+
+
+def test_no_senders_no_search():
+    fetcher = EmailFetcher()
+    fetcher._uid_search = lambda *args: pytest.fail("SEARCH bez pošiljalaca")
+    assert list(fetcher.iter_messages(datetime(2024, 1, 1), ["", "  "], False)) == []
+
+
+def _message(from_header):
+    msg = Message()
+    msg["From"] = from_header
+    return msg
+
+
+def test_matcher_returns_original_sender_spelling():
+    matcher = _SenderMatcher(["<Izvodi@Banka.ba>", "izvodi@banka.ba", ""])
+    assert matcher.cleaned == {"izvodi@banka.ba": "<Izvodi@Banka.ba>"}
+    assert matcher.match(_message("Banka <IZVODI@banka.ba>")) == "<Izvodi@Banka.ba>"
+
+
+def test_matcher_prefers_most_specific_sender():
+    matcher = _SenderMatcher(["banka.ba", "pravna.izvodi@banka.ba"])
+    assert matcher.match(_message("Pravna <pravna.izvodi@banka.ba>")) == "pravna.izvodi@banka.ba"
+    assert matcher.match(_message("Info <info@banka.ba>")) == "banka.ba"
+
+
+def test_matcher_decodes_encoded_from_header():
+    matcher = _SenderMatcher(["izvodi@banka.ba"])
+    assert matcher.match(_message("=?utf-8?b?aXp2b2RpQGJhbmthLmJh?=")) == "izvodi@banka.ba"
+
+
+def test_matcher_unknown_sender():
+    matcher = _SenderMatcher(["izvodi@banka.ba"])
+    assert matcher.match(_message("info@drugo.ba")) is None
+    assert matcher.match(Message()) is None
@@ -0,0 +1,151 @@
+"""TokenCache: istek, osvježavanje preko lokalnog token endpointa i vezivanje tokena za nalog."""
+import base64
+import json
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from wizvod.core.token_cache import OAuthToken, TokenCache, legacy_token, token_owner
+
+
+class _TokenEndpoint:
+    """HTTP token endpoint na 127.0.0.1: odgovara na refresh_token grant."""
+
+    def __init__(self, status=200, expires_in=3600, new_refresh_token=None):
+        self.status = status
+        self.expires_in = expires_in
+        self.new_refresh_token = new_refresh_token
+        self.requests = []
+        endpoint = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"])).decode("ascii")
+                form = dict(urllib.parse.parse_qsl(body))
+                endpoint.requests.append(form)
+                if endpoint.status != 200:
+                    payload = {"error": "invalid_grant"}
+                else:
+                    payload = {"access_token": f"access-{len(endpoint.requests)}",
+                               "expires_in": endpoint.expires_in, "token_type": "Bearer"}
+                    if endpoint.new_refresh_token:
+                        payload["refresh_token"] = endpoint.new_refresh_token
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(endpoint.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/token"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def endpoint():
+    server = _TokenEndpoint()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = TokenCache(tmp_path / "token_cache.json", refresh_ahead=300, min_valid=60)
+    yield cache
+    cache.close()
+
+
+def _token(url, email="ana@firma.ba", expires_in=3600, refresh_token="refresh-0"):
+    return OAuthToken("gmail", email, "access-0", refresh_token, time.time() + expires_in,
+                      url, "client-id", "client-secret", "https://mail.google.com/")
+
+
+def test_valid_token_is_returned_without_refresh(cache, endpoint):
+    cache.put(_token(endpoint.url))
+    assert cache.get_access_token("gmail", "ANA@firma.ba") == "access-0"
+    assert endpoint.requests == []
+
+
+def test_token_of_another_account_is_never_returned(cache, endpoint):
+    cache.put(_token(endpoint.url, email="ana@firma.ba"))
+    assert cache.find("gmail", "marko@firma.ba") is None
+    assert cache.get_access_token("gmail", "marko@firma.ba") is None
+    assert cache.get_access_token("outlook", "ana@firma.ba") is None
+
+
+def test_expiring_token_is_refreshed_and_persisted(cache, endpoint, tmp_path):
+    cache.put(_token(endpoint.url, expires_in=30))
+    assert cache.get_access_token("gmail", "ana@firma.ba") == "access-1"
+    assert endpoint.requests == [{"grant_type": "refresh_token", "refresh_token": "refresh-0",
+                                  "client_id": "client-id", "client_secret": "client-secret",
+                                  "scope": "https://mail.google.com/"}]
+
+    reloaded = TokenCache(tmp_path / "token_cache.json").find("gmail", "ana@firma.ba")
+    assert reloaded.access_token == "access-1"
+    assert reloaded.refresh_token == "refresh-0"  # server nije vratio novi refresh token
+    assert reloaded.remaining() > 3500
+
+
+def test_background_thread_refreshes_before_expiry(tmp_path, endpoint):
+    cache = TokenCache(tmp_path / "token_cache.json", refresh_ahead=300, min_valid=60)
+    try:
+        cache.put(_token(endpoint.url, expires_in=200))  # već unutar refresh_ahead
+        cache.start()
+        deadline = time.time() + 5
+        while cache.find("gmail", "ana@firma.ba").access_token == "access-0" and time.time() < deadline:
+            time.sleep(0.05)
+        assert cache.find("gmail", "ana@firma.ba").access_token == "access-1"
+        assert len(endpoint.requests) == 1
+    finally:
+        cache.close()
+
+
+def test_failed_refresh_returns_none(cache):
+    failing = _TokenEndpoint(status=400)
+    try:
+        cache.put(_token(failing.url, expires_in=10))
+        assert cache.get_access_token("gmail", "ana@firma.ba") is None
+    finally:
+        failing.close()
+
+
+def test_expired_token_without_refresh_token(cache, endpoint):
+    cache.put(_token(endpoint.url, expires_in=-10, refresh_token=None))
+    assert cache.get_access_token("gmail", "ana@firma.ba") is None
+    assert endpoint.requests == []
+
+
+def _jwt(claims):
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).rstrip(b"=").decode()
+    return f"e30.{payload}.potpis"
+
+
+def test_token_owner_sources():
+    assert token_owner({"account": "Ana@Firma.ba"}) == "ana@firma.ba"
+    assert token_owner({"id_token_claims": {"preferred_username": "ana@firma.ba"}}) == "ana@firma.ba"
+    assert token_owner({"id_token": _jwt({"email": "ana@firma.ba"})}) == "ana@firma.ba"
+    assert token_owner({"account": "", "refresh_token": "x"}) is None
+    assert token_owner({"id_token": "nije.jwt.token"}) is None
+
+
+def test_legacy_token_only_for_its_account(tmp_path):
+    path = tmp_path / "outlook_token.json"
+    path.write_text(json.dumps({"access_token": "a", "refresh_token": "r",
+                                "id_token_claims": {"preferred_username": "ana@firma.ba"}}), encoding="utf-8")
+    assert legacy_token(path, "ana@firma.ba")["refresh_token"] == "r"
+    assert legacy_token(path, "marko@firma.ba") is None
+
+    path.write_text(json.dumps({"access_token": "a", "refresh_token": "r"}), encoding="utf-8")
+    assert legacy_token(path, "ana@firma.ba") is None  # vlasnik nepoznat
+    assert legacy_token(tmp_path / "nema.json", "ana@firma.ba") is None
@@ -0,0 +1,151 @@
+"""
+Regresioni test i mjerenje propusnosti pravila banaka na sintetičkom korpusu.
+
+Za svaki izvod iz korpusa (vidi statement_corpus.py) provjerava da li
+PDFParser.extract_all i parse_statement vraćaju očekivan broj računa i
+izvoda, i mjeri koliko priloga u sekundi svaki korak obradi:
+  - extract_all: samo pravila (tekst PDF-a je pročitan unaprijed)
+  - parse_statement: čitanje PDF-a + pravila, za svaki text_mode
+
+Izlazni kod je 1 ako neki izvod nije ispravno prepoznat, pa se skripta
+može koristiti kao provjera prije izmjene pravila ili parsera.
+
+Pokretanje:
+    python -m wizvod.benchmarks.rule_corpus [--per-bank 20] [--pages 3] [--rounds 20]
+    python -m wizvod.benchmarks.rule_corpus --corpus <folder>   # snimljeni korpus
+"""
+import argparse
+import sys
+import time
+from collections import OrderedDict
+from typing import Callable, List
+
+from wizvod.benchmarks.statement_corpus import StatementCase, build_corpus, load_corpus, save_corpus
+from wizvod.core.pdf_parser import PDFParser, parse_statement
+
+TEXT_MODES = ("header", "full")
+
+
+class BankScore:
+    """Tačnost za jednu banku."""
+
+    def __init__(self):
+        self.cases = 0
+        self.account_ok = 0
+        self.statement_ok = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.account_ok == self.statement_ok == self.cases
+
+
+def score(cases: List[StatementCase], results: List[tuple]):
+    """
+    Poredi rezultate sa očekivanim vrijednostima.
+
+    Returns:
+        Tuple (OrderedDict banka -> BankScore, lista promašaja (case, rezultat))
+    """
+    banks = OrderedDict()
+    misses = []
+    for case, (acct, stmt) in zip(cases, results):
+        s = banks.setdefault(case.bank, BankScore())
+        s.cases += 1
+        s.account_ok += acct == case.account
+        s.statement_ok += stmt == case.statement
+        if (acct, stmt) != case.expected:
+            misses.append((case, (acct, stmt)))
+    return banks, misses
+
+
+def _throughput(fn: Callable, cases: List[StatementCase], rounds: int):
+    """Pokreće fn nad svim izvodima `rounds` puta; vraća (rezultati prvog prolaza, priloga/s)."""
+    results = [fn(case) for case in cases]  # zagrijavanje + rezultati za tačnost
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for case in cases:
+            fn(case)
+    elapsed = time.perf_counter() - start
+    return results, (rounds * len(cases) / elapsed if elapsed > 0 else 0.0)
+
+
+def _print_scores(title: str, banks, rate: float):
+    print(f"\n{title}: {rate:,.0f} priloga/s")
+    for bank, s in banks.items():
+        mark = "✅" if s.ok else "❌"
+        print(f"  {mark} {bank:<10} račun {s.account_ok:>4}/{s.cases:<4} izvod {s.statement_ok:>4}/{s.cases}")
+
+
+def _print_misses(misses, limit: int = 10):
+    for case, (acct, stmt) in misses[:limit]:
+        print(f"    {case.bank}: očekivano {case.expected}, dobijeno {(acct, stmt)} "
+              f"[{case.subject!r}, {case.filename!r}]")
+    if len(misses) > limit:
+        print(f"    ... i još {len(misses) - limit}")
+
+
+def run(cases: List[StatementCase], rounds: int = 20, pdf_rounds: int = 3) -> bool:
+    """
+    Pokreće provjeru tačnosti i mjerenje nad korpusom.
+
+    Args:
+        cases: Izvodi iz korpusa
+        rounds: Ponavljanja za extract_all
+        pdf_rounds: Ponavljanja za parse_statement (čitanje PDF-a je sporije)
+
+    Returns:
+        True ako su svi izvodi ispravno prepoznati u svim koracima
+    """
+    parser = PDFParser()
+    texts = {id(case): parser.read_text_from_pdf_bytes(case.pdf_bytes) for case in cases}
+    pages = sum(case.pages for case in cases)
+    print(f"Korpus: {len(cases)} izvoda, {pages} stranica, "
+          f"{len({case.bank for case in cases})} banaka")
+
+    all_ok = True
+
+    results, rate = _throughput(
+        lambda case: parser.extract_all(case.sender, case.subject, case.filename, texts[id(case)]),
+        cases, rounds)
+    banks, misses = score(cases, results)
+    _print_scores("extract_all (pravila, tekst unaprijed pročitan)", banks, rate)
+    _print_misses(misses)
+    all_ok &= not misses
+
+    for mode in TEXT_MODES:
+        results, rate = _throughput(
+            lambda case: parse_statement(case.pdf_bytes, case.sender, case.subject,
+                                         case.filename, text_mode=mode)[:2],
+            cases, pdf_rounds)
+        banks, misses = score(cases, results)
+        _print_scores(f"parse_statement text_mode={mode} (PDF + pravila)", banks, rate)
+        _print_misses(misses)
+        all_ok &= not misses
+
+    print("\n✅ Svi izvodi prepoznati." if all_ok else "\n❌ Ima neprepoznatih izvoda.")
+    return all_ok
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Tačnost i propusnost pravila banaka na sintetičkim izvodima.")
+    ap.add_argument("--per-bank", type=int, default=20, help="broj izvoda po banci")
+    ap.add_argument("--pages", type=int, default=3, help="najveći broj stranica izvoda")
+    ap.add_argument("--seed", type=int, default=2026)
+    ap.add_argument("--bank", action="append", help="samo data banka (može više puta)")
+    ap.add_argument("--rounds", type=int, default=20, help="ponavljanja za extract_all")
+    ap.add_argument("--pdf-rounds", type=int, default=3, help="ponavljanja za parse_statement")
+    ap.add_argument("--corpus", help="folder sa snimljenim korpusom (umjesto generisanja)")
+    ap.add_argument("--save", help="snimi generisani korpus u folder")
+    args = ap.parse_args(argv)
+
+    if args.corpus:
+        cases = load_corpus(args.corpus)
+    else:
+        cases = build_corpus(args.per_bank, args.seed, args.pages, args.bank)
+        if args.save:
+            print(f"📄 Korpus snimljen: {save_corpus(cases, args.save)}")
+    return 0 if run(cases, args.rounds, args.pdf_rounds) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Mikro-benchmark: cijena izbora pravila banke i pretrage po jednom prilogu.
+
+Poredi raniji kod (zamrznuta kopija u benchmarks/legacy_bank_rules: linearna
+pretraga adresa, import_module po pozivu i re.search sa string patternima)
+sa trenutnim registrom pravila.
+
+Pokretanje:
+    python -m wizvod.benchmarks.rule_dispatch [broj_ponavljanja]
+"""
+import sys
+import time
+import types
+
+from wizvod.benchmarks import legacy_bank_rules
+from wizvod.core import bank_rules
+
+SAMPLE_TEXT = (
+    "IZVOD BROJ: 123\n"
+    "Izvod za komitenta broj: 123\n"
+    "Račun: 1990490000000123\n"
+    + "Transakcija 100,00 KM\n" * 60
+)
+SUBJECT = "Izvod po racunu 1990490000000123"
+FILENAME = "izvod_1990490000000123.pdf"
+
+
+def _senders(baseline: types.ModuleType):
+    """Adrese iz ranijeg BANK_RULES i trenutnog registra, plus jedan nepoznat pošiljalac."""
+    addresses = list(baseline.BANK_RULES)
+    for rule in bank_rules.get_registry().rules.values():
+        addresses += getattr(rule, "senders", [])
+    addresses += list(bank_rules.BANK_RULES)
+    return [f"Banka <{a}>" for a in dict.fromkeys(addresses)] + ["Nepoznat <info@example.com>"]
+
+
+def _extract(module, sender: str):
+    return (module.extract_statement_number(sender, SAMPLE_TEXT),
+            module.extract_account_number(sender, SAMPLE_TEXT, SUBJECT, FILENAME))
+
+
+def _measure(fn, senders, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for sender in senders:
+            fn(sender)
+    return (time.perf_counter() - start) / (rounds * len(senders)) * 1e6
+
+
+def main(rounds: int = 20000):
+    baseline = legacy_bank_rules
+    senders = _senders(baseline)
+    bank_rules.get_registry()  # registar se gradi jednom, van mjerenja
+
+    # raniji kod je dva puta birao modul (jednom po extract_* pozivu)
+    legacy_lookup = _measure(lambda s: (baseline.get_parser_by_sender(s), baseline.get_parser_by_sender(s)),
+                             senders, rounds)
+    registry_lookup = _measure(bank_rules.get_registry().resolve, senders, rounds)
+    legacy = _measure(lambda s: _extract(baseline, s), senders, rounds)
+    registry = _measure(lambda s: _extract(bank_rules, s), senders, rounds)
+    differ = [s for s in senders if _extract(baseline, s) != _extract(bank_rules, s)]
+
+    print(f"Pošiljalaca: {len(senders)}, ponavljanja: {rounds}")
+    print(f"  izbor pravila ranije:   {legacy_lookup:8.2f} µs, registar: {registry_lookup:8.2f} µs "
+          f"({legacy_lookup / registry_lookup:.1f}x)")
+    print("  izbor pravila + pretraga broja izvoda i računa:")
+    print(f"    ranije:   {legacy:8.2f} µs po prilogu")
+    print(f"    registar: {registry:8.2f} µs po prilogu")
+    print(f"    odnos: {legacy / registry:.2f}x")
+    if differ:
+        print(f"  ⚠️ različit rezultat za {len(differ)} pošiljalaca: {', '.join(differ)}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,296 @@
+"""
+Sintetički bankovni izvodi za regresione testove i mjerenje pravila banaka.
+
+Za svaku podržanu banku pravi PDF izvod sa zaglavljem u formatu te banke,
+stranicama transakcija (sa računima primalaca kao "šumom") i saldom na kraju,
+uz email podatke (pošiljalac, subject, ime fajla) i poznat broj računa i izvoda.
+Korpus je deterministički za isti seed, a može se i snimiti u folder
+(PDF-ovi + manifest.json) da bi se ista verzija korpusa koristila kroz izmjene.
+
+Pokretanje (snima korpus):
+    python -m wizvod.benchmarks.statement_corpus <folder> [po_banci] [seed]
+"""
+import json
+import random
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import fitz
+
+MANIFEST_FILE = "manifest.json"
+
+# Dimenzije A4 stranice i raspored linija (PDF tačke)
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+MARGIN_LEFT, MARGIN_TOP = 50, 60
+LINE_HEIGHT = 13
+FONT_SIZE = 9
+LINES_PER_PAGE = (PAGE_HEIGHT - 2 * MARGIN_TOP) // LINE_HEIGHT
+
+PURPOSES = [
+    "Uplata po računu", "Plaćanje fakture", "Isplata plata", "Porez na dohodak",
+    "Doprinosi PIO/MIO", "Provizija banke", "Povrat avansa", "Zakup poslovnog prostora",
+    "Komunalne usluge", "Gorivo i mazivo", "Uplata pazara", "Kamata po kreditu",
+]
+COMPANIES = [
+    "Elektroprivreda d.d.", "BH Telecom d.d.", "Mtel a.d.", "Autoprevoz d.o.o.",
+    "Bingo d.o.o.", "Konzum BiH d.o.o.", "Hifa Oil d.o.o.", "Porezna uprava",
+    "Vodovod i kanalizacija", "Šipad Komerc d.o.o.", "Čistoća d.o.o.", "Žitopromet a.d.",
+]
+
+
+class BankProfile:
+    """
+    Izgled izvoda jedne banke.
+
+    Args:
+        bank: Naziv pravila banke (kao u bank_rules/rules.json)
+        sender: Adresa pošiljaoca
+        display_name: Ime pošiljaoca u From zaglavlju
+        header: Linije zaglavlja prve stranice (format polja: stmt, acct, client, date, period)
+        subject: Format subject-a
+        filename: Format imena PDF fajla
+        account_prefix: Prve cifre broja računa (šifra banke)
+        dashed: Broj računa u tekstu sa crticama (npr. 134-470-00123456-78)
+    """
+
+    def __init__(self, bank: str, sender: str, display_name: str, header: List[str],
+                 subject: str, filename: str, account_prefix: str, dashed: bool = False):
+        self.bank = bank
+        self.sender = sender
+        self.display_name = display_name
+        self.header = header
+        self.subject = subject
+        self.filename = filename
+        self.account_prefix = account_prefix
+        self.dashed = dashed
+
+    @property
+    def from_header(self) -> str:
+        return f"{self.display_name} <{self.sender}>"
+
+
+PROFILES: Dict[str, BankProfile] = {p.bank: p for p in [
+    BankProfile(
+        "nlb_rs", "homebank@nlb-rs.ba", "NLB Banka Banja Luka",
+        ["NLB Banka a.d. Banja Luka", "Milana Tepića 4, 78000 Banja Luka",
+         "IZVOD broj: {stmt}", "Komitent: {client}", "Datum izvoda: {date}", "Period: {period}"],
+        "NLB Banka - Izvod za partiju {acct}", "Izvod_{stmt}.pdf", "562",
+    ),
+    BankProfile(
+        "rbbh", "info.rbbh@rbbh.ba", "Raiffeisen Bank",
+        ["Raiffeisen Bank d.d. Bosna i Hercegovina", "Izvod za komitenta broj: {stmt}",
+         "Komitent: {client}", "Datum: {date}", "Račun: {acct}"],
+        "Raiffeisen izvod", "izvod-{acct}-{stmt}.pdf", "161",
+    ),
+    BankProfile(
+        "unicredit", "izvodi.pravne@unicreditgroup.ba", "UniCredit Bank",
+        ["UniCredit Bank d.d. Mostar", "IZVADAK / IZVOD br: {stmt}", "Račun: {acct}",
+         "Vlasnik računa: {client}", "Datum: {date}"],
+        "UniCredit Bank - elektronski izvod", "IZVOD_{stmt}.pdf", "338",
+    ),
+    BankProfile(
+        "atos", "back.office@atosbank.ba", "Atos Bank",
+        ["ATOS BANK a.d. Banja Luka", "IZVOD BR. {stmt}", "Datum: {date}",
+         "Klijent: {client}", "Račun: {acct}"],
+        "Izvod {acct}", "izvod.pdf", "567",
+    ),
+    BankProfile(
+        "procredit", "izvodi@procreditbank.ba", "ProCredit Bank",
+        ["ProCredit Bank d.d. Sarajevo", "Izvod broj: {stmt}", "Klijent: {client}",
+         "Datum: {date}", "Račun: {acct}"],
+        "Izvod po racunu {acct}", "Izvod_{acct}_{stmt}.pdf", "194",
+    ),
+    BankProfile(
+        "asa", "izvodi@asabanka.ba", "ASA Banka",
+        ["ASA Banka d.d. Sarajevo", "IZVOD BROJ: {stmt}", "Račun: {acct}",
+         "Klijent: {client}", "Datum: {date}"],
+        "ASA Banka - dnevni izvod", "izvod_{acct_plain}.pdf", "134", dashed=True,
+    ),
+    BankProfile(
+        "addiko", "izvodi.rs.ba@addiko.com", "Addiko Bank",
+        ["Addiko Bank a.d. Banja Luka", "Izvod broj: {stmt}", "Klijent: {client}",
+         "Datum: {date}"],
+        "Izvod racun: {acct}", "Izvod_{acct}.pdf", "552",
+    ),
+    BankProfile(
+        "ziraat", "ziraatbankbh@bulk.ziraatbank.ba", "Ziraat Bank BH",
+        ["ZIRAAT BANK BH d.d.", "Izvod broj: {stmt}", "Račun: {acct}",
+         "Klijent: {client}", "Datum: {date}"],
+        "Ziraat Bank - izvod", "izvod_{acct}.pdf", "186",
+    ),
+    BankProfile(
+        "sparkasse", "izvodi@sparkasse.ba", "Sparkasse Bank",
+        ["Sparkasse Bank d.d. BiH", "IZVOD BROJ: {stmt}", "Klijent: {client}",
+         "Datum: {date}", "Period: {period}"],
+        "Sparkasse e-izvod", "izvod_{acct}_{stmt}.pdf", "199",
+    ),
+    BankProfile(
+        "nova", "novabanka-eizvodi@novabanka.com", "Nova Banka",
+        ["Nova banka a.d. Banja Luka", "Izvod br. {stmt}", "Klijent: {client}",
+         "Datum: {date}"],
+        "Nova banka - izvod racun: {acct}", "{stmt}_izvod.pdf", "555",
+    ),
+]}
+
+
+class StatementCase:
+    """Jedan sintetički izvod: PDF, email podaci i očekivani broj računa i izvoda."""
+
+    def __init__(self, bank: str, sender: str, subject: str, filename: str,
+                 account: str, statement: str, pages: int, pdf_bytes: bytes):
+        self.bank = bank
+        self.sender = sender
+        self.subject = subject
+        self.filename = filename
+        self.account = account
+        self.statement = statement
+        self.pages = pages
+        self.pdf_bytes = pdf_bytes
+
+    @property
+    def expected(self):
+        """(broj računa, broj izvoda) — isti oblik kao PDFParser.extract_all."""
+        return self.account, self.statement
+
+    def manifest_entry(self) -> dict:
+        return {
+            "bank": self.bank, "sender": self.sender, "subject": self.subject,
+            "filename": self.filename, "account": self.account,
+            "statement": self.statement, "pages": self.pages,
+        }
+
+    def __repr__(self):
+        return f"<StatementCase {self.bank} {self.account}/{self.statement} ({self.pages} str.)>"
+
+
+def _account(rng: random.Random, profile: BankProfile):
+    """Broj računa od 16 cifara; vraća (oblik u izvodu, oblik bez crtica)."""
+    plain = profile.account_prefix + "".join(rng.choice("0123456789") for _ in range(16 - len(profile.account_prefix)))
+    if profile.dashed:
+        return f"{plain[:3]}-{plain[3:6]}-{plain[6:14]}-{plain[14:]}", plain
+    return plain, plain
+
+
+def _amount(value: float) -> str:
+    """Iznos u lokalnom formatu: 1.234,56"""
+    return f"{value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def _transaction_lines(rng: random.Random, count: int, date: str) -> List[str]:
+    lines = []
+    for i in range(count):
+        counterparty = "".join(rng.choice("0123456789") for _ in range(16))
+        amount = _amount(rng.uniform(5, 25000))
+        side = "Duguje" if rng.random() < 0.6 else "Potražuje"
+        lines.append(f"{i + 1:>4}. {date}  {rng.choice(COMPANIES)}")
+        lines.append(f"      Račun primaoca: {counterparty}  {rng.choice(PURPOSES)}")
+        lines.append(f"      {side}: {amount} KM   Ref: {rng.randint(10 ** 9, 10 ** 10 - 1)}")
+    return lines
+
+
+def render_pdf(lines: List[str]) -> bytes:
+    """Pravi PDF sa datim linijama (nova stranica kad se popuni prethodna)."""
+    font = fitz.Font("helv")  # ugrađen font sa č, ć, š, đ, ž
+    doc = fitz.open()
+    try:
+        for start in range(0, max(len(lines), 1), LINES_PER_PAGE):
+            page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+            writer = fitz.TextWriter(page.rect)
+            for row, line in enumerate(lines[start:start + LINES_PER_PAGE]):
+                writer.append((MARGIN_LEFT, MARGIN_TOP + row * LINE_HEIGHT), line, font=font, fontsize=FONT_SIZE)
+            writer.write_text(page)
+        return doc.tobytes(garbage=3, deflate=True)
+    finally:
+        doc.close()
+
+
+def make_case(profile: BankProfile, rng: random.Random, max_pages: int = 3) -> StatementCase:
+    """Pravi jedan izvod banke sa nasumičnim (ali zadatim seed-om određenim) podacima."""
+    acct, acct_plain = _account(rng, profile)
+    stmt = str(rng.randint(1, 365))
+    day, month = rng.randint(1, 28), rng.randint(1, 12)
+    date = f"{day:02d}.{month:02d}.2026"
+    fields = {
+        "stmt": stmt, "acct": acct, "acct_plain": acct_plain, "date": date,
+        "period": f"01.{month:02d}.2026 - {date}",
+        "client": rng.choice(COMPANIES),
+    }
+
+    pages = rng.randint(1, max(1, max_pages))
+    header = [line.format(**fields) for line in profile.header] + [""]
+    body_lines = pages * LINES_PER_PAGE - len(header) - 4
+    lines = header + _transaction_lines(rng, max(1, body_lines // 3), date)
+    lines += ["", f"Prethodno stanje: {_amount(rng.uniform(0, 1e5))} KM",
+              f"Novo stanje: {_amount(rng.uniform(0, 1e5))} KM"]
+
+    return StatementCase(
+        bank=profile.bank,
+        sender=profile.from_header,
+        subject=profile.subject.format(**fields),
+        filename=profile.filename.format(**fields),
+        account=acct,
+        statement=stmt,
+        pages=pages,
+        pdf_bytes=render_pdf(lines),
+    )
+
+
+def build_corpus(per_bank: int = 10, seed: int = 2026, max_pages: int = 3,
+                 banks: Optional[List[str]] = None) -> List[StatementCase]:
+    """
+    Pravi korpus izvoda za sve (ili date) banke.
+
+    Args:
+        per_bank: Broj izvoda po banci
+        seed: Seed generatora (isti seed daje isti korpus)
+        max_pages: Najveći broj stranica izvoda
+        banks: Nazivi banaka (podrazumijevano sve iz PROFILES)
+
+    Returns:
+        Lista StatementCase objekata
+    """
+    rng = random.Random(seed)
+    cases = []
+    for bank in banks or list(PROFILES):
+        profile = PROFILES[bank]
+        cases += [make_case(profile, rng, max_pages) for _ in range(per_bank)]
+    return cases
+
+
+def save_corpus(cases: List[StatementCase], directory) -> Path:
+    """Snima PDF-ove i manifest.json u folder; vraća putanju manifesta."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    entries = []
+    for i, case in enumerate(cases):
+        entry = case.manifest_entry()
+        entry["file"] = f"{i:04d}_{case.bank}.pdf"
+        (directory / entry["file"]).write_bytes(case.pdf_bytes)
+        entries.append(entry)
+    manifest = directory / MANIFEST_FILE
+    manifest.write_text(json.dumps({"cases": entries}, ensure_ascii=False, indent=2), encoding="utf-8")
+    return manifest
+
+
+def load_corpus(directory) -> List[StatementCase]:
+    """Učitava korpus koji je snimio save_corpus."""
+    directory = Path(directory)
+    data = json.loads((directory / MANIFEST_FILE).read_text(encoding="utf-8"))
+    cases = []
+    for entry in data["cases"]:
+        cases.append(StatementCase(
+            bank=entry["bank"], sender=entry["sender"], subject=entry["subject"],
+            filename=entry["filename"], account=entry["account"], statement=entry["statement"],
+            pages=entry.get("pages", 1), pdf_bytes=(directory / entry["file"]).read_bytes(),
+        ))
+    return cases
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    corpus = build_corpus(int(sys.argv[2]) if len(sys.argv) > 2 else 10,
+                          int(sys.argv[3]) if len(sys.argv) > 3 else 2026)
+    print(f"📄 {len(corpus)} izvoda snimljeno: {save_corpus(corpus, sys.argv[1])}")
@@ -0,0 +1,750 @@
+"""
+Asyncio IMAP klijent — alternativa EmailFetcher-u (imaplib).
+
+Sve konekcije dijele jedan event loop, a FETCH komande jedne konekcije
+se šalju jedna za drugom bez čekanja odgovora (pipelining), pa broj
+naloga i poruka ne zahtijeva po jednu blokiranu nit za svaki round-trip.
+
+Odgovori se vraćaju u istom obliku kao kod imaplib-a ((status, data),
+literali kao (tekst, bytes)), tako da se parseri iz email_fetcher
+(BODYSTRUCTURE, FETCH) koriste bez izmjena.
+"""
+import asyncio
+import base64
+import email
+import re
+import ssl
+import threading
+from collections import deque
+from datetime import datetime
+from email.message import Message
+from typing import AsyncIterator, Callable, Deque, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+from wizvod.core.crypto import decrypt_secret
+from wizvod.core.email_fetcher import (
+    EmailFetcher,
+    FETCH_CHUNK_SIZE,
+    SEARCH_CHUNK_SIZE,
+    _HEADER_FIELDS,
+    _SenderMatcher,
+    _build_or_criteria,
+    _clean_sender,
+    _decode_parts,
+    _find_pdf_parts,
+    _parse_fetch_response,
+    _parse_message,
+)
+from wizvod.core.logger import get_logger
+
+log = get_logger("imap")
+
+# Maksimalan broj FETCH komandi "u letu" na jednoj konekciji
+PIPELINE_DEPTH = 16
+
+# Timeout za povezivanje i pojedinačnu komandu (sekunde)
+DEFAULT_TIMEOUT = 60
+
+# Maksimalna dužina jedne linije odgovora (BODYSTRUCTURE za grupu poruka zna biti dugačak)
+_LINE_LIMIT = 16 * 1024 * 1024
+
+_LITERAL_RE = re.compile(rb"\{(\d+)\}$")
+_UNTAGGED_STATUS_RE = re.compile(rb"^\* (\d+) ([A-Z-]+)(?: (.*))?$", re.S)
+_UNTAGGED_RE = re.compile(rb"^\* ([A-Z-]+)(?: (.*))?$", re.S)
+_RESP_CODE_RE = re.compile(rb"\[([A-Z-]+)(?: ([^\]]*))?\]")
+_FETCH_UID_RE = re.compile(rb"[( ]UID (\d+)", re.I)
+
+# Neoznačeni odgovori koje komanda prima; None = svi osim FETCH (npr. SELECT, CAPABILITY)
+_EXPECT_ALL = None
+_EXPECT_SEARCH = frozenset({"SEARCH"})
+_EXPECT_NONE: FrozenSet[str] = frozenset()
+# Koliko nepozvanih odgovora po tipu se čuva u AsyncImapClient.untagged
+_UNSOLICITED_KEEP = 100
+
+
+class AsyncImapError(Exception):
+    """Greška IMAP servera (NO/BAD) ili prekinuta konekcija."""
+    pass
+
+
+def _quote(value: str) -> str:
+    """IMAP quoted string (za LOGIN korisničko ime i lozinku)."""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _uid_ranges(uid_set: str) -> List[Tuple[int, float]]:
+    """IMAP sequence set ("5,7:9,12:*") kao lista (od, do) opsega."""
+    ranges = []
+    for part in uid_set.split(","):
+        lo, _, hi = part.partition(":")
+        bounds = [float("inf") if x == "*" else int(x) for x in (lo, hi or lo)]
+        ranges.append((min(bounds), max(bounds)))
+    return ranges
+
+
+class _Command:
+    """
+    Komanda koja čeka tagovani odgovor; neoznačeni odgovori se skupljaju po tipu (kao imaplib).
+
+    Args:
+        expect: Tipovi neoznačenih odgovora (osim FETCH) koje komanda prima, None = svi
+        uids: UID opsezi UID FETCH/STORE komande — FETCH odgovori se pripisuju po UID-u
+    """
+
+    def __init__(self, tag: str, loop: asyncio.AbstractEventLoop,
+                 expect: Optional[FrozenSet[str]] = _EXPECT_ALL,
+                 uids: Optional[List[Tuple[int, float]]] = None):
+        self.tag = tag
+        self.expect = expect
+        self.uids = uids
+        self.untagged: Dict[str, list] = {}
+        self.future: asyncio.Future = loop.create_future()
+
+    def accepts(self, typ: str) -> bool:
+        return self.expect is None or typ in self.expect
+
+    def wants_uid(self, uid: int) -> bool:
+        return self.uids is not None and any(lo <= uid <= hi for lo, hi in self.uids)
+
+
+class AsyncImapClient:
+    """
+    Minimalni IMAP4rev1 klijent nad asyncio stream-ovima.
+
+    Više komandi može biti poslano prije nego stignu odgovori. FETCH odgovori
+    se pripisuju UID FETCH/STORE komandi koja je tražila taj UID, ostali
+    neoznačeni odgovori najstarijoj komandi koja očekuje taj tip (SEARCH za
+    UID SEARCH, sve za SELECT/CAPABILITY ...). Odgovori koje nijedna komanda
+    ne očekuje (FETCH FLAGS bez UID-a, EXISTS, EXPUNGE ...) idu u `untagged`.
+    """
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self.capabilities: List[str] = []
+        self.untagged: Dict[str, list] = {}  # odgovori van komandi (npr. pozdrav)
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Deque[_Command] = deque()
+        self._continuation: Optional[Callable[[bytes], bytes]] = None
+        self._tag_no = 0
+        self._write_lock = asyncio.Lock()
+        self._closed = False
+
+    async def connect(self, host: str, port: int, use_ssl: bool = True):
+        """Otvara konekciju, čita pozdrav servera i učitava CAPABILITY."""
+        ctx = ssl.create_default_context() if use_ssl else None
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=ctx, limit=_LINE_LIMIT), self.timeout
+        )
+        greeting = await asyncio.wait_for(self._read_response(), self.timeout)
+        first = greeting[0] if greeting and isinstance(greeting[0], bytes) else b""
+        if not first.startswith((b"* OK", b"* PREAUTH")):
+            raise AsyncImapError(f"Neočekivan pozdrav servera: {first[:80]!r}")
+        self._reader_task = asyncio.ensure_future(self._read_loop())
+
+        _, data = await self.command("CAPABILITY")
+        caps = b" ".join(d for d in data.get("CAPABILITY", []) if isinstance(d, bytes))
+        self.capabilities = caps.decode("ascii", "replace").upper().split()
+
+    async def command(self, name: str, *args: str, check: bool = False,
+                      expect: Optional[FrozenSet[str]] = _EXPECT_ALL,
+                      uids: Optional[List[Tuple[int, float]]] = None) -> Tuple[str, Dict[str, list]]:
+        """
+        Šalje komandu i čeka tagovani odgovor.
+
+        Args:
+            expect: Tipovi neoznačenih odgovora (osim FETCH) koje komanda prima, None = svi
+            uids: UID opsezi čiji FETCH odgovori pripadaju komandi
+
+        Returns:
+            (status, {TIP: [podaci, ...]}) — npr. ("OK", {"FETCH": [...], "UIDVALIDITY": [b"12"]})
+        """
+        if self._closed:
+            raise AsyncImapError("Konekcija je zatvorena.")
+        loop = asyncio.get_running_loop()
+        self._tag_no += 1
+        cmd = _Command(f"W{self._tag_no:04d}", loop, expect, uids)
+        line = " ".join([cmd.tag, name] + [str(a) for a in args])
+
+        async with self._write_lock:
+            self._pending.append(cmd)
+            self._writer.write(line.encode("utf-8") + b"\r\n")
+            await self._writer.drain()
+
+        status, text = await asyncio.wait_for(cmd.future, self.timeout)
+        if check and status != "OK":
+            raise AsyncImapError(f"{name} nije uspio: {text}")
+        return status, cmd.untagged
+
+    async def uid(self, name: str, *args: str) -> Tuple[str, list]:
+        """UID komanda sa povratnom vrijednošću kao imaplib.IMAP4.uid: (status, data)."""
+        if name.upper() == "SEARCH":
+            status, untagged = await self.command("UID", name, *args, expect=_EXPECT_SEARCH)
+            return status, untagged.get("SEARCH", [None])
+        # FETCH/STORE: odgovori se prepoznaju po UID-u (prvi argument je UID set)
+        status, untagged = await self.command("UID", name, *args, expect=_EXPECT_NONE,
+                                              uids=_uid_ranges(str(args[0])))
+        return status, untagged.get("FETCH", [None])
+
+    async def login(self, username: str, password: str):
+        await self.command("LOGIN", _quote(username), _quote(password), check=True)
+
+    async def authenticate_xoauth2(self, auth_string: str):
+        """
+        XOAUTH2 autentifikacija (SASL-IR ako server podržava, inače preko continuation odgovora).
+
+        Na odbijen token server šalje izazov sa JSON greškom ("+ <base64>") i
+        čeka praznu liniju prije tagovanog NO — odgovara se na svaki izazov.
+        """
+        encoded = base64.b64encode(auth_string.encode("utf-8")).decode("ascii")
+        args = ["XOAUTH2"]
+        answers = []
+        if "SASL-IR" in self.capabilities:
+            args.append(encoded)
+        else:
+            answers.append(encoded.encode("ascii") + b"\r\n")
+
+        def answer(challenge: bytes) -> bytes:
+            if answers:
+                return answers.pop(0)
+            log.warning(f"XOAUTH2 greška servera: {_xoauth2_error(challenge)}")
+            return b"\r\n"
+
+        self._continuation = answer
+        try:
+            await self.command("AUTHENTICATE", *args, check=True)
+        finally:
+            self._continuation = None
+
+    async def close(self):
+        """LOGOUT i zatvaranje socketa (greške se ignorišu)."""
+        if self._writer is None:
+            return
+        if not self._closed:
+            try:
+                await asyncio.wait_for(self.command("LOGOUT"), 5)
+            except Exception:
+                pass
+        self._closed = True
+        if self._reader_task:
+            self._reader_task.cancel()
+        try:
+            self._writer.close()
+            await self._writer.wait_closed()
+        except Exception:
+            pass
+
+    # ---------- čitanje odgovora ----------
+    async def _read_response(self) -> Optional[list]:
+        """
+        Čita jedan kompletan odgovor (liniju sa svim literalima).
+
+        Returns:
+            Lista kao kod imaplib-a: [(tekst, literal), ..., završni tekst] ili None na kraju konekcije
+        """
+        parts = []
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                return None if not parts else parts
+            line = line.rstrip(b"\r\n")
+            m = _LITERAL_RE.search(line)
+            if not m:
+                parts.append(line)
+                return parts
+            literal = await self._reader.readexactly(int(m.group(1)))
+            parts.append((line, literal))
+
+    async def _read_loop(self):
+        try:
+            while True:
+                parts = await self._read_response()
+                if parts is None:
+                    raise AsyncImapError("Server je zatvorio konekciju.")
+                self._dispatch(parts)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._closed = True
+            for cmd in self._pending:
+                if not cmd.future.done():
+                    cmd.future.set_exception(e if isinstance(e, AsyncImapError) else AsyncImapError(str(e)))
+            self._pending.clear()
+
+    def _dispatch(self, parts: list):
+        first = parts[0][0] if isinstance(parts[0], tuple) else parts[0]
+
+        if first.startswith(b"+"):
+            if self._continuation is not None:
+                self._writer.write(self._continuation(first))
+            else:
+                log.warning(f"Neočekivan continuation odgovor: {first[:80]!r}")
+            return
+
+        if first.startswith(b"* "):
+            self._dispatch_untagged(parts, first)
+            return
+
+        tag, _, rest = first.partition(b" ")
+        status, _, text = rest.partition(b" ")
+        while self._pending:
+            cmd = self._pending.popleft()
+            if cmd.tag.encode("ascii") == tag:
+                self._collect_codes(cmd.untagged, text)
+                if not cmd.future.done():
+                    cmd.future.set_result((status.decode("ascii", "replace").upper(),
+                                           text.decode("utf-8", "replace")))
+                return
+            # komanda bez tagovanog odgovora (ne bi se smjelo desiti) — prekini je
+            if not cmd.future.done():
+                cmd.future.set_exception(AsyncImapError(f"Nema odgovora za {cmd.tag}"))
+        log.warning(f"Tagovani odgovor bez komande: {first[:80]!r}")
+
+    def _dispatch_untagged(self, parts: list, first: bytes):
+        m = _UNTAGGED_STATUS_RE.match(first)
+        if m:
+            typ = m.group(2).decode("ascii").upper()
+            head = m.group(1) + (b" " + m.group(3) if m.group(3) is not None else b"")
+        else:
+            m = _UNTAGGED_RE.match(first)
+            if not m:
+                return
+            typ = m.group(1).decode("ascii").upper()
+            head = m.group(2) or b""
+
+        target = self._target(typ, parts)
+        if typ in ("OK", "NO", "BAD", "PREAUTH", "BYE"):
+            self._collect_codes(target, head)
+        if typ == "BYE":
+            log.info(f"Server je poslao BYE: {head[:80]!r}")
+
+        # Isti raspored kao imaplib: (tekst, literal), ..., ostatak teksta
+        if isinstance(parts[0], tuple):
+            items = [(head, parts[0][1])] + parts[1:]
+        else:
+            items = [head] + parts[1:]
+        bucket = target.setdefault(typ, [])
+        bucket.extend(items)
+        if target is self.untagged and len(bucket) > _UNSOLICITED_KEEP:
+            del bucket[:-_UNSOLICITED_KEEP]  # nepozvani odgovori se ne čitaju — drži samo posljednje
+
+    def _target(self, typ: str, parts: list) -> Dict[str, list]:
+        """Komanda kojoj pripada neoznačeni odgovor (ili self.untagged ako nijedna)."""
+        if typ == "FETCH":
+            text = b" ".join(p[0] if isinstance(p, tuple) else p for p in parts)
+            m = _FETCH_UID_RE.search(text)
+            if m:
+                uid = int(m.group(1))
+                for cmd in self._pending:
+                    if cmd.wants_uid(uid):
+                        return cmd.untagged
+            return self.untagged  # npr. promjena FLAGS koju je napravio drugi klijent
+        for cmd in self._pending:
+            if cmd.accepts(typ):
+                return cmd.untagged
+        return self.untagged
+
+    @staticmethod
+    def _collect_codes(target: Dict[str, list], text: bytes):
+        """Response kodovi ([UIDVALIDITY n], [UIDNEXT n], ...) se pamte kao neoznačeni odgovori."""
+        m = _RESP_CODE_RE.search(text or b"")
+        if m:
+            target.setdefault(m.group(1).decode("ascii").upper(), []).append(m.group(2) or b"")
+
+
+def _xoauth2_error(challenge: bytes) -> str:
+    """Dekodirana JSON greška iz XOAUTH2 izazova ("+ <base64>")."""
+    try:
+        return base64.b64decode(challenge[1:].strip()).decode("utf-8", "replace")
+    except Exception:
+        return challenge[:120].decode("ascii", "replace")
+
+
+class AsyncEmailFetcher:
+    """
+    Asyncio verzija EmailFetcher-a (isti metodi, ali kao korutine).
+
+    fetch_mode:
+        "rfc822"        — preuzima cijelu poruku
+        "bodystructure" — prvo BODYSTRUCTURE, zatim samo PDF dijelovi (BODY.PEEK[n])
+    """
+
+    # Metodi koji ne koriste mrežu dijele se sa EmailFetcher-om
+    extract_attachments = EmailFetcher.extract_attachments
+    get_subject = EmailFetcher.get_subject
+    get_uid = EmailFetcher.get_uid
+
+    def __init__(self, fetch_mode: str = "rfc822", pipeline_depth: int = PIPELINE_DEPTH,
+                 timeout: float = DEFAULT_TIMEOUT):
+        self.imap: Optional[AsyncImapClient] = None
+        self.fetch_mode = fetch_mode
+        self.folder = "INBOX"
+        self.uidvalidity: Optional[int] = None
+        self.timeout = timeout
+        self._depth = max(1, pipeline_depth)
+
+    async def connect_imap(self, account_row: dict):
+        """Povezivanje na IMAP server koristeći podatke iz baze (lozinka ili OAuth2 token)."""
+        host = account_row["imap_host"]
+        port = int(account_row["imap_port"])
+        use_ssl = bool(account_row["use_ssl"])
+        username = account_row["username"] or account_row["email"]
+
+        # OAuth2 token se dobavlja blokirajuće (HTTP) — van event loop-a
+        loop = asyncio.get_running_loop()
+        try:
+            from wizvod.core.email_auth_manager import EmailAuthManager
+            auth_type, token = await loop.run_in_executor(
+                None, EmailAuthManager.get_auth_method, account_row["provider"], username
+            )
+        except Exception as e:
+            log.warning(f"EmailAuthManager nije dostupan: {e}")
+            auth_type, token = ("password", None)
+
+        log.info(f"Povezivanje (asyncio) na {host}:{port} ({'SSL' if use_ssl else 'plain'}) "
+                 f"kao {username} ({auth_type})")
+
+        self.imap = AsyncImapClient(timeout=self.timeout)
+        await self.imap.connect(host, port, use_ssl)
+
+        if auth_type == "xoauth2" and token:
+            try:
+                await self.imap.authenticate_xoauth2(f"user={username}\1auth=Bearer {token}\1\1")
+                log.info("Uspješna XOAUTH2 autentifikacija.")
+            except Exception as e:
+                log.error(f"Neuspješna XOAUTH2 autentifikacija: {e}")
+                raise
+        else:
+            password = decrypt_secret(account_row["secret_encrypted"] or b"")
+            await self.imap.login(username, password)
+
+        await self.select_folder("INBOX")
+
+    async def select_folder(self, folder: str = "INBOX"):
+        """Bira folder i pamti njegov UIDVALIDITY (potreban za inkrementalni sync)."""
+        status, untagged = await self.imap.command("SELECT", _quote(folder))
+        if status != "OK":
+            raise AsyncImapError(f"SELECT {folder} nije uspio.")
+        self.folder = folder
+        self.uidvalidity = None
+        try:
+            data = untagged.get("UIDVALIDITY")
+            if data and data[0]:
+                self.uidvalidity = int(data[0])
+        except Exception as e:
+            log.warning(f"Server nije vratio UIDVALIDITY za {folder}: {e}")
+
+    async def search_messages(self, since: datetime, from_sender: Optional[str], unread_only: bool,
+                              min_uid: int = 0) -> List[Message]:
+        """Pretraga poruka po datumu, pošiljaocu i statusu pročitanosti (vidi EmailFetcher.search_messages)."""
+        criteria = []
+        if from_sender:
+            criteria += ["FROM", _clean_sender(from_sender)]
+
+        uids = await self._uid_search(criteria, since, unread_only, min_uid)
+        if uids is None:
+            return []
+
+        messages = await self._fetch_messages(uids)
+        log.info(f"Pronađeno {len(messages)} poruka.")
+        if not messages:
+            log.warning(f"Nema poruka za pošiljaoca {from_sender} od {since.strftime('%d-%b-%Y')}.")
+        return messages
+
+    async def search_messages_batched(self, since: datetime, senders: List[str], unread_only: bool,
+                                      chunk_size: int = SEARCH_CHUNK_SIZE,
+                                      min_uid: int = 0) -> Dict[str, List[Message]]:
+        """Pretraga za sve pošiljaoce odjednom (vidi EmailFetcher.search_messages_batched)."""
+        result: Dict[str, List[Message]] = {s: [] for s in senders}
+        async for sender, msg in self.iter_messages(since, senders, unread_only,
+                                                    chunk_size=chunk_size, min_uid=min_uid):
+            result[sender].append(msg)
+        return result
+
+    async def iter_messages(self, since: datetime, senders: List[str], unread_only: bool,
+                            chunk_size: int = SEARCH_CHUNK_SIZE,
+                            min_uid: int = 0) -> AsyncIterator[Tuple[str, Message]]:
+        """
+        Pretraga za date pošiljaoce; poruke stižu jedna po jedna (vidi EmailFetcher.iter_messages).
+
+        OR SEARCH komande idu jedna za drugom (istovremene SEARCH komande bi
+        dale neoznačene odgovore koji se ne mogu razlikovati, RFC 3501 5.5), a
+        najviše `pipeline_depth` FETCH komandi je unaprijed u letu.
+        """
+        matcher = _SenderMatcher(senders)
+        if not matcher.cleaned:
+            return
+
+        addresses = list(matcher.cleaned)
+        chunks = [addresses[i:i + chunk_size] for i in range(0, len(addresses), max(1, chunk_size))]
+        uids: List[bytes] = []
+        for chunk in chunks:
+            chunk_uids = await self._uid_search(_build_or_criteria(chunk), since, unread_only, min_uid)
+            for uid in chunk_uids or []:
+                if uid not in uids:
+                    uids.append(uid)
+        log.info(f"Pretraga (asyncio): {len(matcher.cleaned)} pošiljalaca, {len(uids)} poruka.")
+
+        async for msg in self._iter_fetch(uids):
+            sender = matcher.match(msg)
+            if sender is not None:
+                yield sender, msg
+
+    async def _uid_search(self, criteria: List[str], since: datetime, unread_only: bool,
+                          min_uid: int = 0) -> Optional[List[bytes]]:
+        """Izvršava UID SEARCH sa dodatim SINCE/UNSEEN/UID kriterijima. Vraća None ako server javi grešku."""
+        criteria = list(criteria) + ["SINCE", since.strftime("%d-%b-%Y")]
+        if unread_only:
+            criteria += ["UNSEEN"]
+        if min_uid > 0:
+            criteria += ["UID", f"{min_uid}:*"]
+
+        status, data = await self.imap.uid("SEARCH", *criteria)
+        if status != "OK":
+            log.warning("IMAP search nije vratio rezultate.")
+            return None
+        uids = b" ".join(d for d in data if isinstance(d, bytes)).split()
+        if min_uid > 0:
+            uids = [u for u in uids if int(u) >= min_uid]
+        return uids
+
+    async def _prefetched(self, coros) -> AsyncIterator:
+        """
+        Izvršava korutine redom, uz najviše `pipeline_depth` unaprijed pokrenutih.
+
+        Rezultati se vraćaju istim redom; nova komanda se pokreće tek kad
+        pozivalac preuzme prethodni rezultat, pa memorija ostaje ograničena.
+        """
+        pending: Deque[asyncio.Future] = deque()
+        try:
+            for coro in coros:
+                pending.append(asyncio.ensure_future(coro))
+                if len(pending) >= self._depth:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _fetch_messages(self, uids: List[bytes]) -> List[Message]:
+        """Preuzima poruke po UID-u u skladu sa `fetch_mode`."""
+        return [msg async for msg in self._iter_fetch(uids)]
+
+    def _iter_fetch(self, uids: List[bytes]) -> AsyncIterator[Message]:
+        if self.fetch_mode == "bodystructure":
+            return self._iter_pdf_only(uids)
+        return self._iter_rfc822(uids)
+
+    async def _fetch_one_rfc822(self, uid: bytes) -> Optional[Message]:
+        status, data = await self.imap.uid("FETCH", uid.decode("ascii"), "(RFC822)")
+        if status != "OK" or not data:
+            return None
+        # uz poruku mogu stići i FLAGS odgovori za isti UID — uzima se onaj sa literalom
+        for item in data:
+            if isinstance(item, tuple) and b"RFC822" in item[0].upper():
+                # MIME parsiranje i dekodiranje priloga van event loop-a, da velik
+                # izvod ne zaustavi IMAP promet ostalih naloga na istom loop-u
+                return await asyncio.get_running_loop().run_in_executor(None, _parse_message, item[1], uid)
+        return None
+
+    async def _iter_rfc822(self, uids: List[bytes]) -> AsyncIterator[Message]:
+        """Preuzima kompletne poruke po UID-u (pipelined); od svake ostaju samo headeri i PDF prilozi."""
+        async for msg in self._prefetched(self._fetch_one_rfc822(uid) for uid in uids):
+            if msg is not None:
+                yield msg
+
+    async def _iter_pdf_only(self, uids: List[bytes]) -> AsyncIterator[Message]:
+        """
+        Preuzima samo headere i PDF dijelove poruka (vidi EmailFetcher._iter_pdf_only).
+
+        BODYSTRUCTURE se traži po grupi UID-ova, a BODY.PEEK[n] komande idu
+        pipelined, najviše `pipeline_depth` unaprijed.
+        """
+        for i in range(0, len(uids), FETCH_CHUNK_SIZE):
+            chunk = uids[i:i + FETCH_CHUNK_SIZE]
+            status, data = await self.imap.uid("FETCH", b",".join(chunk).decode("ascii"),
+                                               f"(BODYSTRUCTURE {_HEADER_FIELDS})")
+            if status != "OK":
+                continue
+
+            headers: List[Tuple[bytes, object, list]] = []
+            fallback: List[bytes] = []
+            for items in _parse_fetch_response(data):
+                uid = items.get("UID")
+                if not uid:
+                    continue
+                if "BODYSTRUCTURE" not in items:
+                    continue  # npr. FLAGS odgovor za isti UID
+                uid = uid.encode("ascii")
+                header = next((v for k, v in items.items() if k.startswith("BODY[HEADER")), b"")
+                try:
+                    parts = _find_pdf_parts(items["BODYSTRUCTURE"])
+                except Exception as e:
+                    log.warning(f"Neuspješno čitanje BODYSTRUCTURE za UID {uid!r} ({e}) — preuzimam cijelu poruku.")
+                    fallback.append(uid)
+                    continue
+                headers.append((uid, header, parts))
+
+            attachments = self._prefetched(
+                self._fetch_parts(uid, parts) if parts else self._no_parts() for uid, _, parts in headers
+            )
+            index = 0
+            async for atts in attachments:
+                uid, header, _ = headers[index]
+                headers[index] = None  # header više nije potreban
+                index += 1
+                msg = email.message_from_bytes(header if isinstance(header, bytes) else header.encode())
+                msg._wiz_uid = uid
+                msg._wiz_attachments = atts
+                yield msg
+            async for msg in self._iter_rfc822(fallback):
+                yield msg
+
+    @staticmethod
+    async def _no_parts() -> List[Tuple[str, bytes]]:
+        return []
+
+    async def _fetch_parts(self, uid: bytes, parts: List[Tuple[str, str, str]]) -> List[Tuple[str, bytes]]:
+        """Preuzima navedene MIME dijelove jedne poruke bez postavljanja \\Seen."""
+        sections = " ".join(f"BODY.PEEK[{part_id}]" for part_id, _, _ in parts)
+        status, data = await self.imap.uid("FETCH", uid.decode("ascii"), f"({sections})")
+        if status != "OK":
+            return []
+        # dekodiranje priloga je CPU posao — van event loop-a, koji dijele svi nalozi
+        return await asyncio.get_running_loop().run_in_executor(None, _decode_parts, data, parts)
+
+    async def mark_as_read(self, msg: Message):
+        """Označava poruku kao pročitanu (\\Seen)."""
+        uid = getattr(msg, "_wiz_uid", None)
+        if uid:
+            await self.mark_uids_as_read([int(uid)])
+
+    async def mark_uids_as_read(self, uids: List[int], chunk_size: int = FETCH_CHUNK_SIZE):
+        """Označava više poruka kao pročitane jednom UID STORE komandom po grupi."""
+        for i in range(0, len(uids), chunk_size):
+            uid_set = ",".join(str(u) for u in uids[i:i + chunk_size])
+            try:
+                await self.imap.uid("STORE", uid_set, "+FLAGS", "(\\Seen)")
+            except Exception as e:
+                log.warning(f"Neuspješno označavanje poruka: {e}")
+
+    async def close(self):
+        """Sigurno zatvaranje IMAP konekcije."""
+        if self.imap is None:
+            return
+        try:
+            await self.imap.command("CLOSE")
+        except Exception:
+            pass
+        await self.imap.close()
+
+
+async def _anext(agen):
+    """anext() kao korutina (run_coroutine_threadsafe prima samo korutine)."""
+    return await agen.__anext__()
+
+
+class ImapEventLoop:
+    """
+    Jedan asyncio event loop u pozadinskoj niti, zajednički za sve IMAP konekcije.
+
+    Primjer:
+        >>> loop = ImapEventLoop()
+        >>> fetcher = LoopBoundFetcher(loop, AsyncEmailFetcher("bodystructure"))
+        >>> fetcher.connect_imap(acc)   # blokira pozivaoca, I/O ide kroz zajednički loop
+        >>> loop.shutdown()
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="wizvod-imap-loop", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro):
+        """Izvršava korutinu na zajedničkom loop-u i vraća rezultat (poziva se iz drugih niti)."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def shutdown(self):
+        if self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+        if not self._thread.is_alive():
+            self.loop.close()
+
+
+class LoopBoundFetcher:
+    """
+    Sinhroni omotač oko AsyncEmailFetcher-a sa interfejsom EmailFetcher-a.
+
+    Omogućava da worker koristi asyncio engine bez izmjena u fazama
+    pipeline-a: pozivi blokiraju samo pozivaoca, a sav mrežni saobraćaj
+    svih naloga ide kroz jedan ImapEventLoop.
+    """
+
+    def __init__(self, loop: ImapEventLoop, fetcher: AsyncEmailFetcher):
+        self._loop = loop
+        self._fetcher = fetcher
+
+    @property
+    def folder(self) -> str:
+        return self._fetcher.folder
+
+    @property
+    def uidvalidity(self) -> Optional[int]:
+        return self._fetcher.uidvalidity
+
+    def connect_imap(self, account_row: dict):
+        self._loop.run(self._fetcher.connect_imap(account_row))
+
+    def select_folder(self, folder: str = "INBOX"):
+        self._loop.run(self._fetcher.select_folder(folder))
+
+    def search_messages(self, since: datetime, from_sender: Optional[str], unread_only: bool,
+                        min_uid: int = 0) -> List[Message]:
+        return self._loop.run(self._fetcher.search_messages(since, from_sender, unread_only, min_uid=min_uid))
+
+    def search_messages_batched(self, since: datetime, senders: List[str], unread_only: bool,
+                                chunk_size: int = SEARCH_CHUNK_SIZE, min_uid: int = 0) -> Dict[str, List[Message]]:
+        return self._loop.run(self._fetcher.search_messages_batched(since, senders, unread_only,
+                                                                    chunk_size=chunk_size, min_uid=min_uid))
+
+    def iter_messages(self, since: datetime, senders: List[str], unread_only: bool,
+                      chunk_size: int = SEARCH_CHUNK_SIZE, min_uid: int = 0) -> Iterator[Tuple[str, Message]]:
+        """Sinhroni generator nad AsyncEmailFetcher.iter_messages (poruka po poruka)."""
+        agen = self._fetcher.iter_messages(since, senders, unread_only, chunk_size=chunk_size, min_uid=min_uid)
+        try:
+            while True:
+                try:
+                    item = self._loop.run(_anext(agen))
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            self._loop.run(agen.aclose())
+
+    def extract_attachments(self, msg: Message) -> List[Tuple[str, bytes]]:
+        return self._fetcher.extract_attachments(msg)
+
+    def get_subject(self, msg: Message) -> str:
+        return self._fetcher.get_subject(msg)
+
+    def get_uid(self, msg: Message) -> Optional[int]:
+        return self._fetcher.get_uid(msg)
+
+    def mark_as_read(self, msg: Message):
+        self._loop.run(self._fetcher.mark_as_read(msg))
+
+    def mark_uids_as_read(self, uids: List[int], chunk_size: int = FETCH_CHUNK_SIZE):
+        self._loop.run(self._fetcher.mark_uids_as_read(uids, chunk_size=chunk_size))
+
+    def close(self):
+        try:
+            self._loop.run(self._fetcher.close())
+        except Exception:
+            pass
@@ -1,33 +1,203 @@
+"""
+Pravila za prepoznavanje broja izvoda i broja računa po banci.
+
+Pravila banaka su deklarativna (rules.json u ovom paketu, vidi declarative.py).
+Korisnička pravila iz ~/.wizvod/bank_rules.json imaju prednost i zamjenjuju
+ugrađena pravila istog naziva. Oba fajla se ponovo učitavaju čim im se
+promijeni mtime, pa worker koji radi duže vrijeme vidi nove banke bez restarta.
+
+Za posebne slučajeve i dalje se može dodati Python modul u ovaj paket i
+upisati u BANK_RULES; ako nijedno pravilo ne odgovara, koristi se generic.py.
+"""
+import re
+import threading
+import time
+from email.utils import parseaddr
 from importlib import import_module
+from pathlib import Path
+
+from wizvod.core.bank_rules.declarative import RuleFormatError, load_rules_file
+from wizvod.core.logger import get_logger
+
+log = get_logger("bank_rules")
+
+BUNDLED_RULES_FILE = Path(__file__).with_name("rules.json")
+USER_RULES_FILE = Path(Path.home() / ".wizvod" / "bank_rules.json")
+
+# Koliko često (sekunde) se provjerava mtime fajlova sa pravilima
+RELOAD_CHECK_SECONDS = 2.0
+
+# Pošiljalac -> Python modul pravila (za pravila koja se ne mogu opisati u JSON-u)
+BANK_RULES = {}
+
+class BankRule:
+    """Modul pravila jedne banke sa unaprijed razriješenim funkcijama i podacima."""
+
+    def __init__(self, module):
+        self.module = module
+        self.name = module.__name__.rsplit(".", 1)[-1]
+        self.version = getattr(module, "RULE_VERSION", 1)
+        self.header_clip = getattr(module, "HEADER_CLIP", None)
+        self.extract_statement_number = getattr(module, "extract_statement_number", lambda *_: None)
+        self.extract_account_number = getattr(module, "extract_account_number", lambda *_: None)
+
+class RuleRegistry:
+    """
+    Registar pravila, gradi se jednom (i ponovo nakon izmjene fajlova sa pravilima).
+
+    Pošiljalac se razrješava preko tačne adrese (dict), a zatim po pravilu
+    "adresa je dio pošiljaoca" — pobjeđuje adresa najvišeg prioriteta (redom:
+    korisnička pravila, ugrađena pravila, BANK_RULES), bez obzira na to gdje
+    se u pošiljaocu nalazi. Jedan kompajlirani regex svih adresa nalazi prvu
+    adresu u tekstu, pa se provjeravaju samo adrese višeg prioriteta od nje.
+    Rezultat se pamti po pošiljaocu.
+    """
+
+    _CACHE_SIZE = 4096
+
+    def __init__(self, rules: dict, declarative=()):
+        self.rules = {}
+        senders = []  # (adresa, pravilo) redom prioriteta
+        for rule in declarative:
+            if rule.name in self.rules:
+                continue  # korisničko pravilo istog naziva je već dodato
+            self.rules[rule.name] = rule
+            senders += [(address, rule) for address in rule.senders]
+        for key, name in rules.items():
+            if name not in self.rules:
+                self.rules[name] = BankRule(import_module(f"wizvod.core.bank_rules.{name}"))
+            senders.append((key.strip().lower(), self.rules[name]))
+        self.generic = BankRule(import_module("wizvod.core.bank_rules.generic"))
+        self.rules.setdefault("generic", self.generic)
+
+        self._exact = {}
+        for address, rule in senders:
+            self._exact.setdefault(address, rule)
+        self._keys = list(dict.fromkeys(address for address, _ in senders))  # redom prioriteta
+        self._priority = {key: i for i, key in enumerate(self._keys)}
+        self._matcher = re.compile("|".join(re.escape(k) for k in self._keys)) if self._keys else None
+        self._cache = {}
 
-BANK_RULES = {
-    # postojeći
-    "homebank@nlb-rs.ba": "nlb_rs",
-    "info.rbbh@rbbh.ba": "rbbh",
-    "izvodi.pravne@unicreditgroup.ba": "unicredit",
-    # novi
-    "back.office@atosbank.ba": "atos",
-    "izvodi@procreditbank.ba": "procredit",
-    "izvodi@asabanka.ba": "asa",
-    "izvodi.rs.ba@addiko.com": "addiko",
-    "ziraatbankbh@bulk.ziraatbank.ba": "ziraat",
-    "izvodi@sparkasse.ba": "sparkasse",
-    "novabanka-eizvodi@novabanka.com": "nova",
-}
+    def resolve(self, sender_email: str):
+        if not sender_email:
+            return self.generic
+        rule = self._cache.get(sender_email)
+        if rule is None:
+            rule = self._lookup(sender_email.strip().lower())
+            if len(self._cache) >= self._CACHE_SIZE:
+                self._cache.clear()
+            self._cache[sender_email] = rule
+        return rule
+
+    def _lookup(self, sender: str):
+        rule = self._exact.get(parseaddr(sender)[1])
+        if rule is not None:
+            return rule
+        m = self._matcher.search(sender) if self._matcher else None
+        if m is None:
+            return self.generic
+        # regex vraća adresu koja se prva pojavljuje u tekstu, ne onu najvišeg prioriteta
+        for key in self._keys[:self._priority[m.group(0)]]:
+            if key in sender:
+                return self._exact[key]
+        return self._exact[m.group(0)]
+
+def _rule_files(include_user: bool = True):
+    return [USER_RULES_FILE, BUNDLED_RULES_FILE] if include_user else [BUNDLED_RULES_FILE]
+
+def _files_signature():
+    signature = []
+    for path in _rule_files():
+        try:
+            signature.append(path.stat().st_mtime_ns)
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+def _build_registry(include_user: bool = True) -> RuleRegistry:
+    declarative = []
+    for path in _rule_files(include_user):
+        if path.exists():
+            declarative += load_rules_file(path)
+    return RuleRegistry(BANK_RULES, declarative)
+
+_registry = None
+_signature = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+def get_registry() -> RuleRegistry:
+    """
+    Zajednički registar pravila.
+
+    Najviše jednom u RELOAD_CHECK_SECONDS provjerava mtime fajlova sa pravilima
+    i ponovo gradi registar ako su promijenjeni. Ako novi fajl nije ispravan,
+    greška se upisuje u log, a nastavlja se sa prethodnim pravilima.
+    """
+    global _registry, _signature, _checked_at
+    now = time.monotonic()
+    if _registry is not None and now - _checked_at < RELOAD_CHECK_SECONDS:
+        return _registry
+
+    with _lock:
+        if _registry is not None and now - _checked_at < RELOAD_CHECK_SECONDS:
+            return _registry
+        _checked_at = now
+        signature = _files_signature()
+        if _registry is None or signature != _signature:
+            try:
+                registry = _build_registry()
+            except RuleFormatError as e:
+                if _registry is None:
+                    # korisnički fajl nije ispravan — kreni sa ugrađenim pravilima
+                    log.error(f"❌ Neispravna korisnička pravila banaka, koristim ugrađena: {e}")
+                    _registry = _build_registry(include_user=False)
+                else:
+                    log.error(f"❌ Pravila banaka nisu ponovo učitana: {e}")
+            else:
+                if _registry is not None:
+                    log.info(f"🔁 Pravila banaka ponovo učitana ({len(registry.rules)} pravila).")
+                _registry = registry
+            _signature = signature
+    return _registry
+
+def reload_registry() -> RuleRegistry:
+    """Odmah ponovo gradi registar (npr. nakon izmjene BANK_RULES)."""
+    global _registry, _signature, _checked_at
+    with _lock:
+        _registry = _build_registry()
+        _signature = _files_signature()
+        _checked_at = time.monotonic()
+    return _registry
 
 def get_parser_by_sender(sender_email: str):
-    if not sender_email:
-        return import_module("wizvod.core.bank_rules.generic")
-    s = sender_email.strip().lower()
-    for key, module_name in BANK_RULES.items():
-        if key.lower() in s:
-            return import_module(f"wizvod.core.bank_rules.{module_name}")
-    return import_module("wizvod.core.bank_rules.generic")
+    return get_registry().resolve(sender_email).module
+
+def get_rule_info(sender_email: str):
+    """
+    Naziv i verzija pravila koje se koristi za pošiljaoca, npr. ("sparkasse", 1).
+
+    Svako pravilo ima verziju (RULE_VERSION u modulu, "version" u JSON-u);
+    povećanje verzije poništava keširane rezultate parsiranja samo za PDF-ove te banke.
+    """
+    rule = get_registry().resolve(sender_email)
+    return rule.name, rule.version
+
+def get_header_clip(sender_email: str):
+    """
+    Pravougaonik zaglavlja prve stranice (x0, y0, x1, y1 u PDF tačkama) za banku pošiljaoca.
+
+    Pravilo ga može zadati kao HEADER_CLIP (modul) ili "header_clip" (JSON);
+    bez njega se čita cijela prva stranica.
+    """
+    return get_registry().resolve(sender_email).header_clip
+
+def all_rule_versions():
+    """Trenutne verzije svih pravila: {naziv pravila: verzija}."""
+    return {name: rule.version for name, rule in get_registry().rules.items()}
 
 def extract_statement_number(sender_email: str, text: str):
-    parser = get_parser_by_sender(sender_email)
-    return getattr(parser, "extract_statement_number", lambda *_: None)(text)
+    return get_registry().resolve(sender_email).extract_statement_number(text)
 
 def extract_account_number(sender_email: str, text: str, subject: str, filename: str):
-    parser = get_parser_by_sender(sender_email)
-    return getattr(parser, "extract_account_number", lambda *_: None)(text, subject, filename)
+    return get_registry().resolve(sender_email).extract_account_number(text, subject, filename)
@@ -0,0 +1,129 @@
+"""
+Deklarativna pravila banaka (JSON).
+
+Primjer pravila:
+    {
+      "name": "sparkasse",
+      "version": 1,
+      "senders": ["izvodi@sparkasse.ba"],
+      "statement": [
+        {"pattern": "IZVOD\\s*(?:BROJ)?[: ]*(\\d+)", "ignore_case": true}
+      ],
+      "account": [
+        {"sources": ["subject"], "pattern": "racun[: ]*([0-9]{8,})", "ignore_case": true},
+        {"sources": ["filename"], "pattern": "([0-9]{8,})"}
+      ],
+      "header_clip": [0, 0, 595, 200]
+    }
+
+- statement: patterni se probaju redom nad tekstom PDF-a
+- account: koraci se probaju redom; svaki korak probava svoj pattern nad
+  izvorima iz "sources" (subject, text, filename) tim redom
+- "head_lines" (opciono, na koraku) ograničava tekst na prvih n linija
+- vraća se prva grupa patterna, ili cijelo podudaranje ako pattern nema grupu
+- "version" se povećava pri svakoj izmjeni (poništava keš parsiranja te banke)
+"""
+import json
+import re
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+SOURCES = ("subject", "text", "filename")
+
+
+class RuleFormatError(ValueError):
+    """Neispravan fajl ili pravilo."""
+    pass
+
+
+def _compile(step: dict, where: str) -> re.Pattern:
+    pattern = step.get("pattern")
+    if not isinstance(pattern, str) or not pattern:
+        raise RuleFormatError(f"{where}: nedostaje 'pattern'")
+    try:
+        return re.compile(pattern, re.IGNORECASE if step.get("ignore_case") else 0)
+    except re.error as e:
+        raise RuleFormatError(f"{where}: neispravan pattern {pattern!r}: {e}")
+
+
+def _head(text: str, head_lines: Optional[int]) -> str:
+    if not head_lines:
+        return text
+    return "\n".join(text.splitlines()[:head_lines])
+
+
+def _value(m: re.Match) -> str:
+    return m.group(1) if m.re.groups else m.group(0)
+
+
+class DeclarativeRule:
+    """Pravilo banke iz JSON-a, kompajlirano jednom (isti interfejs kao modul pravila)."""
+
+    def __init__(self, spec: dict, origin: str = "?"):
+        name = spec.get("name")
+        if not isinstance(name, str) or not name:
+            raise RuleFormatError(f"{origin}: pravilo bez 'name'")
+        where = f"{origin}:{name}"
+
+        self.name = name
+        self.version = int(spec.get("version", 1))
+        self.senders = [s.strip().lower() for s in spec.get("senders", []) if isinstance(s, str) and s.strip()]
+        if not self.senders:
+            raise RuleFormatError(f"{where}: nedostaje 'senders'")
+
+        clip = spec.get("header_clip")
+        self.header_clip: Optional[Tuple[float, float, float, float]] = tuple(clip) if clip else None
+        if self.header_clip is not None and len(self.header_clip) != 4:
+            raise RuleFormatError(f"{where}: 'header_clip' mora imati 4 broja")
+
+        self.statement_steps: List[Tuple[re.Pattern, Optional[int]]] = []
+        for i, step in enumerate(spec.get("statement", [])):
+            self.statement_steps.append((_compile(step, f"{where}.statement[{i}]"), step.get("head_lines")))
+
+        self.account_steps: List[Tuple[str, re.Pattern, Optional[int]]] = []
+        for i, step in enumerate(spec.get("account", [])):
+            pattern = _compile(step, f"{where}.account[{i}]")
+            sources = step.get("sources") or list(SOURCES)
+            for source in sources:
+                if source not in SOURCES:
+                    raise RuleFormatError(f"{where}.account[{i}]: nepoznat izvor {source!r} (dozvoljeno: {SOURCES})")
+                self.account_steps.append((source, pattern, step.get("head_lines")))
+
+        self.module = self  # kompatibilnost sa get_parser_by_sender (ranije je vraćao modul)
+
+    def extract_statement_number(self, text: str) -> Optional[str]:
+        text = text or ""
+        for pattern, head_lines in self.statement_steps:
+            m = pattern.search(_head(text, head_lines))
+            if m:
+                return _value(m)
+        return None
+
+    def extract_account_number(self, text: str, subject: str, filename: str) -> Optional[str]:
+        values = {"subject": subject or "", "text": text or "", "filename": filename or ""}
+        for source, pattern, head_lines in self.account_steps:
+            m = pattern.search(_head(values[source], head_lines))
+            if m:
+                return _value(m)
+        return None
+
+    def __repr__(self):
+        return f"<DeclarativeRule {self.name} v{self.version}>"
+
+
+def load_rules_file(path: Path) -> List[DeclarativeRule]:
+    """
+    Učitava i kompajlira pravila iz JSON fajla.
+
+    Raises:
+        RuleFormatError: Ako fajl ili neko pravilo nije ispravno
+    """
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        raise RuleFormatError(f"{path}: {e}")
+
+    specs = data.get("rules") if isinstance(data, dict) else data
+    if not isinstance(specs, list):
+        raise RuleFormatError(f"{path}: očekivana lista 'rules'")
+    return [DeclarativeRule(spec, origin=Path(path).name) for spec in specs]
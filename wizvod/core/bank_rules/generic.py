@@ -1,22 +1,29 @@
 import re
 from typing import Optional
 
+RULE_VERSION = 1
+
+_STMT_PATTERNS = [
+    re.compile(r"Izvod\s+broj[: ]+(\d{1,6})(?!\.)", re.IGNORECASE),
+    re.compile(r"IZVOD\s+BROJ[: ]+(\d{1,6})(?!\.)", re.IGNORECASE),
+    re.compile(r"IZVOD[^0-9]{0,10}(\d{1,6})(?!\.)", re.IGNORECASE),
+]
+_ACCT_RE = re.compile(r"\b(\d{16})\b")
+_ACCT_RE_2 = re.compile(r"\b(\d{3}-\d{3}-\d{8}-\d{2}|\d{3}-\d{8,})\b")
+
+
 def extract_statement_number(text: str) -> Optional[str]:
     head = "\n".join((text or "").splitlines()[:60])
-    for pat in [
-        r"Izvod\s+broj[: ]+(\d{1,6})(?!\.)",
-        r"IZVOD\s+BROJ[: ]+(\d{1,6})(?!\.)",
-        r"IZVOD[^0-9]{0,10}(\d{1,6})(?!\.)"
-    ]:
-        m = re.search(pat, head, re.IGNORECASE)
+    for pat in _STMT_PATTERNS:
+        m = pat.search(head)
         if m:
             return m.group(1)
     return None
 
 def extract_account_number(text: str, subject: str, filename: str) -> Optional[str]:
     for source in [subject or "", text or "", filename or ""]:
-        m = re.search(r"\b(\d{16})\b", source)
+        m = _ACCT_RE.search(source)
         if m: return m.group(1)
-        m = re.search(r"\b(\d{3}-\d{3}-\d{8}-\d{2}|\d{3}-\d{8,})\b", source)
+        m = _ACCT_RE_2.search(source)
         if m: return m.group(1)
     return None
@@ -1,7 +1,10 @@
 import os
+import sys
 import base64
-import hashlib
-import hmac
+import secrets
+import threading
+from functools import lru_cache
+from pathlib import Path
 from typing import Optional
 from cryptography.fernet import Fernet, InvalidToken
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
@@ -11,13 +14,26 @@ from cryptography.hazmat.primitives import hashes
 # 1) WIZVOD_KEY_B64  -> urlsafe base64-encoded 32-byte key ZA FERNET (preporučeno)
 # 2) WIZVOD_KEY_PASSPHRASE -> ljudski čitljiv passphrase; derivira se key (ako nema #1)
 # Ako nema ni #1 ni #2 -> rad bez enkripcije (plain, kompatibilno sa ranijim ponašanjem)
+# WIZVOD_KEY_CACHE=0 -> ključ izveden iz passphrase-a se ne pamti na disku (ni na Windows-u)
 
 _ENV_KEY_B64 = "WIZVOD_KEY_B64"
 _ENV_PASSPHRASE = "WIZVOD_KEY_PASSPHRASE"
+_ENV_KEY_CACHE = "WIZVOD_KEY_CACHE"
 # Salt je fiksan u appu (možeš promijeniti po izdanju); cilj je imati deterministički key iz passphrase
 _KDF_SALT = b"wizvod-kdf-salt-v1"
 _KDF_ITER = 200_000
 
+# Na Windows-u se izveden ključ pamti zaštićen DPAPI-jem (CryptProtectData, vezan
+# za Windows korisnika), pa PBKDF2 (~0.3 s CPU) plaća samo prvo pokretanje nakon
+# promjene passphrase-a. Na ostalim sistemima ključ ostaje samo u memoriji procesa.
+KEY_CACHE_FILE = Path(Path.home() / ".wizvod" / "cache" / "kdf_key.dpapi")
+# Raniji keš sa ključem u čistom tekstu — briše se
+_LEGACY_KEY_CACHE_FILE = KEY_CACHE_FILE.with_name("kdf_key.json")
+
+# Nasumične tajne ovog korisnika (get_local_secret), npr. za HMAC zapisa u bazi
+LOCAL_SECRET_DIR = Path(Path.home() / ".wizvod" / "cache")
+
+_DPAPI = sys.platform == "win32"
 
 def _derive_key_from_passphrase(passphrase: str) -> bytes:
     """PBKDF2-HMAC-SHA256 -> 32B, zatim urlsafe-base64 za Fernet."""
@@ -55,15 +71,149 @@ def _load_fernet_key() -> Optional[bytes]:
     passphrase = os.getenv(_ENV_PASSPHRASE)
     if passphrase:
         try:
-            return _derive_key_from_passphrase(passphrase)
+            return _cached_passphrase_key(passphrase)
         except Exception:
             return None
 
     return None  # bez enkripcije
 
 
-_FERNET_KEY = _load_fernet_key()
-_FERNET: Optional[Fernet] = Fernet(_FERNET_KEY) if _FERNET_KEY else None
+if _DPAPI:
+    import ctypes
+    from ctypes import wintypes
+
+    class _DataBlob(ctypes.Structure):
+        _fields_ = [("cbData", wintypes.DWORD), ("pbData", ctypes.POINTER(ctypes.c_char))]
+
+    _CRYPTPROTECT_UI_FORBIDDEN = 0x1
+
+
+def _dpapi(data: bytes, entropy: bytes, protect: bool) -> Optional[bytes]:
+    """CryptProtectData / CryptUnprotectData za trenutnog Windows korisnika; None ako ne uspije."""
+    def blob(value: bytes):
+        buf = ctypes.create_string_buffer(value, len(value))
+        return _DataBlob(len(value), ctypes.cast(buf, ctypes.POINTER(ctypes.c_char))), buf
+
+    data_in, _data_buf = blob(data)
+    extra, _extra_buf = blob(entropy)
+    data_out = _DataBlob()
+    fn = ctypes.windll.crypt32.CryptProtectData if protect else ctypes.windll.crypt32.CryptUnprotectData
+    if not fn(ctypes.byref(data_in), None, ctypes.byref(extra), None, None,
+              _CRYPTPROTECT_UI_FORBIDDEN, ctypes.byref(data_out)):
+        return None
+    try:
+        return ctypes.string_at(data_out.pbData, data_out.cbData)
+    finally:
+        ctypes.windll.kernel32.LocalFree(data_out.pbData)
+
+
+def _entropy(passphrase: str) -> bytes:
+    """
+    Dodatna entropija za DPAPI: passphrase, salt i broj iteracija.
+
+    Ako se bilo šta od toga promijeni, CryptUnprotectData ne uspije i ključ se
+    ponovo izvodi — na disku nema oznake iz koje bi se passphrase mogao pogađati.
+    """
+    return _KDF_SALT + f":{_KDF_ITER}:".encode("ascii") + passphrase.encode("utf-8")
+
+
+def _read_cached_key(passphrase: str) -> Optional[bytes]:
+    try:
+        key = _dpapi(KEY_CACHE_FILE.read_bytes(), _entropy(passphrase), protect=False)
+        if key is None or len(base64.urlsafe_b64decode(key)) != 32:
+            return None
+        return key
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cached_key(passphrase: str, key: bytes):
+    """Upisuje ključ zaštićen DPAPI-jem (atomski; fajl čita samo vlasnik)."""
+    blob = _dpapi(key, _entropy(passphrase), protect=True)
+    if blob is None:
+        return
+    try:
+        KEY_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = KEY_CACHE_FILE.with_name(f"{KEY_CACHE_FILE.name}.{os.getpid()}.tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, KEY_CACHE_FILE)
+    except OSError:
+        pass  # keš je samo ubrzanje — ključ je i dalje ispravan
+
+
+def _cached_passphrase_key(passphrase: str) -> bytes:
+    """Ključ iz passphrase-a: iz DPAPI keša ako odgovara (samo Windows), inače PBKDF2."""
+    try:
+        _LEGACY_KEY_CACHE_FILE.unlink()
+    except OSError:
+        pass
+
+    if not _DPAPI or os.getenv(_ENV_KEY_CACHE, "1") == "0":
+        return _derive_key_from_passphrase(passphrase)
+
+    key = _read_cached_key(passphrase)
+    if key is None:
+        key = _derive_key_from_passphrase(passphrase)
+        _write_cached_key(passphrase, key)
+    return key
+
+
+@lru_cache(maxsize=None)
+def get_local_secret(name: str) -> bytes:
+    """
+    Nasumična 32-bajtna tajna ovog korisnika na ovom računaru, pod datim nazivom.
+
+    Služi za HMAC zapisa koje ne smije moći napraviti neko ko samo može pisati
+    u bazu. Na Windows-u se čuva zaštićena DPAPI-jem, inače u fajlu koji čita
+    samo vlasnik (0600). Ako se tajna ne može pročitati, pravi se nova — svi
+    zapisi potpisani starom tada prestaju da važe.
+    """
+    path = LOCAL_SECRET_DIR / f"{name}.secret"
+    entropy = f"wizvod-local-secret:{name}".encode("utf-8")
+    try:
+        stored = path.read_bytes()
+        secret = _dpapi(stored, entropy, protect=False) if _DPAPI else stored
+        if secret is not None and len(secret) == 32:
+            return secret
+    except OSError:
+        pass
+
+    secret = secrets.token_bytes(32)
+    blob = _dpapi(secret, entropy, protect=True) if _DPAPI else secret
+    if blob is not None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # tajna važi do kraja procesa
+    return secret
+
+
+_FERNET: Optional[Fernet] = None
+_FERNET_LOADED = False
+_FERNET_LOCK = threading.Lock()
+
+
+def _get_fernet() -> Optional[Fernet]:
+    """
+    Fernet instanca, kreirana pri prvom encrypt_secret/decrypt_secret (ne pri importu),
+    pa moduli koji samo importuju crypto ne plaćaju izvođenje ključa.
+    """
+    global _FERNET, _FERNET_LOADED
+    if _FERNET_LOADED:
+        return _FERNET
+    with _FERNET_LOCK:
+        if not _FERNET_LOADED:
+            key = _load_fernet_key()
+            _FERNET = Fernet(key) if key else None
+            _FERNET_LOADED = True
+    return _FERNET
 
 
 def encrypt_secret(plaintext: str) -> bytes:
@@ -74,11 +224,12 @@ def encrypt_secret(plaintext: str) -> bytes:
         plaintext = str(plaintext)
     data = plaintext.encode("utf-8")
 
-    if _FERNET is None:
+    fernet = _get_fernet()
+    if fernet is None:
         return data  # bez enkripcije, kompatibilno sa starim ponašanjem
 
     try:
-        return _FERNET.encrypt(data)
+        return fernet.encrypt(data)
     except Exception:
         # u krajnjem slučaju: vrati plaintext (ne ruši app)
         return data
@@ -93,7 +244,8 @@ def decrypt_secret(cipher: bytes) -> str:
     if cipher is None:
         return ""
 
-    if _FERNET is None:
+    fernet = _get_fernet()
+    if fernet is None:
         # nema enkripcije — očekujemo plain
         try:
             return cipher.decode("utf-8")
@@ -102,7 +254,7 @@ def decrypt_secret(cipher: bytes) -> str:
 
     # Probaj prvo kao Fernet
     try:
-        dec = _FERNET.decrypt(cipher)
+        dec = fernet.decrypt(cipher)
         return dec.decode("utf-8")
     except InvalidToken:
         # vjerovatno plain spremljeno bez enkripcije
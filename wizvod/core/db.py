@@ -1,6 +1,12 @@
+import json
+import queue
+import re
 import sqlite3
+import threading
+import time
+import weakref
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 APP_DIR = Path(Path.home() / ".wizvod")
 DB_PATH = APP_DIR / "data" / "wizvod.db"
@@ -8,17 +14,295 @@ DB_PATH = APP_DIR / "data" / "wizvod.db"
 APP_DIR.mkdir(parents=True, exist_ok=True)
 (DB_PATH.parent).mkdir(parents=True, exist_ok=True)
 
+# Podrazumijevana veličina grupe logova po jednoj transakciji
+LOG_BATCH_SIZE = 100
+
+# Najviše poslova upisa koji se izvršavaju u jednoj transakciji (group commit)
+WRITE_GROUP_SIZE = 256
+
+# Koliko sekundi konekcija čeka kad bazu zaključa drugi proces (npr. worker i GUI)
+BUSY_TIMEOUT = 30.0
+
+_DOWNLOADED_INSERT = """
+INSERT OR IGNORE INTO downloaded_statements (client_id, account_number, statement_number, file_path)
+VALUES (?, ?, ?, ?)
+"""
+
+_ATTACHMENT_INSERT = """
+INSERT OR REPLACE INTO attachment_hashes
+(sha256, client_id, statement_number, file_path, rule, rule_version, parser_version)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+_PARSE_CACHE_INSERT = """
+INSERT OR REPLACE INTO parse_cache
+(sha256, rule, inputs_hash, rule_version, parser_version, account_number, statement_number, metadata_json)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_LOG_INSERT = """
+INSERT INTO logs (client_id, subject, sender, statement_number, file_path, status, message, session_id)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def normalize_account(account_number: Optional[str]) -> str:
+    """Svodi broj računa na same cifre (567-651-00001145-06 -> 5676510000114506)."""
+    return re.sub(r"\D", "", account_number or "")
+
+
+class _WriteJob:
+    """Jedan posao upisa u redu ConnectionPool-a."""
+
+    __slots__ = ("fn", "transaction", "done", "result", "error")
+
+    def __init__(self, fn: Callable[[sqlite3.Connection], Any], transaction: bool):
+        self.fn = fn
+        self.transaction = transaction
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class ConnectionPool:
+    """
+    Konekcije prema SQLite bazi: jedna konekcija za čitanje po niti i jedna
+    nit koja izvršava sve upise.
+
+    - reader() vraća konekciju niti koja je poziva (query_only), pa GUI,
+      loaderi u pozadini i niti sinhronizacije čitaju paralelno; uz WAL
+      čitanje ne čeka na upis koji je u toku.
+    - write(fn) šalje posao niti za upis i čeka rezultat. Poslovi koji se
+      nakupe dok traje prethodni commit izvršavaju se u jednoj transakciji
+      (group commit), svaki u svom SAVEPOINT-u, pa greška jednog posla ne
+      poništava ostale. Upisi iz istog procesa se tako nikad ne takmiče za
+      lock baze ("database is locked").
+    - Posao koji ne smije biti u transakciji (VACUUM, executescript) se
+      izvršava sam, sa transaction=False.
+
+    Args:
+        path: Putanja do baze
+        group_size: Najviše poslova u jednoj transakciji
+        setup: Funkcija koja se izvrši nad konekcijom za upis prije pokretanja niti (šema)
+    """
+
+    def __init__(self, path, group_size: int = WRITE_GROUP_SIZE,
+                 setup: Optional[Callable[[sqlite3.Connection], None]] = None):
+        self.path = str(path)
+        self.group_size = max(1, group_size)
+        self.groups = 0  # broj commit-ova (za mjerenje)
+        self._local = threading.local()
+        self._readers: List[Tuple[threading.Thread, sqlite3.Connection]] = []
+        self._readers_lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[_WriteJob]]" = queue.Queue()
+        self._closed = False
+        # provjera _closed i put() u red su atomski — nijedan posao ne ide u red iza oznake za kraj
+        self._state_lock = threading.Lock()
+
+        self._writer = self._connect()
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        if setup is not None:
+            setup(self._writer)
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: transakcije otvara samo nit za upis (BEGIN IMMEDIATE)
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, check_same_thread=False,
+                               isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    # ------------------------------------------------------------
+    # Čitanje
+    # ------------------------------------------------------------
+    def reader(self) -> sqlite3.Connection:
+        """Konekcija za čitanje u trenutnoj niti (u niti za upis: konekcija za upis)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        if threading.current_thread() is self._thread:
+            return self._writer
+        if self._closed:
+            raise sqlite3.ProgrammingError("Baza je zatvorena.")
+
+        conn = self._connect()
+        conn.execute("PRAGMA query_only=ON")
+        self._local.conn = conn
+        with self._readers_lock:
+            # konekcije niti koje su završile se zatvaraju ovdje
+            alive = []
+            for thread, other in self._readers:
+                if thread.is_alive():
+                    alive.append((thread, other))
+                else:
+                    other.close()
+            alive.append((threading.current_thread(), conn))
+            self._readers = alive
+        return conn
+
+    # ------------------------------------------------------------
+    # Upis
+    # ------------------------------------------------------------
+    def write(self, fn: Callable[[sqlite3.Connection], Any], transaction: bool = True):
+        """
+        Izvršava fn(conn) u niti za upis i vraća njen rezultat.
+
+        fn ne smije pozivati commit/rollback — transakciju vodi nit za upis.
+        Poziv iz same niti za upis (ugniježđen upis) izvršava se odmah, u
+        transakciji posla koji ga je pozvao.
+
+        Raises:
+            Izuzetak iz fn, ili grešku commit-a
+        """
+        if threading.current_thread() is self._thread:
+            return fn(self._writer)
+        job = _WriteJob(fn, transaction)
+        with self._state_lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Baza je zatvorena.")
+            self._queue.put(job)
+        return job.wait()
+
+    def _run(self):
+        stop = False
+        while not stop:
+            job = self._queue.get()
+            if job is None:
+                break
+            if not job.transaction:
+                self._run_plain(job)
+                continue
+
+            group, plain = [job], None
+            while len(group) < self.group_size:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    stop = True
+                    break
+                if not job.transaction:
+                    plain = job
+                    break
+                group.append(job)
+
+            self._run_group(group)
+            if plain is not None:
+                self._run_plain(plain)
+        self._writer.close()
+        self._fail_pending()
+
+    def _fail_pending(self):
+        """Poslovi koji su ostali u redu nakon zaustavljanja niti dobijaju grešku umjesto da čekaju zauvijek."""
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if job is not None:
+                job.error = sqlite3.ProgrammingError("Baza je zatvorena.")
+                job.done.set()
+
+    def _run_group(self, group: List[_WriteJob]):
+        conn = self._writer
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for job in group:
+                conn.execute("SAVEPOINT wiz_job")
+                try:
+                    job.result = job.fn(conn)
+                except Exception as e:
+                    job.error = e
+                    conn.execute("ROLLBACK TO wiz_job")
+                conn.execute("RELEASE wiz_job")
+            conn.execute("COMMIT")
+            self.groups += 1
+        except Exception as e:
+            # BEGIN/COMMIT nije uspio — ništa iz grupe nije upisano
+            if conn.in_transaction:
+                try:
+                    conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+            for job in group:
+                if job.error is None:
+                    job.error = e
+        finally:
+            for job in group:
+                job.done.set()
+
+    def _run_plain(self, job: _WriteJob):
+        try:
+            job.result = job.fn(self._writer)
+        except Exception as e:
+            job.error = e
+        finally:
+            job.done.set()
+
+    def close(self):
+        """Završava poslove u redu, zaustavlja nit za upis i zatvara sve konekcije."""
+        with self._state_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout=BUSY_TIMEOUT)
+        with self._readers_lock:
+            readers, self._readers = self._readers, []
+        for _, conn in readers:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
 
 class Database:
     """Centralna SQLite baza podataka za Wizvod aplikaciju."""
 
     def __init__(self):
-        self.conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
-        self.create_tables()
+        self._log_writers: "weakref.WeakSet[LogWriter]" = weakref.WeakSet()
+        self.pool = ConnectionPool(DB_PATH, setup=self._create_tables)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """
+        Konekcija za čitanje u trenutnoj niti (samo SELECT).
+
+        Upisi idu preko write()/execute_write(), kroz nit za upis.
+        """
+        return self.pool.reader()
+
+    def write(self, fn: Callable[[sqlite3.Connection], Any], transaction: bool = True):
+        """Izvršava fn(conn) u niti za upis (vidi ConnectionPool.write) i vraća rezultat."""
+        return self.pool.write(fn, transaction)
+
+    def execute_write(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        """Izvršava jednu izmjenu u niti za upis; vraća kursor (rowcount, lastrowid)."""
+        return self.pool.write(lambda conn: conn.execute(sql, params))
+
+    def executescript(self, script: str):
+        """Izvršava SQL skriptu (npr. CREATE TABLE) van grupne transakcije."""
+        self.pool.write(lambda conn: conn.executescript(script), transaction=False)
 
     def create_tables(self):
-        cur = self.conn.cursor()
+        """Kreira tabele i indekse koji nedostaju."""
+        self.write(self._create_tables, transaction=False)
+
+    def _create_tables(self, conn: sqlite3.Connection):
+        cur = conn.cursor()
+        has_downloaded = cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='downloaded_statements'"
+        ).fetchone() is not None
         cur.executescript("""
         PRAGMA journal_mode=WAL;
         PRAGMA foreign_keys=ON;
@@ -68,22 +352,118 @@ class Database:
             public_key_pem TEXT
         );
 
+        CREATE TABLE IF NOT EXISTS license_verification (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            cache_key TEXT NOT NULL,
+            expires_at TEXT,
+            verified_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS mail_sync_state (
+            account_id INTEGER NOT NULL,
+            folder TEXT NOT NULL DEFAULT 'INBOX',
+            uidvalidity INTEGER NOT NULL,
+            last_uid INTEGER NOT NULL DEFAULT 0,
+            senders_hash TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (account_id, folder),
+            FOREIGN KEY (account_id) REFERENCES mail_accounts(id) ON DELETE CASCADE
+        );
+
+        CREATE TABLE IF NOT EXISTS mail_retry_uids (
+            account_id INTEGER NOT NULL,
+            folder TEXT NOT NULL DEFAULT 'INBOX',
+            uidvalidity INTEGER NOT NULL,
+            uid INTEGER NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (account_id, folder, uid),
+            FOREIGN KEY (account_id) REFERENCES mail_accounts(id) ON DELETE CASCADE
+        );
+
+        CREATE TABLE IF NOT EXISTS downloaded_statements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            client_id INTEGER NOT NULL,
+            account_number TEXT NOT NULL,
+            statement_number TEXT NOT NULL,
+            file_path TEXT,
+            downloaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (client_id, account_number, statement_number),
+            FOREIGN KEY (client_id) REFERENCES clients(id) ON DELETE CASCADE
+        );
+
+        CREATE TABLE IF NOT EXISTS attachment_hashes (
+            sha256 TEXT PRIMARY KEY,
+            client_id INTEGER NOT NULL,
+            statement_number TEXT,
+            file_path TEXT,
+            rule TEXT,
+            rule_version INTEGER,
+            parser_version INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (client_id) REFERENCES clients(id) ON DELETE CASCADE
+        );
+
+        CREATE TABLE IF NOT EXISTS parse_cache (
+            sha256 TEXT NOT NULL,
+            rule TEXT NOT NULL,
+            inputs_hash TEXT NOT NULL,
+            rule_version INTEGER NOT NULL,
+            parser_version INTEGER NOT NULL,
+            account_number TEXT,
+            statement_number TEXT,
+            metadata_json TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (sha256, rule, inputs_hash)
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_attachment_hashes_client ON attachment_hashes(client_id);
         CREATE INDEX IF NOT EXISTS idx_logs_client ON logs(client_id);
         CREATE INDEX IF NOT EXISTS idx_logs_created ON logs(created_at DESC);
         CREATE INDEX IF NOT EXISTS idx_logs_status ON logs(status);
         """)
-        self.conn.commit()
+
+        # kolone dodate nakon prvog izdanja tabele (postojeće baze)
+        self._add_missing_columns(conn, "attachment_hashes", {
+            "rule": "TEXT", "rule_version": "INTEGER", "parser_version": "INTEGER",
+        })
+
+        if not has_downloaded:
+            self._backfill_downloaded_statements(conn)
+
+    @staticmethod
+    def _add_missing_columns(conn: sqlite3.Connection, table: str, columns: Dict[str, str]):
+        """Dodaje kolone koje nedostaju u postojećoj tabeli (ALTER TABLE ... ADD COLUMN)."""
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for name, decl in columns.items():
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+    def _backfill_downloaded_statements(self, conn: sqlite3.Connection):
+        """Jednokratno puni downloaded_statements iz uspješnih logova (postojeće baze)."""
+        rows = conn.execute("""
+            SELECT l.client_id, c.account_number, l.statement_number, l.file_path
+            FROM logs l
+            JOIN clients c ON c.id = l.client_id
+            WHERE l.status = 'ok' AND l.statement_number IS NOT NULL
+            ORDER BY l.id
+        """).fetchall()
+        conn.execute("BEGIN")
+        conn.executemany(_DOWNLOADED_INSERT, [
+            (r["client_id"], normalize_account(r["account_number"]), r["statement_number"], r["file_path"])
+            for r in rows
+        ])
+        conn.execute("COMMIT")
 
     # ============================================================
     # SETTINGS
     # ============================================================
     def save_setting(self, key: str, value: str):
         """Čuva ili ažurira setting u bazi."""
-        self.conn.execute(
+        self.execute_write(
             "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
             (key, value)
         )
-        self.conn.commit()
 
     def set_setting(self, key: str, value: str):
         """Alias za save_setting (kompatibilnost sa starijim kodom)."""
@@ -118,11 +498,24 @@ class Database:
             message: Poruka/opis/greška
             session_id: ID sesije sinhronizacije (NOVO)
         """
-        self.conn.execute("""
-        INSERT INTO logs (client_id, subject, sender, statement_number, file_path, status, message, session_id)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (client_id, subject, sender, stmt_no, file_path, status, message, session_id))
-        self.conn.commit()
+        self.execute_write(_LOG_INSERT, (client_id, subject, sender, stmt_no, file_path, status, message, session_id))
+
+    def log_writer(self, batch_size: int = LOG_BATCH_SIZE, max_delay: float = 2.0) -> "LogWriter":
+        """
+        Vraća baferovani upisivač logova (jedna transakcija po grupi umjesto commit-a po redu).
+
+        Primjer:
+            >>> with db.log_writer() as logs:
+            ...     logs.add(client_id, subject, sender, stmt_no, path, "ok", "Sačuvan", session_id=sid)
+        """
+        writer = LogWriter(self, batch_size=batch_size, max_delay=max_delay)
+        self._log_writers.add(writer)
+        return writer
+
+    def flush_logs(self):
+        """Upisuje sve baferovane logove (npr. prije prebrojavanja na kraju sesije)."""
+        for writer in list(self._log_writers):
+            writer.flush()
 
     def list_logs(self, limit: int = 300) -> List[Dict[str, Any]]:
         """
@@ -168,8 +561,89 @@ class Database:
 
     def clear_logs(self):
         """Briše sve logove iz baze."""
-        self.conn.execute("DELETE FROM logs")
-        self.conn.commit()
+        self.execute_write("DELETE FROM logs")
+
+    # ============================================================
+    # PREUZETI IZVODI (provjera duplikata)
+    # ============================================================
+    def load_downloaded_statements(self) -> set:
+        """Vraća sve preuzete izvode kao skup (client_id, račun, broj izvoda) za provjeru duplikata u memoriji."""
+        cur = self.conn.execute("SELECT client_id, account_number, statement_number FROM downloaded_statements")
+        return {(r[0], r[1], r[2]) for r in cur.fetchall()}
+
+    def add_downloaded_statement(self, client_id: int, account_number: str, stmt_no: str, file_path: str):
+        """Bilježi preuzeti izvod (broj računa se normalizuje na cifre)."""
+        self.execute_write(_DOWNLOADED_INSERT, (client_id, normalize_account(account_number), stmt_no, file_path))
+
+    def clear_downloaded_statements(self, client_id: int = None):
+        """Briše evidenciju preuzetih izvoda i obrađenih priloga (svih ili jednog klijenta) — izvodi će se ponovo preuzeti."""
+        def clear(conn):
+            if client_id is None:
+                conn.execute("DELETE FROM downloaded_statements")
+                conn.execute("DELETE FROM attachment_hashes")
+            else:
+                conn.execute("DELETE FROM downloaded_statements WHERE client_id=?", (client_id,))
+                conn.execute("DELETE FROM attachment_hashes WHERE client_id=?", (client_id,))
+        self.write(clear)
+
+    def load_attachment_hashes(self) -> Dict[str, tuple]:
+        """
+        Vraća registar obrađenih PDF priloga.
+
+        Returns:
+            {sha256: (client_id, broj izvoda, putanja, pravilo, verzija pravila, verzija parsera)}
+        """
+        cur = self.conn.execute("""
+            SELECT sha256, client_id, statement_number, file_path, rule, rule_version, parser_version
+            FROM attachment_hashes
+        """)
+        return {r[0]: tuple(r[1:]) for r in cur.fetchall()}
+
+    # ============================================================
+    # KEŠ PARSIRANJA
+    # ============================================================
+    def get_parse_result(self, key: tuple) -> Optional[tuple]:
+        """
+        Keširani rezultat parsiranja za ključ iz pdf_parser.parse_cache_key.
+
+        Returns:
+            (account_number, statement_number, metadata) ili None ako nema rezultata
+            ili je pravilo/parser u međuvremenu promijenio verziju
+        """
+        sha256, rule, rule_version, parser_version, inputs_hash = key
+        row = self.conn.execute("""
+            SELECT account_number, statement_number, metadata_json FROM parse_cache
+            WHERE sha256=? AND rule=? AND inputs_hash=? AND rule_version=? AND parser_version=?
+        """, (sha256, rule, inputs_hash, rule_version, parser_version)).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2] or "{}")
+
+    def prune_parse_cache(self, current_versions: Dict[str, int], parser_version: int) -> int:
+        """
+        Briše keširane rezultate i registar priloga zastarjelih verzija pravila/parsera.
+
+        Prilog iz registra (attachment_hashes) se preskače bez parsiranja, pa
+        nakon promjene pravila mora ponovo kroz parser. Redovi bez verzije
+        (upisani prije nego što se verzija pamtila) se takođe brišu.
+
+        Returns:
+            Broj obrisanih redova
+        """
+        def prune(conn):
+            deleted = 0
+            for table in ("parse_cache", "attachment_hashes"):
+                deleted += conn.execute(
+                    f"DELETE FROM {table} WHERE parser_version IS NULL OR parser_version != ?"
+                    f" OR rule_version IS NULL",
+                    (parser_version,)
+                ).rowcount
+                for rule, version in current_versions.items():
+                    deleted += conn.execute(
+                        f"DELETE FROM {table} WHERE rule=? AND rule_version != ?", (rule, version)
+                    ).rowcount
+            return deleted
+        return self.write(prune)
 
     def get_logs_count_today(self) -> int:
         """Vraća broj uspješno preuzetih izvoda danas."""
@@ -203,27 +677,24 @@ class Database:
         Returns:
             ID novog klijenta
         """
-        cur = self.conn.execute("""
+        cur = self.execute_write("""
             INSERT INTO clients (name, account_number, bank_code, sender_email, folder_path, duplicate_policy)
             VALUES (?, ?, ?, ?, ?, ?)
         """, (name, account_number, bank_code, sender_email, folder_path, duplicate_policy))
-        self.conn.commit()
         return cur.lastrowid
 
     def update_client(self, client_id: int, name: str, account_number: str, bank_code: str,
                       sender_email: str, folder_path: str, duplicate_policy: str):
         """Ažurira postojeće podatke o klijentu."""
-        self.conn.execute("""
+        self.execute_write("""
             UPDATE clients
             SET name = ?, account_number = ?, bank_code = ?, sender_email = ?, folder_path = ?, duplicate_policy = ?
             WHERE id = ?
         """, (name, account_number, bank_code, sender_email, folder_path, duplicate_policy, client_id))
-        self.conn.commit()
 
     def delete_client(self, client_id: int):
         """Briše klijenta po ID-u."""
-        self.conn.execute("DELETE FROM clients WHERE id = ?", (client_id,))
-        self.conn.commit()
+        self.execute_write("DELETE FROM clients WHERE id = ?", (client_id,))
 
     def get_client(self, client_id: int) -> Optional[Dict[str, Any]]:
         """Vraća jednog klijenta po ID-u."""
@@ -242,26 +713,28 @@ class Database:
     def add_mail_account(self, provider: str, email: str, imap_host: str, imap_port: int,
                          use_ssl: bool, username: str, secret_encrypted: bytes):
         """Dodaje novi IMAP mail nalog u bazu."""
-        self.conn.execute("""
+        self.execute_write("""
             INSERT INTO mail_accounts (provider, email, imap_host, imap_port, use_ssl, username, secret_encrypted)
             VALUES (?, ?, ?, ?, ?, ?, ?)
         """, (provider, email, imap_host, imap_port, int(use_ssl), username, secret_encrypted))
-        self.conn.commit()
 
     def update_mail_account(self, account_id: int, provider: str, email: str, imap_host: str,
                             imap_port: int, use_ssl: bool, username: str, secret_encrypted: bytes):
         """Ažurira postojeći IMAP nalog."""
-        self.conn.execute("""
-            UPDATE mail_accounts
-            SET provider=?, email=?, imap_host=?, imap_port=?, use_ssl=?, username=?, secret_encrypted=?
-            WHERE id=?
-        """, (provider, email, imap_host, imap_port, int(use_ssl), username, secret_encrypted, account_id))
-        self.conn.commit()
+        def update(conn):
+            conn.execute("""
+                UPDATE mail_accounts
+                SET provider=?, email=?, imap_host=?, imap_port=?, use_ssl=?, username=?, secret_encrypted=?
+                WHERE id=?
+            """, (provider, email, imap_host, imap_port, int(use_ssl), username, secret_encrypted, account_id))
+            # Promijenjen server/nalog — UID watermark više ne važi
+            conn.execute("DELETE FROM mail_sync_state WHERE account_id=?", (account_id,))
+            conn.execute("DELETE FROM mail_retry_uids WHERE account_id=?", (account_id,))
+        self.write(update)
 
     def delete_mail_account(self, account_id: int):
         """Briše IMAP nalog po ID-u."""
-        self.conn.execute("DELETE FROM mail_accounts WHERE id=?", (account_id,))
-        self.conn.commit()
+        self.execute_write("DELETE FROM mail_accounts WHERE id=?", (account_id,))
 
     def get_mail_account(self, account_id: int) -> Optional[Dict[str, Any]]:
         """Vraća jedan IMAP nalog po ID-u."""
@@ -274,6 +747,70 @@ class Database:
         cur = self.conn.execute("SELECT * FROM mail_accounts ORDER BY email ASC")
         return [dict(row) for row in cur.fetchall()]
 
+    # ============================================================
+    # MAIL SYNC STATE
+    # ============================================================
+    def get_sync_state(self, account_id: int, folder: str = "INBOX") -> Optional[Dict[str, Any]]:
+        """Vraća UID watermark (uidvalidity, last_uid, senders_hash) za nalog i folder."""
+        cur = self.conn.execute(
+            "SELECT * FROM mail_sync_state WHERE account_id=? AND folder=?",
+            (account_id, folder)
+        )
+        row = cur.fetchone()
+        return dict(row) if row else None
+
+    def save_sync_state(self, account_id: int, folder: str, uidvalidity: int,
+                        last_uid: int, senders_hash: str = None):
+        """Čuva najveći obrađeni UID za nalog i folder."""
+        self.execute_write("""
+            INSERT INTO mail_sync_state (account_id, folder, uidvalidity, last_uid, senders_hash, updated_at)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(account_id, folder) DO UPDATE
+            SET uidvalidity=excluded.uidvalidity, last_uid=excluded.last_uid,
+                senders_hash=excluded.senders_hash, updated_at=excluded.updated_at
+        """, (account_id, folder, uidvalidity, last_uid, senders_hash))
+
+    def clear_sync_state(self, account_id: int = None):
+        """Briše UID watermark (za jedan nalog ili sve) — sljedeći sync radi punu pretragu."""
+        def clear(conn):
+            for table in ("mail_sync_state", "mail_retry_uids"):
+                if account_id is None:
+                    conn.execute(f"DELETE FROM {table}")
+                else:
+                    conn.execute(f"DELETE FROM {table} WHERE account_id=?", (account_id,))
+        self.write(clear)
+
+    def record_retry_uids(self, account_id: int, folder: str, uidvalidity: int,
+                          retry: Iterable[int], done: Iterable[int]) -> Dict[int, int]:
+        """
+        Broji pokušaje za poruke koje nisu raspoređene klijentu (jednom transakcijom).
+
+        Args:
+            retry: UID-ovi koji u ovom pokretanju opet nisu raspoređeni
+            done: UID-ovi obrađeni bez ponovnog pokušaja — brišu se iz evidencije
+
+        Returns:
+            Dictionary {uid: broj pokušaja} za UID-ove iz `retry`
+        """
+        retry = set(retry)
+        done = [(account_id, folder, uid) for uid in set(done) - set(retry)]
+
+        def record(conn):
+            # poruke iz starog UIDVALIDITY-ja više ne postoje pod istim UID-om
+            conn.execute("DELETE FROM mail_retry_uids WHERE account_id=? AND folder=? AND uidvalidity<>?",
+                         (account_id, folder, uidvalidity))
+            conn.executemany("DELETE FROM mail_retry_uids WHERE account_id=? AND folder=? AND uid=?", done)
+            conn.executemany("""
+                INSERT INTO mail_retry_uids (account_id, folder, uidvalidity, uid, attempts, updated_at)
+                VALUES (?, ?, ?, ?, 1, CURRENT_TIMESTAMP)
+                ON CONFLICT(account_id, folder, uid) DO UPDATE
+                SET attempts=attempts + 1, updated_at=excluded.updated_at
+            """, [(account_id, folder, uidvalidity, uid) for uid in sorted(retry)])
+            rows = conn.execute("SELECT uid, attempts FROM mail_retry_uids WHERE account_id=? AND folder=?",
+                                (account_id, folder)).fetchall()
+            return {row[0]: row[1] for row in rows if row[0] in retry}
+        return self.write(record)
+
     # ============================================================
     # LICENSE
     # ============================================================
@@ -287,20 +824,49 @@ class Database:
 
     def save_license(self, license_json: str, public_key_pem: str):
         """Čuva ili ažurira licencu."""
-        self.conn.execute("""
-            INSERT INTO license(id, license_json, public_key_pem) VALUES(1,?,?) 
-            ON CONFLICT(id) DO UPDATE 
-            SET license_json=excluded.license_json, public_key_pem=excluded.public_key_pem
-        """, (license_json, public_key_pem))
-        self.conn.commit()
+        def save(conn):
+            conn.execute("""
+                INSERT INTO license(id, license_json, public_key_pem) VALUES(1,?,?) 
+                ON CONFLICT(id) DO UPDATE 
+                SET license_json=excluded.license_json, public_key_pem=excluded.public_key_pem
+            """, (license_json, public_key_pem))
+            conn.execute("DELETE FROM license_verification")
+        self.write(save)
+
+    def get_license_verification(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Zapamćena uspješna provjera licence, ako važi za dati ključ.
+
+        Returns:
+            Dict sa expires_at i verified_at, ili None ako nema provjere za ovaj ključ
+        """
+        row = self.conn.execute(
+            "SELECT expires_at, verified_at FROM license_verification WHERE id=1 AND cache_key=?",
+            (cache_key,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def save_license_verification(self, cache_key: str, expires_at: Optional[str]):
+        """
+        Pamti uspješnu provjeru potpisa licence.
+
+        expires_at je samo informativan — istek se uvijek čita iz potpisane licence.
+        """
+        self.execute_write("""
+            INSERT OR REPLACE INTO license_verification (id, cache_key, expires_at, verified_at)
+            VALUES (1, ?, ?, CURRENT_TIMESTAMP)
+        """, (cache_key, expires_at))
+
+    def clear_license_verification(self):
+        """Briše zapamćenu provjeru licence (sljedeća provjera ide punim putem)."""
+        self.execute_write("DELETE FROM license_verification")
 
     # ============================================================
     # UTILITY
     # ============================================================
     def vacuum(self):
         """Optimizuje bazu (smanjuje veličinu)."""
-        self.conn.execute("VACUUM")
-        self.conn.commit()
+        self.write(lambda conn: conn.execute("VACUUM"), transaction=False)
 
     def get_stats(self) -> Dict[str, int]:
         """Vraća osnovnu statistiku baze."""
@@ -324,12 +890,107 @@ class Database:
         return stats
 
     def close(self):
-        """Zatvara konekciju."""
+        """Upisuje baferovane logove i zatvara konekcije."""
+        pool = getattr(self, "pool", None)
+        if pool is None:
+            return
+        try:
+            self.flush_logs()
+        except Exception:
+            pass
         try:
-            self.conn.close()
+            pool.close()
         except Exception:
             pass
 
     def __del__(self):
-        """Zatvara konekciju pri uništenju objekta."""
-        self.close()
\ No newline at end of file
+        """Zatvara konekcije pri uništenju objekta."""
+        self.close()
+
+
+class LogWriter:
+    """
+    Baferovani upis u tabelu logs.
+
+    Redovi se skupljaju u memoriji i upisuju jednom transakcijom kad se
+    skupi `batch_size` redova, kad najstariji red čeka duže od `max_delay`
+    sekundi, na flush() ili na izlazu iz `with` bloka.
+    """
+
+    def __init__(self, db: Database, batch_size: int = LOG_BATCH_SIZE, max_delay: float = 2.0):
+        self.db = db
+        self.batch_size = max(1, batch_size)
+        self.max_delay = max_delay
+        self.written = 0
+        self._rows: List[tuple] = []
+        self._downloaded: List[tuple] = []
+        self._attachments: List[tuple] = []
+        self._parsed: List[tuple] = []
+        self._first_at = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, client_id: Optional[int], subject: str, sender: str, stmt_no: str,
+            file_path: str, status: str, message: str, session_id: str = None):
+        """Dodaje log u bafer (argumenti kao kod Database.add_log)."""
+        with self._lock:
+            if not self._rows:
+                self._first_at = time.monotonic()
+            self._rows.append((client_id, subject, sender, stmt_no, file_path, status, message, session_id))
+            full = len(self._rows) >= self.batch_size
+            stale = time.monotonic() - self._first_at >= self.max_delay
+        if full or stale:
+            self.flush()
+
+    def add_downloaded(self, client_id: int, account_number: str, stmt_no: str, file_path: str):
+        """Bilježi preuzeti izvod; upisuje se u istoj transakciji kao i pripadajući log."""
+        with self._lock:
+            self._downloaded.append((client_id, normalize_account(account_number), stmt_no, file_path))
+
+    def add_attachment(self, sha256: str, client_id: int, stmt_no: str, file_path: Optional[str],
+                       rule: Optional[str] = None, rule_version: Optional[int] = None,
+                       parser_version: Optional[int] = None):
+        """Bilježi SHA-256 obrađenog PDF priloga (registar za preskakanje parsiranja) i verzije kojima je obrađen."""
+        with self._lock:
+            self._attachments.append((sha256, client_id, stmt_no, file_path, rule, rule_version, parser_version))
+
+    def add_parse_result(self, key: tuple, acct: Optional[str], stmt_no: Optional[str], metadata: dict):
+        """Kešira rezultat parsiranja (ključ iz pdf_parser.parse_cache_key)."""
+        sha256, rule, rule_version, parser_version, inputs_hash = key
+        with self._lock:
+            self._parsed.append((sha256, rule, inputs_hash, rule_version, parser_version, acct, stmt_no,
+                                 json.dumps(metadata or {}, ensure_ascii=False)))
+
+    def flush(self):
+        """Upisuje sve baferovane redove jednom transakcijom."""
+        with self._lock:
+            rows, self._rows = self._rows, []
+            downloaded, self._downloaded = self._downloaded, []
+            attachments, self._attachments = self._attachments, []
+            parsed, self._parsed = self._parsed, []
+            if not rows and not downloaded and not attachments and not parsed:
+                return
+            def write(conn):
+                conn.executemany(_LOG_INSERT, rows)
+                conn.executemany(_DOWNLOADED_INSERT, downloaded)
+                conn.executemany(_ATTACHMENT_INSERT, attachments)
+                conn.executemany(_PARSE_CACHE_INSERT, parsed)
+            try:
+                self.db.write(write)
+            except Exception:
+                # vrati redove u bafer da se ne izgube pri sljedećem pokušaju
+                self._rows = rows + self._rows
+                self._downloaded = downloaded + self._downloaded
+                self._attachments = attachments + self._attachments
+                self._parsed = parsed + self._parsed
+                raise
+            self.written += len(rows)
+
+    @property
+    def pending(self) -> int:
+        return len(self._rows)
+
+    def __enter__(self) -> "LogWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
\ No newline at end of file
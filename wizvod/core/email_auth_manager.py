@@ -1,4 +1,13 @@
-from wizvod.core.email_providers import gmail_oauth, outlook_oauth, yahoo_oauth
+from importlib import import_module
+
+from wizvod.core.token_cache import get_token_cache
+
+# provider -> modul sa get_token (importuje se tek kad token nije u kešu)
+_PROVIDER_MODULES = {
+    "gmail": "wizvod.core.email_providers.gmail_oauth",
+    "outlook": "wizvod.core.email_providers.outlook_oauth",
+    "yahoo": "wizvod.core.email_providers.yahoo_oauth",
+}
 
 class EmailAuthManager:
     """
@@ -7,19 +16,31 @@ class EmailAuthManager:
     - outlook/hotmail -> OAuth2
     - yahoo -> OAuth2
     - sve ostalo -> klasični IMAP login
+
+    OAuth2 token se uzima iz zajedničkog keša (token_cache.py), koji ga
+    osvježava u pozadini prije isteka; provider modul (msal, google, ...)
+    se učitava samo kad tokena nema u kešu.
     """
     @staticmethod
-    def get_auth_method(provider: str, email: str):
+    def oauth_provider(provider: str):
+        """Ključ OAuth2 providera ("gmail", "outlook", "yahoo") ili None za klasični login."""
         p = (provider or "").lower()
 
         if "gmail" in p:
-            token = gmail_oauth.get_token(email)
-            return ("xoauth2", token)
+            return "gmail"
         elif "outlook" in p or "hotmail" in p or "live" in p:
-            token = outlook_oauth.get_token(email)
-            return ("xoauth2", token)
+            return "outlook"
         elif "yahoo" in p:
-            token = yahoo_oauth.get_token(email)
-            return ("xoauth2", token)
-        else:
+            return "yahoo"
+        return None
+
+    @staticmethod
+    def get_auth_method(provider: str, email: str):
+        key = EmailAuthManager.oauth_provider(provider)
+        if key is None:
             return ("password", None)
+
+        token = get_token_cache().get_access_token(key, email)
+        if not token:
+            token = import_module(_PROVIDER_MODULES[key]).get_token(email)
+        return ("xoauth2", token)
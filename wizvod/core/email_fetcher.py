@@ -1,18 +1,381 @@
 import imaplib
 import email
+import re
+import binascii
+import quopri
+import socket
+import ssl
+import threading
+import time
+import itertools
+from email.feedparser import BytesFeedParser
 from email.message import Message
 from email.header import decode_header, make_header
+from email.utils import decode_rfc2231
+from urllib.parse import unquote
 from datetime import datetime
-from typing import List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
 from wizvod.core.logger import get_logger
 from wizvod.core.crypto import decrypt_secret
 
 log = get_logger("imap")
 
+# Timeout za povezivanje i pojedinačnu IMAP operaciju (sekunde) — mrtva konekcija ne blokira worker
+IMAP_TIMEOUT = 60
+
+# IDLE se obnavlja prije isteka (RFC 2177: server smije prekinuti IDLE nakon 30 min neaktivnosti)
+IDLE_RENEW_SECONDS = 25 * 60
+
+# Razmak između NOOP provjera za servere bez IDLE podrške (sekunde)
+NOOP_POLL_SECONDS = 60
+
+_EXISTS_RE = re.compile(rb"^\* (\d+) EXISTS", re.IGNORECASE)
+
+# Maksimalan broj pošiljalaca u jednoj OR pretrazi (dužina IMAP komande je ograničena na serveru)
+SEARCH_CHUNK_SIZE = 20
+
+
+class _SocketLines:
+    """
+    Čitanje linija direktno sa IMAP socketa, uz timeout po pozivu (za IDLE).
+
+    imaplib čita preko sock.makefile(), a takav fajl nakon isteka timeouta
+    odbija svako dalje čitanje — zato IDLE čita socket sam. Konekcija koja je
+    ušla u IDLE se poslije koristi samo za IDLE i zatvaranje, pa ostatak
+    bafera ne treba vraćati imaplib-u.
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self._buf = b""
+
+    def readline(self, timeout: float) -> Optional[bytes]:
+        """Sljedeća linija (sa CRLF) ili None ako nije stigla za `timeout` sekundi."""
+        deadline = time.monotonic() + timeout
+        previous = self.sock.gettimeout()
+        try:
+            while b"\n" not in self._buf:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self.sock.settimeout(remaining)
+                try:
+                    chunk = self.sock.recv(4096)
+                except (socket.timeout, ssl.SSLWantReadError):
+                    return None
+                if not chunk:
+                    raise imaplib.IMAP4.abort("Server je zatvorio konekciju.")
+                self._buf += chunk
+        finally:
+            self.sock.settimeout(previous)
+        line, _, self._buf = self._buf.partition(b"\n")
+        return line + b"\n"
+
+
+def _clean_sender(sender: str) -> str:
+    """Makni eventualni naziv, uglaste zagrade i razmake (IMAP FROM ne koristi navodnike)."""
+    return sender.strip().lower().replace("<", "").replace(">", "")
+
+
+def _build_or_criteria(senders: List[str]) -> List[str]:
+    """
+    Gradi IMAP kriterij "OR FROM a OR FROM b FROM c" za listu pošiljalaca.
+
+    IMAP OR je binaran, pa za n pošiljalaca ide n-1 OR prefiksa:
+    OR OR FROM a FROM b FROM c  ==  (a ILI b) ILI c
+    """
+    criteria = ["OR"] * (len(senders) - 1)
+    for sender in senders:
+        criteria += ["FROM", sender]
+    return criteria
+
+
+# Broj UID-ova po jednoj FETCH BODYSTRUCTURE komandi
+FETCH_CHUNK_SIZE = 200
+
+# Headeri koji se preuzimaju umjesto cijele poruke u "bodystructure" režimu
+_HEADER_FIELDS = "BODY.PEEK[HEADER.FIELDS (FROM SUBJECT DATE)]"
+
+_TOKEN_RE = re.compile(rb'\(|\)|"(?:[^"\\]|\\.)*"|\{\d+\}$|[^\s()"\[]+(?:\[[^\]]*\])?')
+_OPEN, _CLOSE = object(), object()
+
+
+def _tokenize_fetch_response(data: list) -> List[list]:
+    """
+    Pretvara imaplib FETCH odgovor u listu tokena po poruci.
+
+    imaplib vraća literal ({n}) kao tuple (tekst prije literala, bytes literala),
+    a ostatak odgovora kao zasebne bytes elemente. Atomi i quoted stringovi
+    postaju str, NIL postaje None, a literali ostaju bytes.
+    """
+    responses: List[list] = []
+    current = None
+    for item in data:
+        if item is None:
+            continue
+        text, literal = item if isinstance(item, tuple) else (item, None)
+        if current is None or re.match(rb"^\d+ \(", text):
+            current = []
+            responses.append(current)
+        for m in _TOKEN_RE.finditer(text):
+            tok = m.group(0)
+            if tok == b"(":
+                current.append(_OPEN)
+            elif tok == b")":
+                current.append(_CLOSE)
+            elif tok.startswith(b"{") and tok.endswith(b"}") and literal is not None:
+                current.append(literal)
+            elif tok.startswith(b'"'):
+                current.append(re.sub(rb"\\(.)", rb"\1", tok[1:-1]).decode("utf-8", "replace"))
+            elif tok.upper() == b"NIL":
+                current.append(None)
+            else:
+                current.append(tok.decode("utf-8", "replace"))
+    return responses
+
+
+def _parse_fetch_response(data: list) -> List[Dict[str, object]]:
+    """Parsira FETCH odgovor u listu dictionary-ja {ITEM: vrijednost} (npr. UID, BODYSTRUCTURE, BODY[1])."""
+    result = []
+    for tokens in _tokenize_fetch_response(data):
+        stack: List[list] = [[]]
+        for tok in tokens:
+            if tok is _OPEN:
+                stack.append([])
+            elif tok is _CLOSE:
+                done = stack.pop()
+                stack[-1].append(done)
+            else:
+                stack[-1].append(tok)
+        tree = stack[0]
+        # tree = [seq, [KEY, value, KEY, value, ...]]
+        pairs = next((t for t in tree if isinstance(t, list)), [])
+        items = {}
+        for i in range(0, len(pairs) - 1, 2):
+            key = pairs[i]
+            if isinstance(key, str):
+                items[key.upper()] = pairs[i + 1]
+        result.append(items)
+    return result
+
+
+def _param_dict(params) -> Dict[str, str]:
+    """Lista ["NAME", "x.pdf", ...] iz BODYSTRUCTURE -> {"name": "x.pdf"} (uz RFC 2231 dekodiranje)."""
+    out: Dict[str, str] = {}
+    if not isinstance(params, list):
+        return out
+    for i in range(0, len(params) - 1, 2):
+        key, value = params[i], params[i + 1]
+        if isinstance(value, bytes):
+            value = value.decode("utf-8", "replace")
+        if not isinstance(key, str) or not isinstance(value, str):
+            continue
+        key = key.lower()
+        if key.endswith("*"):
+            try:
+                charset, _, text = decode_rfc2231(value)
+                value = unquote(text, encoding=charset or "utf-8", errors="replace")
+            except Exception:
+                pass
+            key = key.rstrip("*")
+        out[key] = value
+    return out
+
+
+def _disposition(part: list, maintype: str, subtype: str) -> Tuple[Optional[str], Dict[str, str]]:
+    """Vraća (disposition, parametri) iz proširenih polja jednog dijela BODYSTRUCTURE-a."""
+    # Pozicija disposition polja zavisi od tipa (RFC 3501, 7.4.2)
+    if maintype == "text":
+        index = 9
+    elif maintype == "message" and subtype == "rfc822":
+        index = 11
+    else:
+        index = 8
+    candidates = [part[index]] if len(part) > index else []
+    candidates += part[7:]
+    for c in candidates:
+        if isinstance(c, list) and c and isinstance(c[0], str) and c[0].lower() in ("attachment", "inline"):
+            return c[0].lower(), _param_dict(c[1] if len(c) > 1 else None)
+    return None, {}
+
+
+def _find_pdf_parts(structure: list, prefix: str = "") -> List[Tuple[str, str, str]]:
+    """
+    Pronalazi PDF dijelove u BODYSTRUCTURE stablu.
+
+    Returns:
+        Lista (broj dijela npr. "2" ili "1.3", ime fajla, transfer encoding)
+    """
+    if structure and isinstance(structure[0], list):
+        # Multipart: djeca su samo liste prije podtipa ("MIXED"); iza njega su
+        # proširena polja (parametri, disposition, jezik), koja nisu dijelovi
+        parts = []
+        for i, child in enumerate(itertools.takewhile(lambda c: isinstance(c, list), structure)):
+            part_id = f"{prefix}.{i + 1}" if prefix else str(i + 1)
+            parts += _find_pdf_parts(child, part_id)
+        return parts
+
+    maintype = (structure[0] or "").lower()
+    subtype = (structure[1] or "").lower()
+    encoding = (structure[5] or "7bit").lower() if len(structure) > 5 else "7bit"
+    _, disp_params = _disposition(structure, maintype, subtype)
+    filename = disp_params.get("filename") or _param_dict(structure[2]).get("name")
+    if filename:
+        try:
+            filename = str(make_header(decode_header(filename)))
+        except Exception:
+            pass
+
+    is_pdf = (maintype, subtype) == ("application", "pdf") or (filename or "").lower().endswith(".pdf")
+    if not is_pdf:
+        return []
+    return [(prefix or "1", filename or "attachment.pdf", encoding)]
+
+
+# Veličina komada kojima se preuzeta poruka predaje parseru
+DECODE_CHUNK_SIZE = 64 * 1024
+
+
+def _decode_base64(encoded: bytes) -> bytes:
+    """
+    Dekodira base64 dio (BODY[n]) jednim prolazom.
+
+    a2b_base64 sam preskače prelome redova; nedostajući '=' na kraju
+    (neki serveri ih odsijeku) se dopunjava kao kod get_payload(decode=True).
+    """
+    try:
+        return binascii.a2b_base64(encoded)
+    except binascii.Error:
+        stripped = b"".join(encoded.split())
+        return binascii.a2b_base64(stripped + b"=" * (-len(stripped) % 4))
+
+
+def _decode_transfer(payload: bytes, encoding: str) -> bytes:
+    """Dekodira Content-Transfer-Encoding jednog MIME dijela."""
+    if encoding == "base64":
+        return _decode_base64(payload)
+    if encoding == "quoted-printable":
+        return quopri.decodestring(payload)
+    return payload
+
+
+def _decode_parts(data: list, parts: List[Tuple[str, str, str]]) -> List[Tuple[str, bytes]]:
+    """
+    Izdvaja i dekodira BODY[n] dijelove iz FETCH odgovora.
+
+    Returns:
+        Lista (ime fajla, sadržaj) za dijelove koje je server vratio
+    """
+    items: Dict[str, object] = {}
+    for response in _parse_fetch_response(data):
+        items.update(response)
+
+    attachments = []
+    for part_id, filename, encoding in parts:
+        raw = items.get(f"BODY[{part_id}]")
+        if raw is None:
+            continue
+        if isinstance(raw, str):
+            raw = raw.encode("latin-1", "replace")
+        payload = _decode_transfer(raw, encoding)
+        if payload:
+            attachments.append((filename, payload))
+    return attachments
+
+
+def _decode_filename(filename: str) -> str:
+    try:
+        return str(make_header(decode_header(filename)))
+    except Exception:
+        return filename
+
+
+def _pdf_attachments(msg: Message) -> List[Tuple[str, bytes]]:
+    """PDF prilozi iz kompletne poruke (dio sa Content-Disposition: attachment ili PDF kao tijelo)."""
+    parts = []
+    if msg.is_multipart():
+        for part in msg.walk():
+            if part.get_content_disposition() == "attachment":
+                filename = part.get_filename()
+                if filename:
+                    parts.append((_decode_filename(filename), part))
+    elif msg.get_content_type() == "application/pdf":
+        parts.append(("attachment.pdf", msg))
+
+    items = []
+    for filename, part in parts:
+        payload = part.get_payload(decode=True)
+        if payload:
+            items.append((filename, payload))
+    return items
+
+
+def _parse_message(raw: bytes, uid: bytes) -> Message:
+    """
+    Parsira preuzetu poruku (RFC822) i odmah izdvaja PDF priloge.
+
+    Poruka se parsira sa BytesFeedParser-om po komadima, prilozi se dekodiraju
+    u `_wiz_attachments`, a tijelo (HTML, slike, kodirani prilozi) se odbacuje,
+    pa u pipeline-u ostaju samo headeri i PDF-ovi.
+    """
+    parser = BytesFeedParser()
+    view = memoryview(raw)
+    for i in range(0, len(view), DECODE_CHUNK_SIZE):
+        parser.feed(view[i:i + DECODE_CHUNK_SIZE].tobytes())
+    msg = parser.close()
+    msg._wiz_uid = uid
+    msg._wiz_attachments = _pdf_attachments(msg)
+    msg.set_payload(None)
+    return msg
+
+
+class _SenderMatcher:
+    """Raspoređuje preuzete poruke po traženim pošiljaocima na osnovu From headera."""
+
+    def __init__(self, senders: List[str]):
+        self.cleaned: Dict[str, str] = {}  # očišćena adresa -> originalni zapis pošiljaoca
+        for sender in senders:
+            c = _clean_sender(sender)
+            if c and c not in self.cleaned:
+                self.cleaned[c] = sender
+        # Duži pošiljalac je specifičniji (npr. "izvodi.pravne@x.ba" prije "x.ba")
+        self._by_length = sorted(self.cleaned, key=len, reverse=True)
+
+    def match(self, msg: Message) -> Optional[str]:
+        """Originalni zapis pošiljaoca kojem poruka pripada ili None."""
+        raw = msg.get("From", "") or ""
+        from_header = raw.lower()
+        if not any(s in from_header for s in self._by_length):
+            try:
+                # Dekodira se originalni header — base64 (=?utf-8?b?...?=) ne preživi lower()
+                from_header = str(make_header(decode_header(raw))).lower()
+            except Exception:
+                pass
+        sender = next((s for s in self._by_length if s in from_header), None)
+        if sender is None:
+            log.warning(f"Poruka UID {getattr(msg, '_wiz_uid', None)!r} ({from_header}) "
+                        f"ne odgovara nijednom pošiljaocu.")
+            return None
+        return self.cleaned[sender]
+
 
 class EmailFetcher:
-    def __init__(self):
+    """
+    IMAP klijent za preuzimanje izvoda.
+
+    fetch_mode:
+        "rfc822"        — preuzima cijelu poruku (HTML, slike, svi prilozi)
+        "bodystructure" — prvo BODYSTRUCTURE, zatim samo PDF dijelovi (BODY.PEEK[n])
+    """
+
+    def __init__(self, fetch_mode: str = "rfc822"):
         self.imap = None
+        self.fetch_mode = fetch_mode
+        self.folder = "INBOX"
+        self.uidvalidity: Optional[int] = None
+        self.exists: Optional[int] = None  # broj poruka u folderu (SELECT / EXISTS)
+        self._idle_reader: Optional[_SocketLines] = None
+        self._idle_tag = 0
 
     def connect_imap(self, account_row: dict):
         """Povezivanje na IMAP server koristeći podatke iz baze (lozinka ili OAuth2 token)."""
@@ -33,9 +396,9 @@ class EmailFetcher:
 
         # Kreiraj IMAP konekciju
         if use_ssl:
-            self.imap = imaplib.IMAP4_SSL(host, port)
+            self.imap = imaplib.IMAP4_SSL(host, port, timeout=IMAP_TIMEOUT)
         else:
-            self.imap = imaplib.IMAP4(host, port)
+            self.imap = imaplib.IMAP4(host, port, timeout=IMAP_TIMEOUT)
 
         # Autentifikacija
         if auth_type == "xoauth2" and token:
@@ -50,61 +413,182 @@ class EmailFetcher:
             password = decrypt_secret(account_row["secret_encrypted"] or b"")
             self.imap.login(username, password)
 
-        self.imap.select("INBOX")
+        self.select_folder("INBOX")
 
-    def search_messages(self, since: datetime, from_sender: Optional[str], unread_only: bool) -> List[Message]:
-        """Pretraga poruka po datumu, pošiljaocu i statusu pročitanosti."""
+    def select_folder(self, folder: str = "INBOX"):
+        """Bira folder i pamti njegov UIDVALIDITY (potreban za inkrementalni sync)."""
+        status, data = self.imap.select(folder)
+        self.folder = folder
+        self.uidvalidity = None
+        try:
+            self.exists = int(data[0]) if status == "OK" and data and data[0] else None
+        except (TypeError, ValueError):
+            self.exists = None
+        try:
+            _, data = self.imap.response("UIDVALIDITY")
+            if data and data[0]:
+                self.uidvalidity = int(data[0])
+        except Exception as e:
+            log.warning(f"Server nije vratio UIDVALIDITY za {folder}: {e}")
+
+    def search_messages(self, since: datetime, from_sender: Optional[str], unread_only: bool,
+                        min_uid: int = 0) -> List[Message]:
+        """
+        Pretraga poruka po datumu, pošiljaocu i statusu pročitanosti.
+
+        Ako je zadat `min_uid`, traže se samo poruke sa UID >= min_uid
+        (inkrementalni sync od zadnjeg obrađenog UID-a).
+        """
         criteria = []
         if from_sender:
-            # makni eventualni naziv i razmake, i ne koristi navodnike
-            sender_clean = from_sender.strip().lower().replace("<", "").replace(">", "")
-            criteria += ["FROM", sender_clean]
-        criteria += ["SINCE", since.strftime("%d-%b-%Y")]
+            criteria += ["FROM", _clean_sender(from_sender)]
+
+        uids = self._uid_search(criteria, since, unread_only, min_uid)
+        if uids is None:
+            return []
+
+        messages = self._fetch_messages(uids)
+
+        log.info(f"Pronađeno {len(messages)} poruka.")
+        if not messages:
+            log.warning(f"Nema poruka za pošiljaoca {from_sender} od {since.strftime('%d-%b-%Y')}.")
+        return messages
+
+    def search_messages_batched(self, since: datetime, senders: List[str], unread_only: bool,
+                                chunk_size: int = SEARCH_CHUNK_SIZE, min_uid: int = 0) -> Dict[str, List[Message]]:
+        """
+        Pretraga za sve pošiljaoce odjednom — jedan OR SEARCH po grupi od `chunk_size` adresa.
+
+        Sve poruke se drže u memoriji; worker koristi iter_messages.
+
+        Returns:
+            Dictionary {sender: [Message, ...]} za svaki traženi pošiljalac (ključevi kao u `senders`)
+        """
+        result: Dict[str, List[Message]] = {s: [] for s in senders}
+        for sender, msg in self.iter_messages(since, senders, unread_only, chunk_size=chunk_size, min_uid=min_uid):
+            result[sender].append(msg)
+        return result
+
+    def iter_messages(self, since: datetime, senders: List[str], unread_only: bool,
+                      chunk_size: int = SEARCH_CHUNK_SIZE, min_uid: int = 0) -> Iterator[Tuple[str, Message]]:
+        """
+        Pretraga za date pošiljaoce; poruke se preuzimaju i vraćaju jedna po jedna.
+
+        Jedan OR SEARCH po grupi od `chunk_size` adresa, a rezultat se lokalno
+        raspoređuje po pošiljaocu na osnovu From headera (ceil(n / chunk_size)
+        SEARCH round-tripova umjesto n). Sljedeća poruka se preuzima tek kad
+        pozivalac zatraži sljedeću stavku, pa memorija ne raste sa brojem poruka.
+
+        Yields:
+            (sender, Message) — sender kao u `senders`
+        """
+        matcher = _SenderMatcher(senders)
+        if not matcher.cleaned:
+            return
+
+        uids: List[bytes] = []
+        addresses = list(matcher.cleaned)
+        for i in range(0, len(addresses), max(1, chunk_size)):
+            chunk = addresses[i:i + chunk_size]
+            found = self._uid_search(_build_or_criteria(chunk), since, unread_only, min_uid)
+            for uid in found or []:
+                if uid not in uids:
+                    uids.append(uid)
+        log.info(f"Pretraga: {len(matcher.cleaned)} pošiljalaca, {len(uids)} poruka.")
+
+        for msg in self._iter_fetch(uids):
+            sender = matcher.match(msg)
+            if sender is not None:
+                yield sender, msg
+
+    def _uid_search(self, criteria: List[str], since: datetime, unread_only: bool,
+                    min_uid: int = 0) -> Optional[List[bytes]]:
+        """Izvršava UID SEARCH sa dodatim SINCE/UNSEEN/UID kriterijima. Vraća None ako server javi grešku."""
+        criteria = list(criteria) + ["SINCE", since.strftime("%d-%b-%Y")]
         if unread_only:
             criteria += ["UNSEEN"]
+        if min_uid > 0:
+            criteria += ["UID", f"{min_uid}:*"]
 
-        status, data = self.imap.search(None, *criteria)
+        status, data = self.imap.uid("SEARCH", None, *criteria)
         if status != "OK":
             log.warning("IMAP search nije vratio rezultate.")
-            return []
+            return None
+        uids = data[0].split() if data and data[0] else []
+        if min_uid > 0:
+            # "n:*" uvijek uključuje najveći UID u folderu, čak i kad je manji od n
+            uids = [u for u in uids if int(u) >= min_uid]
+        return uids
+
+    def _fetch_messages(self, uids: List[bytes]) -> List[Message]:
+        """Preuzima poruke po UID-u u skladu sa `fetch_mode`."""
+        return list(self._iter_fetch(uids))
 
-        ids = data[0].split()
-        messages = []
+    def _iter_fetch(self, uids: List[bytes]) -> Iterator[Message]:
+        """Preuzima poruke po UID-u jednu po jednu u skladu sa `fetch_mode`."""
+        if self.fetch_mode == "bodystructure":
+            return self._iter_pdf_only(uids)
+        return self._iter_rfc822(uids)
 
-        for uid in ids:
-            status, msg_data = self.imap.fetch(uid, "(RFC822)")
+    def _iter_rfc822(self, uids: List[bytes]) -> Iterator[Message]:
+        """Preuzima kompletne poruke po UID-u; od svake ostaju samo headeri i PDF prilozi."""
+        for uid in uids:
+            status, msg_data = self.imap.uid("FETCH", uid, "(RFC822)")
+            if status != "OK" or not msg_data or not isinstance(msg_data[0], tuple):
+                continue
+            msg = _parse_message(msg_data[0][1], uid)
+            msg_data = None  # sirova poruka se oslobađa čim je parsirana (prije yield-a)
+            yield msg
+
+    def _iter_pdf_only(self, uids: List[bytes]) -> Iterator[Message]:
+        """
+        Preuzima samo headere i PDF dijelove poruka.
+
+        Jedna FETCH (BODYSTRUCTURE + headeri) komanda po grupi UID-ova, zatim
+        jedna BODY.PEEK[n] komanda po poruci koja ima PDF, tek kad je poruka
+        na redu. HTML tijelo, slike i ostali prilozi se ne prenose. Vraćene
+        poruke sadrže samo headere, a PDF-ovi su u `_wiz_attachments`.
+        """
+        for i in range(0, len(uids), FETCH_CHUNK_SIZE):
+            chunk = uids[i:i + FETCH_CHUNK_SIZE]
+            status, data = self.imap.uid("FETCH", b",".join(chunk), f"(BODYSTRUCTURE {_HEADER_FIELDS})")
             if status != "OK":
                 continue
-            msg = email.message_from_bytes(msg_data[0][1])
-            msg._wiz_uid = uid  # čuvamo UID za kasnije označavanje
-            messages.append(msg)
 
-        log.info(f"Pronađeno {len(messages)} poruka.")
-        if not messages:
-            log.warning(f"Nema poruka za pošiljaoca {from_sender} od {since.strftime('%d-%b-%Y')}.")
-        return messages
+            for items in _parse_fetch_response(data):
+                uid = items.get("UID")
+                if not uid:
+                    continue
+                uid = uid.encode("ascii")
+                if "BODYSTRUCTURE" not in items:
+                    continue  # nenaručen FETCH (npr. samo FLAGS) za isti UID
+                header = next((v for k, v in items.items() if k.startswith("BODY[HEADER")), b"")
+                try:
+                    parts = _find_pdf_parts(items["BODYSTRUCTURE"])
+                except Exception as e:
+                    log.warning(f"Neuspješno čitanje BODYSTRUCTURE za UID {uid!r} ({e}) — preuzimam cijelu poruku.")
+                    yield from self._iter_rfc822([uid])
+                    continue
+
+                msg = email.message_from_bytes(header if isinstance(header, bytes) else header.encode())
+                msg._wiz_uid = uid
+                msg._wiz_attachments = self._fetch_parts(uid, parts) if parts else []
+                yield msg
+
+    def _fetch_parts(self, uid: bytes, parts: List[Tuple[str, str, str]]) -> List[Tuple[str, bytes]]:
+        """Preuzima navedene MIME dijelove jedne poruke bez postavljanja \\Seen."""
+        sections = " ".join(f"BODY.PEEK[{part_id}]" for part_id, _, _ in parts)
+        status, data = self.imap.uid("FETCH", uid, f"({sections})")
+        if status != "OK":
+            return []
+        return _decode_parts(data, parts)
 
     def extract_attachments(self, msg: Message) -> List[Tuple[str, bytes]]:
         """Ekstrahuje PDF priloge iz poruke."""
-        items = []
-        if msg.is_multipart():
-            for part in msg.walk():
-                if part.get_content_disposition() == "attachment":
-                    filename = part.get_filename()
-                    if filename:
-                        try:
-                            filename = str(make_header(decode_header(filename)))
-                        except Exception:
-                            pass
-                        payload = part.get_payload(decode=True)
-                        if payload:
-                            items.append((filename, payload))
-        else:
-            if msg.get_content_type() == "application/pdf":
-                payload = msg.get_payload(decode=True)
-                if payload:
-                    items.append(("attachment.pdf", payload))
-        return items
+        preloaded = getattr(msg, "_wiz_attachments", None)
+        if preloaded is not None:
+            return list(preloaded)
+        return _pdf_attachments(msg)
 
     def get_subject(self, msg: Message) -> str:
         """Dekodira subject iz emaila (UTF-8, ISO-8859-2 itd)."""
@@ -115,15 +599,124 @@ class EmailFetcher:
             pass
         return subj.strip()
 
+    def get_uid(self, msg: Message) -> Optional[int]:
+        """Vraća IMAP UID poruke (ili None ako poruka nije preuzeta sa servera)."""
+        uid = getattr(msg, "_wiz_uid", None)
+        return int(uid) if uid else None
+
+    # ------------------------------------------------------------
+    # Push: IMAP IDLE (RFC 2177) ili NOOP provjera
+    # ------------------------------------------------------------
+    def supports_idle(self) -> bool:
+        return "IDLE" in getattr(self.imap, "capabilities", ())
+
+    def wait_for_new_mail(self, timeout: float = IDLE_RENEW_SECONDS,
+                          stop: Optional[threading.Event] = None) -> bool:
+        """
+        Čeka da u izabrani folder stigne nova poruka.
+
+        Koristi IDLE ako ga server podržava (jedan IDLE najviše IDLE_RENEW_SECONDS,
+        pa pozivalac u petlji obnavlja IDLE prije isteka na serveru), a inače
+        NOOP svakih NOOP_POLL_SECONDS.
+
+        Args:
+            timeout: Najduže čekanje u sekundama
+            stop: Event koji prekida čekanje (provjerava se svake sekunde)
+
+        Returns:
+            True ako je server javio novu poruku (EXISTS), False nakon isteka ili prekida
+        """
+        if self.supports_idle():
+            return self._idle(min(timeout, IDLE_RENEW_SECONDS), stop)
+        return self._noop_poll(timeout, stop)
+
+    def _idle(self, timeout: float, stop: Optional[threading.Event]) -> bool:
+        imap = self.imap
+        if self._idle_reader is None or self._idle_reader.sock is not imap.sock:
+            self._idle_reader = _SocketLines(imap.sock)
+        reader = self._idle_reader
+        self._idle_tag += 1
+        tag = b"WIDLE%d" % self._idle_tag
+        imap.send(tag + b" IDLE\r\n")
+
+        deadline = time.monotonic() + timeout
+        new_mail = False
+        while True:
+            line = reader.readline(IMAP_TIMEOUT)
+            if line is None:
+                raise imaplib.IMAP4.abort("Server nije odgovorio na IDLE.")
+            if line.startswith(b"+"):
+                break
+            if line.startswith(tag):
+                raise imaplib.IMAP4.error(f"IDLE odbijen: {line!r}")
+            new_mail |= self._idle_line(line)  # EXISTS stigao prije "+ idling"
+
+        while not new_mail:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (stop is not None and stop.is_set()):
+                break
+            line = reader.readline(min(remaining, 1.0))
+            if line is not None:
+                new_mail |= self._idle_line(line)
+
+        imap.send(b"DONE\r\n")
+        while True:
+            line = reader.readline(IMAP_TIMEOUT)
+            if line is None:
+                raise imaplib.IMAP4.abort("Server nije završio IDLE.")
+            if line.startswith(tag):
+                break
+            new_mail |= self._idle_line(line)
+        return new_mail
+
+    def _idle_line(self, line: bytes) -> bool:
+        """Obrađuje neoznačen odgovor tokom IDLE-a; True za EXISTS."""
+        if line.startswith(b"* BYE"):
+            raise imaplib.IMAP4.abort(f"Server je prekinuo konekciju: {line!r}")
+        m = _EXISTS_RE.match(line)
+        if not m:
+            return False
+        self.exists = int(m.group(1))
+        return True
+
+    def _noop_poll(self, timeout: float, stop: Optional[threading.Event]) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if stop is not None:
+                if stop.wait(min(remaining, NOOP_POLL_SECONDS)):
+                    return False
+            else:
+                time.sleep(min(remaining, NOOP_POLL_SECONDS))
+
+            self.imap.noop()
+            _, data = self.imap.response("EXISTS")
+            counts = [int(d) for d in data or [] if d]
+            if counts:
+                previous, self.exists = self.exists, counts[-1]
+                if previous is None or self.exists > previous:
+                    return True
+
     def mark_as_read(self, msg: Message):
         """Označava poruku kao pročitanu (\\Seen)."""
         uid = getattr(msg, "_wiz_uid", None)
         if uid:
             try:
-                self.imap.store(uid, "+FLAGS", "\\Seen")
+                self.imap.uid("STORE", uid, "+FLAGS", "\\Seen")
             except Exception as e:
                 log.warning(f"Neuspješno označavanje poruke: {e}")
 
+    def mark_uids_as_read(self, uids: List[int], chunk_size: int = FETCH_CHUNK_SIZE):
+        """Označava više poruka kao pročitane jednom UID STORE komandom po grupi."""
+        for i in range(0, len(uids), chunk_size):
+            uid_set = ",".join(str(u) for u in uids[i:i + chunk_size])
+            try:
+                self.imap.uid("STORE", uid_set, "+FLAGS", "\\Seen")
+            except Exception as e:
+                log.warning(f"Neuspješno označavanje poruka: {e}")
+
     def close(self):
         """Sigurno zatvaranje IMAP konekcije."""
         try:
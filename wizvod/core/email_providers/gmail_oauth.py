@@ -1,25 +1,39 @@
-import os, json
+from datetime import timezone
 from pathlib import Path
 from google.auth.transport.requests import Request
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.oauth2.credentials import Credentials
 
+from wizvod.core.token_cache import OAuthToken, get_token_cache, legacy_token
+
+PROVIDER = "gmail"
 SCOPES = ["https://mail.google.com/"]
 APP_DIR = Path.home() / ".wizvod" / "tokens"
 APP_DIR.mkdir(parents=True, exist_ok=True)
-TOKEN_FILE = APP_DIR / "gmail_token.json"
+TOKEN_FILE = APP_DIR / "gmail_token.json"  # ranija verzija (jedan token za sve naloge)
 CLIENT_FILE = Path(__file__).resolve().parent / "google_client_secret.json"
 
+def _cache_credentials(email: str, creds: Credentials):
+    """Prenosi token u zajednički keš (dalje ga osvježava pozadinska nit)."""
+    expires_at = creds.expiry.replace(tzinfo=timezone.utc).timestamp() if creds.expiry else 0
+    get_token_cache().put(OAuthToken(
+        PROVIDER, email, creds.token, creds.refresh_token, expires_at,
+        creds.token_uri, creds.client_id, creds.client_secret, " ".join(SCOPES)))
+
 def get_token(email: str):
+    token = get_token_cache().get_access_token(PROVIDER, email)
+    if token:
+        return token
+
     creds = None
-    if TOKEN_FILE.exists():
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+    legacy = legacy_token(TOKEN_FILE, email)
+    if legacy:
+        creds = Credentials.from_authorized_user_info(legacy, SCOPES)
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
             creds.refresh(Request())
         else:
             flow = InstalledAppFlow.from_client_secrets_file(CLIENT_FILE, SCOPES)
             creds = flow.run_local_server(port=0)
-        with open(TOKEN_FILE, "w") as token:
-            token.write(creds.to_json())
+    _cache_credentials(email, creds)
     return creds.token
@@ -1,26 +1,43 @@
-import json
 from pathlib import Path
 import msal
 
+from wizvod.core.token_cache import OAuthToken, get_token_cache, legacy_token
+
+PROVIDER = "outlook"
 CLIENT_ID = "your-outlook-client-id"
 AUTHORITY = "https://login.microsoftonline.com/common"
+TOKEN_URL = f"{AUTHORITY}/oauth2/v2.0/token"
 SCOPE = ["https://outlook.office.com/IMAP.AccessAsUser.All"]
-TOKEN_FILE = Path.home() / ".wizvod" / "tokens" / "outlook_token.json"
+TOKEN_FILE = Path.home() / ".wizvod" / "tokens" / "outlook_token.json"  # ranija verzija
 
-def get_token(email: str):
-    TOKEN_FILE.parent.mkdir(parents=True, exist_ok=True)
-    app = msal.PublicClientApplication(CLIENT_ID, authority=AUTHORITY)
+def _cache_result(email: str, result: dict, issued_at: float = None):
+    """Prenosi odgovor token endpointa u zajednički keš (javni klijent, bez client_secret-a)."""
+    get_token_cache().put(OAuthToken.from_response(
+        PROVIDER, email, result, TOKEN_URL, CLIENT_ID,
+        scope=" ".join(SCOPE + ["offline_access"]), issued_at=issued_at))
 
-    result = None
-    accounts = app.get_accounts()
-    if accounts:
-        result = app.acquire_token_silent(SCOPE, account=accounts[0])
+def get_token(email: str):
+    cache = get_token_cache()
+    token = cache.get_access_token(PROVIDER, email)
+    if token:
+        return token
 
-    if not result:
-        flow = app.initiate_device_flow(scopes=SCOPE)
-        print(flow["message"])
-        result = app.acquire_token_by_device_flow(flow)
-        with open(TOKEN_FILE, "w") as f:
-            json.dump(result, f)
+    # Token iz ranije verzije (outlook_token.json), ako je izdat za ovaj nalog — osvježava se preko refresh tokena
+    result = legacy_token(TOKEN_FILE, email)
+    if result and result.get("refresh_token"):
+        try:
+            _cache_result(email, result, issued_at=TOKEN_FILE.stat().st_mtime)
+            token = cache.get_access_token(PROVIDER, email)
+            if token:
+                return token
+        except (OSError, KeyError):
+            pass
 
+    app = msal.PublicClientApplication(CLIENT_ID, authority=AUTHORITY)
+    flow = app.initiate_device_flow(scopes=SCOPE)
+    print(flow["message"])
+    result = app.acquire_token_by_device_flow(flow)
+    if "access_token" not in result:
+        raise RuntimeError(result.get("error_description") or result.get("error") or "Outlook prijava nije uspjela")
+    _cache_result(email, result)
     return result["access_token"]
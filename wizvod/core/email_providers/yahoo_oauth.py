@@ -1,7 +1,9 @@
-import json
 from pathlib import Path
 from requests_oauthlib import OAuth2Session
 
+from wizvod.core.token_cache import OAuthToken, get_token_cache, legacy_token
+
+PROVIDER = "yahoo"
 CLIENT_ID = "your-yahoo-client-id"
 CLIENT_SECRET = "your-yahoo-client-secret"
 AUTH_URL = "https://api.login.yahoo.com/oauth2/request_auth"
@@ -9,18 +11,31 @@ TOKEN_URL = "https://api.login.yahoo.com/oauth2/get_token"
 REDIRECT_URI = "http://localhost:8080"
 SCOPE = ["mail-w"]
 
-TOKEN_FILE = Path.home() / ".wizvod" / "tokens" / "yahoo_token.json"
+TOKEN_FILE = Path.home() / ".wizvod" / "tokens" / "yahoo_token.json"  # ranija verzija
+
+def _cache_result(email: str, token: dict, issued_at: float = None):
+    """Prenosi token u zajednički keš (dalje ga osvježava pozadinska nit)."""
+    get_token_cache().put(OAuthToken.from_response(
+        PROVIDER, email, token, TOKEN_URL, CLIENT_ID, CLIENT_SECRET, issued_at=issued_at))
 
 def get_token(email: str):
-    TOKEN_FILE.parent.mkdir(parents=True, exist_ok=True)
-    if TOKEN_FILE.exists():
-        token = json.load(open(TOKEN_FILE))
-        return token["access_token"]
+    cache = get_token_cache()
+    token = cache.get_access_token(PROVIDER, email)
+    if token:
+        return token
+
+    # Token iz ranije verzije (ranije se nikad nije osvježavao), ako je izdat za ovaj nalog
+    token = legacy_token(TOKEN_FILE, email)
+    if token and token.get("access_token"):
+        _cache_result(email, token, issued_at=TOKEN_FILE.stat().st_mtime)
+        access_token = cache.get_access_token(PROVIDER, email)
+        if access_token:
+            return access_token
 
     oauth = OAuth2Session(CLIENT_ID, redirect_uri=REDIRECT_URI, scope=SCOPE)
     authorization_url, state = oauth.authorization_url(AUTH_URL)
     print(f"Otvori link i potvrdi pristup:\n{authorization_url}")
     redirect_response = input("Zalijepi cijeli redirect URL: ")
     token = oauth.fetch_token(TOKEN_URL, client_secret=CLIENT_SECRET, authorization_response=redirect_response)
-    json.dump(token, open(TOKEN_FILE, "w"))
+    _cache_result(email, token)
     return token["access_token"]
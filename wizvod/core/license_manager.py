@@ -1,12 +1,15 @@
 import json
 import hashlib
+import hmac
 import os
 import getpass
+from functools import lru_cache
 from datetime import datetime
-from typing import Optional, Tuple
+from typing import Optional
 from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.primitives import serialization, hashes
 
+from wizvod.core.crypto import get_local_secret
 from wizvod.core.db import Database
 from wizvod.core.logger import get_logger
 
@@ -27,8 +30,9 @@ AQIDAQAB
 """
 
 
+@lru_cache(maxsize=1)
 def get_fingerprint() -> str:
-    """Jedinstveni ID računara (os + host + korisnik)."""
+    """Jedinstveni ID računara (os + host + korisnik); računa se jednom po procesu."""
     uname = os.name
     host = os.getenv("COMPUTERNAME") or os.getenv("HOSTNAME") or ""
     try:
@@ -80,7 +84,44 @@ class LicenseManager:
             log.error(f"Potpis nije validan: {e}")
             return False
 
+    @staticmethod
+    def _cache_key(license_json: str, fingerprint: str) -> str:
+        """
+        Ključ zapamćene provjere: HMAC licence, fingerprinta i javnog ključa.
+
+        HMAC ključ je lokalna tajna korisnika (crypto.get_local_secret), pa
+        zapis ne može napraviti neko ko samo može pisati u bazu. Svaka izmjena
+        licence, drugi računar/korisnik ili novi javni ključ daju drugi ključ,
+        pa se potpis ponovo provjerava.
+        """
+        h = hmac.new(get_local_secret("license"), digestmod=hashlib.sha256)
+        for part in (PUBLIC_KEY_PEM, license_json, fingerprint):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    @staticmethod
+    def _check_expiry(exp: Optional[str]) -> bool:
+        if not exp:
+            return True
+        try:
+            if datetime.fromisoformat(exp) < datetime.now():
+                log.error("Licenca je istekla.")
+                return False
+        except Exception:
+            log.error("Polje 'expires_at' nije validan ISO datetime.")
+            return False
+        return True
+
     def validate(self) -> bool:
+        """
+        Provjerava licencu.
+
+        Uspješna provjera potpisa se pamti u bazi (tabela license_verification)
+        pod ključem iz _cache_key, pa naredna pokretanja preskaču samo RSA
+        provjeru dok se licenca ne promijeni. Fingerprint i istek se pri svakom
+        pozivu čitaju iz same (potpisane) licence.
+        """
         license_json = self.load()
         if not license_json:
             log.error("Licenca nije učitana. (Nema license.json u bazi.)")
@@ -97,26 +138,33 @@ class LicenseManager:
             log.error("Nedostaje 'signature' u licenci.")
             return False
 
+        real_fp = get_fingerprint()
+        cache_key = self._cache_key(license_json, real_fp)
+        try:
+            verified = self.db.get_license_verification(cache_key) is not None
+        except Exception as e:
+            log.warning(f"⚠️ Zapamćena provjera licence nije dostupna: {e}")
+            verified = False
+
         # ✅ Provjera potpisa
-        if not self._verify_signature(lic, signature):
+        if not verified and not self._verify_signature(lic, signature):
             return False
 
         # ✅ Provjera fingerprinta
-        real_fp = get_fingerprint()
         if lic.get("fingerprint") != real_fp:
             log.error("Fingerprint se ne poklapa sa ovim računarom.")
             return False
 
         # ✅ Provjera isteka
         exp = lic.get("expires_at")
-        if exp:
+        if not self._check_expiry(exp):
+            return False
+
+        if not verified:
             try:
-                if datetime.fromisoformat(exp) < datetime.now():
-                    log.error("Licenca je istekla.")
-                    return False
-            except Exception:
-                log.error("Polje 'expires_at' nije validan ISO datetime.")
-                return False
+                self.db.save_license_verification(cache_key, exp)
+            except Exception as e:
+                log.warning(f"⚠️ Provjera licence nije zapamćena: {e}")
 
         log.info("Licenca je validna.")
         return True
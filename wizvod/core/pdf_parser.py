@@ -5,9 +5,30 @@ Koristi modularni bank_rules sistem za parsiranje specifičnih banaka.
 """
 
 import fitz  # PyMuPDF
+import hashlib
+import os
 import re
-from typing import Optional, Tuple
-from wizvod.core.bank_rules import extract_statement_number, extract_account_number
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+from wizvod.core.bank_rules import extract_statement_number, extract_account_number, get_header_clip, get_rule_info
+from wizvod.core.logger import get_logger
+
+log = get_logger("pdf_parser")
+
+# Verzija zajedničke logike (fallback pretrage, metapodaci) — povećati pri izmjeni
+# PDFParser-a da bi se keširani rezultati parsiranja svih banaka poništili
+PARSER_VERSION = 2
+
+# Broj linija sa početka dokumenta koje pravila i metapodaci koriste (najviše 100 — fallback za račun)
+HEADER_LINES = 100
+
+# Broj linija sa kraja dokumenta za saldo (extract_balance)
+TAIL_LINES = 50
+
+# Koliko stranica se čita u header režimu prije prelaska na cijeli dokument
+HEADER_PAGE_STEPS = (1, 3)
 
 
 def _normalize_spaces(s: str) -> str:
@@ -23,6 +44,68 @@ def _normalize_spaces(s: str) -> str:
     return re.sub(r"[ \t]+", " ", s or "")
 
 
+class StatementText:
+    """
+    Lijeno čitanje teksta iz otvorenog PDF dokumenta.
+
+    Tekst stranica se čita samo kad zatreba i pamti se, pa zaglavlje
+    (prve stranice) i saldo (zadnje stranice) velikog izvoda ne zahtijevaju
+    čitanje svih stranica. Spajanje je isto kao kod punog teksta
+    (svaka stranica + "\\n"), pa prvih/zadnjih n linija daje isti rezultat.
+
+    Args:
+        doc: Otvoren fitz dokument (mora ostati otvoren dok se tekst čita)
+        clip: Opcioni pravougaonik (x0, y0, x1, y1) u PDF tačkama za zaglavlje prve stranice
+    """
+
+    def __init__(self, doc, clip: Optional[Tuple[float, float, float, float]] = None):
+        self.doc = doc
+        self.clip = clip
+        self.page_count = doc.page_count
+        self._pages: Dict[int, str] = {}
+
+    def page(self, index: int) -> str:
+        if index not in self._pages:
+            self._pages[index] = (self.doc[index].get_text("text") or "") + "\n"
+        return self._pages[index]
+
+    def pages(self, count: int) -> str:
+        """Tekst prvih `count` stranica."""
+        count = min(count, self.page_count)
+        return _normalize_spaces("".join(self.page(i) for i in range(count)))
+
+    def full(self) -> str:
+        return self.pages(self.page_count)
+
+    def header(self) -> str:
+        """Tekst prve stranice (samo unutar `clip` pravougaonika ako je zadat)."""
+        if not self.page_count:
+            return ""
+        if self.clip is None:
+            return self.pages(1)
+        return _normalize_spaces((self.doc[0].get_text("text", clip=fitz.Rect(*self.clip)) or "") + "\n")
+
+    def head(self, min_lines: int = HEADER_LINES) -> str:
+        """Stranice od početka dok se ne skupi bar `min_lines` linija."""
+        parts, lines = [], 0
+        for i in range(self.page_count):
+            parts.append(self.page(i))
+            lines += parts[-1].count("\n")
+            if lines >= min_lines:
+                break
+        return _normalize_spaces("".join(parts))
+
+    def tail(self, min_lines: int = TAIL_LINES) -> str:
+        """Stranice od kraja dok se ne skupi bar `min_lines` linija."""
+        parts, lines = [], 0
+        for i in range(self.page_count - 1, -1, -1):
+            parts.insert(0, self.page(i))
+            lines += parts[0].count("\n")
+            if lines >= min_lines:
+                break
+        return _normalize_spaces("".join(parts))
+
+
 class PDFParser:
     """Parser za bankovne izvode u PDF formatu."""
 
@@ -39,17 +122,12 @@ class PDFParser:
         Raises:
             ValueError: Ako PDF ne može biti pročitan
         """
-        text = ""
         try:
             with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
-                for page in doc:
-                    page_text = page.get_text("text") or ""
-                    text += page_text + "\n"
+                return StatementText(doc).full()
         except Exception as e:
             raise ValueError(f"Greška pri čitanju PDF-a: {e}")
 
-        return _normalize_spaces(text)
-
     def extract_all(
             self,
             sender_email: str,
@@ -83,10 +161,7 @@ class PDFParser:
             ... )
             >>> print(f"Račun: {account}, Izvod: {statement}")
         """
-        # Koristi tvoj modularni bank_rules sistem
-        # On automatski bira parser na osnovu sender_email-a
-        stmt_no = extract_statement_number(sender_email, text)
-        acct = extract_account_number(sender_email, text, subject, filename)
+        acct, stmt_no = self.extract_by_rule(sender_email, subject, filename, text)
 
         # Fallback za broj računa ako bank_rules nije našao
         if not acct:
@@ -98,6 +173,20 @@ class PDFParser:
 
         return acct, stmt_no
 
+    def extract_by_rule(self, sender_email: str, subject: str, filename: str,
+                        text: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Broj računa i broj izvoda samo iz pravila banke, bez generičkih fallback pretraga.
+
+        Returns:
+            Tuple (account_number, statement_number)
+        """
+        # Koristi tvoj modularni bank_rules sistem
+        # On automatski bira parser na osnovu sender_email-a
+        stmt_no = extract_statement_number(sender_email, text)
+        acct = extract_account_number(sender_email, text, subject, filename)
+        return acct, stmt_no
+
     def _fallback_extract_account(
             self,
             subject: str,
@@ -327,4 +416,151 @@ class PDFParser:
             'date': self.extract_date(text),
             'balance': self.extract_balance(text),
             'currency': self.extract_currency(text)
-        }
\ No newline at end of file
+        }
+
+
+def parse_statement(pdf_bytes: bytes, sender_email: str, subject: str,
+                    filename: str, text_mode: str = "header") -> Tuple[Optional[str], Optional[str], dict]:
+    """
+    Čita PDF i izvlači broj računa, broj izvoda i metapodatke.
+
+    Funkcija je na nivou modula da bi se mogla izvršavati u ProcessPoolExecutor-u.
+
+    text_mode:
+        "full"   — pravila dobijaju tekst svih stranica (ranije ponašanje)
+        "header" — pravila prvo dobijaju prvu stranicu (ili clip pravougaonik banke),
+                   zatim prve 3 stranice, a cijeli dokument samo ako pravilo banke
+                   još nije pronašlo broj računa i izvoda; generičke fallback
+                   pretrage se primjenjuju tek na cijeli tekst, kao u "full"
+                   režimu; saldo se čita sa zadnjih stranica
+
+    Returns:
+        Tuple (account_number, statement_number, metadata)
+    """
+    parser = PDFParser()
+    try:
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    except Exception as e:
+        raise ValueError(f"Greška pri čitanju PDF-a: {e}")
+
+    with doc:
+        try:
+            text = StatementText(doc, clip=get_header_clip(sender_email) if text_mode == "header" else None)
+            if text_mode != "header":
+                full = text.full()
+                acct, stmt_no = parser.extract_all(sender_email, subject, filename, full)
+                return acct, stmt_no, parser.get_metadata(full)
+
+            acct = stmt_no = None
+            tried = set()
+            steps = [text.header] + [lambda n=n: text.pages(n) for n in HEADER_PAGE_STEPS]
+            for step in steps:
+                candidate = step()
+                if candidate in tried:
+                    continue
+                tried.add(candidate)
+                # dalje se ide samo dok pravilo ne pronađe oba broja; fallback
+                # pretrage bi "uspjele" i na zaglavlju sa pogrešnim brojem
+                acct, stmt_no = parser.extract_by_rule(sender_email, subject, filename, candidate)
+                if acct and stmt_no:
+                    break
+            else:
+                acct, stmt_no = parser.extract_all(sender_email, subject, filename, text.full())
+
+            head = text.head()
+            metadata = {
+                'date': parser.extract_date(head),
+                'balance': parser.extract_balance(text.tail()),
+                'currency': parser.extract_currency(head),
+            }
+            return acct, stmt_no, metadata
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Greška pri čitanju PDF-a: {e}")
+
+
+def parse_cache_key(pdf_sha256: str, sender_email: str, subject: str, filename: str,
+                    text_mode: str = "header") -> Tuple[str, str, int, int, str]:
+    """
+    Ključ za keš rezultata parsiranja.
+
+    Pravila za broj računa koriste i subject i ime fajla, pa su i oni dio ključa,
+    kao i text_mode ("header" i "full" mogu dati različit rezultat).
+
+    Returns:
+        Tuple (sha256, naziv pravila, verzija pravila, PARSER_VERSION, otisak subject-a, imena fajla i text_mode)
+    """
+    rule, rule_version = get_rule_info(sender_email)
+    inputs = hashlib.sha1(f"{subject or ''}\0{filename or ''}\0{text_mode}".encode("utf-8")).hexdigest()
+    return pdf_sha256, rule, rule_version, PARSER_VERSION, inputs
+
+
+class ParsePool:
+    """
+    Pool procesa za parsiranje PDF-ova (CPU posao ne blokira IMAP niti i koristi sva jezgra).
+
+    Sa workers=0, ili ako pool ne može da se pokrene ili padne, parsira se
+    u trenutnom procesu. PyMuPDF nije predviđen za rad iz više niti, pa je
+    parsiranje u procesu zaštićeno lock-om.
+    """
+
+    def __init__(self, workers: int = 0, text_mode: str = "header"):
+        self.workers = max(0, workers)
+        self.text_mode = text_mode
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        if self.workers:
+            try:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                log.info(f"Pokrenut pool za parsiranje PDF-a ({self.workers} procesa).")
+            except Exception as e:
+                log.warning(f"Pool procesa nije dostupan ({e}) — parsiram u procesu.")
+
+    @staticmethod
+    def resolve_workers(value: Optional[str]) -> int:
+        """Pretvara podešavanje 'parse_workers' u broj procesa ('auto' = broj jezgara - 1)."""
+        value = (value or "0").strip().lower()
+        if value == "auto":
+            return max(1, (os.cpu_count() or 2) - 1)
+        return int(value) if value.isdigit() else 0
+
+    def submit(self, pdf_bytes: bytes, sender_email: str, subject: str, filename: str) -> Future:
+        """Šalje PDF na parsiranje; rezultat Future-a je (account_number, statement_number, metadata)."""
+        args = (pdf_bytes, sender_email, subject, filename, self.text_mode)
+        if self._pool is not None:
+            try:
+                return self._pool.submit(parse_statement, *args)
+            except (BrokenProcessPool, RuntimeError) as e:
+                self._disable(e)
+        return self._parse_local(*args)
+
+    def result(self, future: Future, pdf_bytes: bytes, sender_email: str, subject: str,
+               filename: str) -> Tuple[Optional[str], Optional[str], dict]:
+        """Čeka rezultat; ako je pool pao u međuvremenu, isti PDF se parsira u procesu."""
+        try:
+            return future.result()
+        except BrokenProcessPool as e:
+            self._disable(e)
+            return self._parse_local(pdf_bytes, sender_email, subject, filename, self.text_mode).result()
+
+    def _parse_local(self, *args) -> Future:
+        future: Future = Future()
+        try:
+            with self._lock:
+                future.set_result(parse_statement(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _disable(self, error: Exception):
+        if self._pool is not None:
+            log.warning(f"Pool za parsiranje nije ispravan ({error}) — nastavljam parsiranje u procesu.")
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def shutdown(self):
+        """Gasi procese pool-a."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
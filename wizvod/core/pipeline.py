@@ -0,0 +1,227 @@
+"""
+Jednostavan višefazni pipeline sa ograničenim redovima (queue).
+
+Svaka faza ima svoj ulazni red i jednu ili više niti. Izlazi faze idu u
+red sljedeće faze; pun red blokira prethodnu fazu (backpressure), pa
+mreža, CPU i disk rade istovremeno bez neograničenog rasta memorije.
+"""
+import queue
+import threading
+import time
+from typing import Callable, Iterable, List, Optional
+
+from wizvod.core.logger import get_logger
+
+log = get_logger("pipeline")
+
+DEFAULT_QUEUE_SIZE = 32
+
+_STOP = object()
+
+
+class StageStats:
+    """Brojači jedne faze: primljene/poslate stavke, greške i vrijeme rada."""
+
+    def __init__(self):
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def add(self, items_in: int = 0, items_out: int = 0, errors: int = 0, busy: float = 0.0):
+        with self._lock:
+            self.items_in += items_in
+            self.items_out += items_out
+            self.errors += errors
+            self.busy_seconds += busy
+
+    @property
+    def wall_seconds(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Obrađenih stavki u sekundi (po ukupnom trajanju faze)."""
+        wall = self.wall_seconds
+        return self.items_in / wall if wall > 0 else 0.0
+
+
+class Stage:
+    """
+    Jedna faza pipeline-a.
+
+    Args:
+        name: Naziv faze (za logove i statistiku)
+        fn: fn(item) vraća iterabilni skup izlaza (može biti generator) ili None
+        workers: Broj niti koje paralelno obrađuju stavke
+        maxsize: Kapacitet ulaznog reda
+        on_error: on_error(item, exc) vraća izlaze za stavku čija obrada je pala
+                  (npr. stavku označenu greškom); bez njega se stavka odbacuje
+    """
+
+    def __init__(self, name: str, fn: Callable, workers: int = 1, maxsize: int = DEFAULT_QUEUE_SIZE,
+                 on_error: Optional[Callable] = None):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.on_error = on_error
+        self.queue: queue.Queue = queue.Queue(maxsize=max(1, maxsize))
+        self.stats = StageStats()
+        self.next: Optional["Stage"] = None
+        self._abort: Optional[threading.Event] = None
+        self._threads: List[threading.Thread] = []
+        self._alive = 0
+        self._lock = threading.Lock()
+
+    def start(self, abort: threading.Event):
+        self._abort = abort
+        self.stats.started_at = time.perf_counter()
+        self._alive = self.workers
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"wizvod-{self.name}-{i + 1}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def put(self, item):
+        """Stavlja stavku u red faze; blokira dok ima mjesta ili dok pipeline nije prekinut."""
+        while not self._abort.is_set():
+            try:
+                self.queue.put(item, timeout=0.2)
+                return
+            except queue.Full:
+                continue
+
+    def join(self):
+        for t in self._threads:
+            t.join()
+
+    def _emit(self, outputs: Optional[Iterable]):
+        """Prosljeđuje izlaze sljedećoj fazi; vrijeme provedeno u fn ulazi u busy, čekanje na red ne ulazi."""
+        if outputs is None:
+            return
+        it = iter(outputs)
+        while True:
+            t0 = time.perf_counter()
+            try:
+                out = next(it)
+            except StopIteration:
+                self.stats.add(busy=time.perf_counter() - t0)
+                return
+            self.stats.add(items_out=1, busy=time.perf_counter() - t0)
+            if self.next is not None:
+                self.next.put(out)
+
+    def _run(self):
+        try:
+            while True:
+                item = self.queue.get()
+                if item is _STOP:
+                    break
+                if self._abort.is_set():
+                    continue  # prekid: samo praznimo red do STOP signala
+
+                self.stats.add(items_in=1)
+                t0 = time.perf_counter()
+                try:
+                    outputs = self.fn(item)
+                    self.stats.add(busy=time.perf_counter() - t0)
+                    self._emit(outputs)
+                except Exception as e:
+                    self.stats.add(errors=1, busy=time.perf_counter() - t0)
+                    log.error(f"Faza '{self.name}': greška u obradi stavke: {e}")
+                    if self.on_error is not None:
+                        try:
+                            self._emit(self.on_error(item, e))
+                        except Exception as e2:
+                            log.error(f"Faza '{self.name}': greška u on_error: {e2}")
+        finally:
+            with self._lock:
+                self._alive -= 1
+                last = self._alive == 0
+            if last:
+                self.stats.finished_at = time.perf_counter()
+                if self.next is not None:
+                    self.next.close()
+
+    def close(self):
+        """Nema više ulaza: šalje STOP svakoj niti faze (red se prvo isprazni)."""
+        for _ in range(self.workers):
+            self.queue.put(_STOP)
+
+
+class Pipeline:
+    """
+    Niz faza povezanih ograničenim redovima.
+
+    Primjer:
+        >>> p = Pipeline("sync")
+        >>> p.add_stage("fetch", fetch_fn, workers=4)
+        >>> p.add_stage("parse", parse_fn, workers=2)
+        >>> p.start()
+        >>> for acc in accounts:
+        ...     p.put(acc)
+        >>> p.close()
+        >>> p.join()
+    """
+
+    def __init__(self, name: str = "pipeline"):
+        self.name = name
+        self.stages: List[Stage] = []
+        self.aborted = threading.Event()
+        self._started = False
+
+    def add_stage(self, name: str, fn: Callable, workers: int = 1, maxsize: int = DEFAULT_QUEUE_SIZE,
+                  on_error: Optional[Callable] = None) -> Stage:
+        stage = Stage(name, fn, workers=workers, maxsize=maxsize, on_error=on_error)
+        if self.stages:
+            self.stages[-1].next = stage
+        self.stages.append(stage)
+        return stage
+
+    def stage(self, name: str) -> Stage:
+        return next(s for s in self.stages if s.name == name)
+
+    def start(self):
+        for stage in self.stages:
+            stage.start(self.aborted)
+        self._started = True
+
+    def put(self, item):
+        """Ulaz u prvu fazu (blokira kad je red pun)."""
+        self.stages[0].put(item)
+
+    def close(self):
+        """Signalizira kraj ulaza; faze se gase redom nakon što obrade sve što je u redovima."""
+        self.stages[0].close()
+
+    def join(self):
+        for stage in self.stages:
+            stage.join()
+
+    def abort(self):
+        """Prekida obradu: preostale stavke u redovima se odbacuju."""
+        self.aborted.set()
+
+    def run(self, items: Iterable):
+        """Pokreće pipeline, ubacuje sve stavke, zatvara ulaz i čeka kraj."""
+        if not self._started:
+            self.start()
+        try:
+            for item in items:
+                self.put(item)
+        finally:
+            self.close()
+            self.join()
+
+    def log_stats(self):
+        """Upisuje propusnost svake faze u log."""
+        for stage in self.stages:
+            st = stage.stats
+            log.info(f"📈 [{self.name}] {stage.name}: ulaz {st.items_in}, izlaz {st.items_out}, "
+                     f"greške {st.errors}, rad {st.busy_seconds:.2f}s / {st.wall_seconds:.2f}s, "
+                     f"{st.throughput:.1f} stavki/s")
@@ -0,0 +1,87 @@
+"""
+Usmjeravanje izvoda klijentima po broju računa.
+
+Indeks se gradi jednom po pokretanju workera iz liste klijenata, pa se za
+svaki prilog klijent bira jednim dict lookup-om po broju računa iz PDF-a,
+bez obzira koliko klijenata dijeli istog pošiljaoca (banku).
+"""
+import re
+from typing import Dict, List, Optional
+
+from wizvod.core.db import normalize_account
+from wizvod.core.logger import get_logger
+
+log = get_logger("routing")
+
+# IBAN BiH: BA + 2 kontrolne cifre + 16 cifara računa
+_IBAN_RE = re.compile(r"^\s*BA\s*\d{2}", re.IGNORECASE)
+
+
+def routing_key(account_number: Optional[str]) -> str:
+    """
+    Jedinstven oblik broja računa za poređenje.
+
+    Uklanja crtice, razmake i ostale znakove, a kod IBAN-a i kontrolne cifre,
+    pa 567-651-00001145-06, 5676510000114506 i BA39 5676 5100 0011 4506
+    daju isti ključ.
+    """
+    digits = normalize_account(account_number)
+    if len(digits) == 18 and _IBAN_RE.match(account_number or ""):
+        return digits[2:]
+    return digits
+
+
+class AccountRouter:
+    """
+    Indeks klijenata po broju računa.
+
+    Args:
+        clients: Lista klijenata (redovi iz tabele clients)
+    """
+
+    def __init__(self, clients: List[dict]):
+        self._by_account: Dict[str, List[dict]] = {}
+        for client in clients:
+            key = routing_key(client["account_number"])
+            if not key:
+                continue
+            bucket = self._by_account.setdefault(key, [])
+            if bucket:
+                log.warning(f"⚠️ Račun {client['account_number']} imaju klijenti "
+                            f"'{bucket[0]['name']}' i '{client['name']}'.")
+            bucket.append(client)
+
+    def __len__(self):
+        return len(self._by_account)
+
+    def clients_for(self, acct_no: Optional[str]) -> List[dict]:
+        """Klijenti sa datim brojem računa (prazna lista ako ga nema)."""
+        return self._by_account.get(routing_key(acct_no), [])
+
+    def route(self, acct_no: Optional[str], candidates: List[dict]) -> Optional[dict]:
+        """
+        Bira klijenta kojem pripada prilog.
+
+        Broj računa iz PDF-a ima prednost: prilog ide klijentu sa tim računom,
+        i kad taj klijent nije naveo ovog pošiljaoca (jedan prolaz kroz poruke
+        banke služi svim njenim klijentima). Ako račun dijeli više klijenata,
+        prednost imaju oni koji su naveli pošiljaoca. Bez prepoznatog računa
+        prilog ide jedinom klijentu pošiljaoca (ponašanje kao ranije).
+
+        Args:
+            acct_no: Broj računa iz PDF-a (bilo kojeg oblika) ili None
+            candidates: Klijenti koji su naveli pošiljaoca poruke
+
+        Returns:
+            Klijent ili None ako se ne može odrediti (worker tada ne pomjera
+            UID watermark preko poruke, pa se ona ponovo obrađuje)
+        """
+        matches = self.clients_for(acct_no)
+        if matches:
+            for client in matches:
+                if client in candidates:
+                    return client
+            return matches[0]
+        if len(candidates) == 1:
+            return candidates[0]
+        return None
@@ -3,8 +3,7 @@ Modul za upravljanje sesijama sinhronizacije i ispisivanje izvoda.
 """
 import uuid
 from datetime import datetime
-from typing import List, Dict, Optional
-from pathlib import Path
+from typing import List, Dict
 from wizvod.core.db import Database
 from wizvod.core.logger import get_logger
 
@@ -26,12 +25,11 @@ class SyncSession:
 
     def start(self):
         """Započinje novu sesiju sinhronizacije."""
-        self.db.conn.execute("""
+        self.db.execute_write("""
             INSERT INTO sync_sessions 
             (session_id, started_at, status, total_downloaded, total_errors, total_skipped)
             VALUES (?, ?, ?, 0, 0, 0)
         """, (self.session_id, self.started_at.isoformat(), self.status))
-        self.db.conn.commit()
         log.info(f"🔵 Započeta sesija sinhronizacije: {self.session_id}")
 
     def end(self, status: str = "completed"):
@@ -39,6 +37,9 @@ class SyncSession:
         self.ended_at = datetime.now()
         self.status = status
 
+        # Baferovani logovi moraju biti upisani prije prebrojavanja
+        self.db.flush_logs()
+
         # Prebrojavanje rezultata
         cur = self.db.conn.execute("""
             SELECT 
@@ -54,7 +55,7 @@ class SyncSession:
         self.total_errors = row[1] if row else 0
         self.total_skipped = row[2] if row else 0
 
-        self.db.conn.execute("""
+        self.db.execute_write("""
             UPDATE sync_sessions
             SET ended_at = ?,
                 status = ?,
@@ -65,7 +66,6 @@ class SyncSession:
         """, (self.ended_at.isoformat(), self.status,
               self.total_downloaded, self.total_errors, self.total_skipped,
               self.session_id))
-        self.db.conn.commit()
 
         duration = (self.ended_at - self.started_at).total_seconds()
         log.info(f"✅ Sesija {self.session_id} završena. "
@@ -84,7 +84,7 @@ class SyncSessionManager:
 
     def _ensure_tables(self):
         """Kreira tabele ako ne postoje."""
-        self.db.conn.executescript("""
+        self.db.executescript("""
             CREATE TABLE IF NOT EXISTS sync_sessions (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 session_id TEXT UNIQUE NOT NULL,
@@ -105,21 +105,19 @@ class SyncSessionManager:
 
         # Dodaj session_id kolonu u logs ako ne postoji
         try:
-            self.db.conn.execute("""
+            self.db.execute_write("""
                 ALTER TABLE logs ADD COLUMN session_id TEXT
             """)
-            self.db.conn.commit()
             log.info("✅ Dodana session_id kolona u logs tabelu")
         except Exception:
             pass  # Kolona već postoji
 
         # Kreiraj index
         try:
-            self.db.conn.execute("""
+            self.db.execute_write("""
                 CREATE INDEX IF NOT EXISTS idx_logs_session 
                 ON logs(session_id)
             """)
-            self.db.conn.commit()
         except Exception:
             pass
 
@@ -192,9 +190,10 @@ class SyncSessionManager:
 
     def delete_session(self, session_id: str):
         """Briše sesiju i sve vezane logove."""
-        self.db.conn.execute("DELETE FROM logs WHERE session_id = ?", (session_id,))
-        self.db.conn.execute("DELETE FROM sync_sessions WHERE session_id = ?", (session_id,))
-        self.db.conn.commit()
+        def delete(conn):
+            conn.execute("DELETE FROM logs WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM sync_sessions WHERE session_id = ?", (session_id,))
+        self.db.write(delete)
         log.info(f"🗑️ Obrisana sesija: {session_id}")
 
     def clear_old_sessions(self, keep_last: int = 30):
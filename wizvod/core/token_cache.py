@@ -0,0 +1,409 @@
+"""
+Zajednički keš OAuth2 tokena (Gmail, Outlook, Yahoo).
+
+Za svaki (provider, email) čuva access token, refresh token i vrijeme isteka,
+zajedno sa podacima potrebnim za osvježavanje (token endpoint, client_id,
+client_secret, scope). Osvježavanje je standardni refresh_token grant
+(RFC 6749, 6), isti za sve providere, pa ne zahtijeva msal/google biblioteke.
+
+Pozadinska nit osvježava token REFRESH_AHEAD_SECONDS prije isteka, pa
+connect_imap dobija važeći token iz memorije bez čekanja na mrežu. Samo ako
+token već jeste istekao (npr. računar je spavao), osvježava se odmah.
+
+Fajl (~/.wizvod/tokens/token_cache.json) može čitati samo vlasnik (0600), a
+tokeni su dodatno enkriptovani sa encrypt_secret kad je ključ podešen.
+"""
+import base64
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from wizvod.core.crypto import decrypt_secret, encrypt_secret
+from wizvod.core.logger import get_logger
+
+log = get_logger("token_cache")
+
+TOKEN_CACHE_FILE = Path(Path.home() / ".wizvod" / "tokens" / "token_cache.json")
+
+# Token se osvježava u pozadini ovoliko sekundi prije isteka
+REFRESH_AHEAD_SECONDS = 5 * 60
+
+# Token kojem je ostalo manje od ovoga se ne daje IMAP-u (osvježava se odmah)
+MIN_VALID_SECONDS = 60
+
+# Pauza prije ponovnog pokušaja nakon neuspješnog osvježavanja u pozadini
+RETRY_SECONDS = 60
+
+# Timeout HTTP zahtjeva prema token endpointu
+HTTP_TIMEOUT = 30
+
+# Kad server ne vrati expires_in
+DEFAULT_EXPIRES_IN = 3600
+
+_SECRET_FIELDS = ("access_token", "refresh_token", "client_secret")
+
+
+class TokenRefreshError(Exception):
+    """Token endpoint je odbio ili nije odgovorio na refresh zahtjev."""
+    pass
+
+
+class OAuthToken:
+    """
+    Token jednog naloga sa podacima za osvježavanje.
+
+    Args:
+        provider: "gmail", "outlook" ili "yahoo"
+        email: Adresa naloga
+        access_token: Trenutni access token
+        refresh_token: Refresh token (None ako provider ne dozvoljava osvježavanje)
+        expires_at: Unix vrijeme isteka access tokena
+        token_url: Token endpoint za refresh_token grant
+        client_id: OAuth client ID
+        client_secret: OAuth client secret (None za javne klijente, npr. Outlook)
+        scope: Scope (razmakom odvojen) koji se šalje pri osvježavanju
+    """
+
+    def __init__(self, provider: str, email: str, access_token: str,
+                 refresh_token: Optional[str], expires_at: float, token_url: str,
+                 client_id: str, client_secret: Optional[str] = None, scope: Optional[str] = None):
+        self.provider = provider
+        self.email = (email or "").lower()
+        self.access_token = access_token
+        self.refresh_token = refresh_token
+        self.expires_at = float(expires_at or 0)
+        self.token_url = token_url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.scope = scope
+
+    @classmethod
+    def from_response(cls, provider: str, email: str, response: dict, token_url: str,
+                      client_id: str, client_secret: Optional[str] = None,
+                      scope: Optional[str] = None, issued_at: Optional[float] = None) -> "OAuthToken":
+        """Token iz odgovora token endpointa (access_token, expires_in/expires_at, refresh_token)."""
+        issued_at = time.time() if issued_at is None else issued_at
+        if response.get("expires_at"):
+            expires_at = float(response["expires_at"])
+        else:
+            expires_at = issued_at + float(response.get("expires_in") or DEFAULT_EXPIRES_IN)
+        return cls(provider, email, response["access_token"], response.get("refresh_token"),
+                   expires_at, token_url, client_id, client_secret, scope)
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return (self.provider, self.email)
+
+    def remaining(self, now: Optional[float] = None) -> float:
+        """Sekunde do isteka access tokena."""
+        return self.expires_at - (time.time() if now is None else now)
+
+    def to_dict(self) -> dict:
+        data = dict(vars(self))
+        for field in _SECRET_FIELDS:
+            if data[field]:
+                data[field] = encrypt_secret(data[field]).decode("utf-8")
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "OAuthToken":
+        data = dict(data)
+        for field in _SECRET_FIELDS:
+            if data.get(field):
+                data[field] = decrypt_secret(data[field].encode("utf-8"))
+        return cls(**data)
+
+    def __repr__(self):
+        return f"<OAuthToken {self.provider}:{self.email} {self.remaining():.0f}s>"
+
+
+def refresh_grant(token: OAuthToken) -> dict:
+    """
+    Šalje refresh_token grant na token endpoint.
+
+    Returns:
+        JSON odgovor servera (access_token, expires_in, opciono novi refresh_token)
+
+    Raises:
+        TokenRefreshError: Ako nema refresh tokena ili server vrati grešku
+    """
+    import urllib.error
+    import urllib.parse
+    import urllib.request
+
+    if not token.refresh_token:
+        raise TokenRefreshError(f"{token.provider}:{token.email} nema refresh token")
+
+    form = {"grant_type": "refresh_token", "refresh_token": token.refresh_token,
+            "client_id": token.client_id}
+    if token.client_secret:
+        form["client_secret"] = token.client_secret
+    if token.scope:
+        form["scope"] = token.scope
+    request = urllib.request.Request(
+        token.token_url, data=urllib.parse.urlencode(form).encode("ascii"),
+        headers={"Content-Type": "application/x-www-form-urlencoded", "Accept": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT) as resp:
+            data = json.loads(resp.read().decode("utf-8"))
+    except urllib.error.HTTPError as e:
+        detail = e.read().decode("utf-8", "replace")[:200]
+        raise TokenRefreshError(f"HTTP {e.code}: {detail}") from e
+    except (OSError, ValueError) as e:
+        raise TokenRefreshError(str(e)) from e
+    if not isinstance(data, dict) or not data.get("access_token"):
+        raise TokenRefreshError(f"Neispravan odgovor: {str(data)[:200]}")
+    return data
+
+
+def token_owner(data: dict) -> Optional[str]:
+    """
+    Adresa naloga za koji je token izdat, ako se može utvrditi iz odgovora.
+
+    Gleda polja "email"/"account", msal id_token_claims i payload id_token-a
+    (bez provjere potpisa — služi samo da se token iz ranije verzije ne
+    dodijeli pogrešnom nalogu).
+
+    Returns:
+        Adresa malim slovima ili None
+    """
+    claims = dict(data.get("id_token_claims") or {})
+    id_token = data.get("id_token")
+    if not claims and isinstance(id_token, str) and id_token.count(".") == 2:
+        try:
+            payload = id_token.split(".")[1]
+            claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        except (ValueError, TypeError):
+            claims = {}
+    for value in (data.get("email"), data.get("account"), claims.get("email"),
+                  claims.get("preferred_username"), claims.get("upn")):
+        if isinstance(value, str) and "@" in value:
+            return value.strip().lower()
+    return None
+
+
+class TokenCache:
+    """
+    Keš tokena sa osvježavanjem u pozadini.
+
+    Args:
+        path: JSON fajl keša
+        refresh_ahead: Koliko sekundi prije isteka se token osvježava u pozadini
+        min_valid: Najmanje preostalo trajanje tokena koji se vraća bez osvježavanja
+    """
+
+    def __init__(self, path: Path = TOKEN_CACHE_FILE, refresh_ahead: float = REFRESH_AHEAD_SECONDS,
+                 min_valid: float = MIN_VALID_SECONDS):
+        self.path = Path(path)
+        self.refresh_ahead = refresh_ahead
+        self.min_valid = min_valid
+        self._tokens: Dict[Tuple[str, str], OAuthToken] = {}
+        self._retry_at: Dict[Tuple[str, str], float] = {}
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.RLock()
+        self._wake = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._load()
+
+    # ------------------------------------------------------------
+    # Čitanje i upis
+    # ------------------------------------------------------------
+    def get_access_token(self, provider: str, email: str) -> Optional[str]:
+        """
+        Važeći access token za nalog ili None ako ga nema u kešu.
+
+        Ako je ostalo manje od min_valid sekundi, token se osvježava odmah
+        (inače to radi pozadinska nit prije isteka).
+        """
+        token = self.find(provider, email)
+        if token is None:
+            return None
+        self.start()
+        if token.remaining() > self.min_valid:
+            return token.access_token
+        if not token.refresh_token:
+            return None
+        try:
+            return self.refresh(token.key, force=False).access_token
+        except TokenRefreshError as e:
+            log.error(f"❌ Osvježavanje tokena {provider}:{email} nije uspjelo: {e}")
+            return None
+
+    def find(self, provider: str, email: str) -> Optional[OAuthToken]:
+        """Token za (provider, email) ili None — token drugog naloga se nikad ne vraća."""
+        with self._lock:
+            return self._tokens.get((provider, (email or "").lower()))
+
+    def put(self, token: OAuthToken):
+        """Dodaje ili zamjenjuje token i budi pozadinsku nit."""
+        with self._lock:
+            self._tokens[token.key] = token
+            self._retry_at.pop(token.key, None)
+            self._save()
+            self._wake.notify_all()
+
+    def remove(self, provider: str, email: str):
+        with self._lock:
+            if self._tokens.pop((provider, (email or "").lower()), None) is not None:
+                self._save()
+
+    def __len__(self):
+        return len(self._tokens)
+
+    # ------------------------------------------------------------
+    # Osvježavanje
+    # ------------------------------------------------------------
+    def refresh(self, key: Tuple[str, str], force: bool = True) -> OAuthToken:
+        """
+        Osvježava token (jedan zahtjev po nalogu, i kad ga traži više niti).
+
+        Args:
+            key: (provider, email)
+            force: False preskače osvježavanje ako je token u međuvremenu
+                   osvježen (npr. dok je nit čekala na lock)
+
+        Raises:
+            TokenRefreshError: Ako osvježavanje ne uspije
+        """
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                token = self._tokens.get(key)
+            if token is None:
+                raise TokenRefreshError(f"{key[0]}:{key[1]} nije u kešu")
+            if token.remaining() > self.refresh_ahead and not force:
+                return token
+
+            started = time.time()
+            response = refresh_grant(token)
+            fresh = OAuthToken.from_response(
+                token.provider, token.email, response, token.token_url, token.client_id,
+                token.client_secret, token.scope, issued_at=started)
+            if not fresh.refresh_token:
+                fresh.refresh_token = token.refresh_token  # Google ne vraća novi refresh token
+            self.put(fresh)
+            log.info(f"🔑 Token {fresh.provider}:{fresh.email} osvježen (važi {fresh.remaining() / 60:.0f} min).")
+            return fresh
+
+    def start(self):
+        """Pokreće pozadinsku nit za osvježavanje (ako već ne radi)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="token-refresh", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """Zaustavlja pozadinsku nit."""
+        self._stop.set()
+        with self._lock:
+            self._wake.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=5)
+
+    def _next_due(self, now: float):
+        """(ključ, vrijeme) tokena koji prvi treba osvježiti, ili (None, None)."""
+        due_key, due_at = None, None
+        for key, token in self._tokens.items():
+            if not token.refresh_token:
+                continue
+            at = max(token.expires_at - self.refresh_ahead, self._retry_at.get(key, 0))
+            if due_at is None or at < due_at:
+                due_key, due_at = key, at
+        return due_key, due_at
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._lock:
+                key, due_at = self._next_due(time.time())
+                wait = None if due_at is None else due_at - time.time()
+                if wait is None or wait > 0:
+                    self._wake.wait(timeout=wait)
+                    continue
+            try:
+                self.refresh(key, force=False)
+            except TokenRefreshError as e:
+                log.warning(f"⚠️ Token {key[0]}:{key[1]} nije osvježen, novi pokušaj za {RETRY_SECONDS}s: {e}")
+                with self._lock:
+                    self._retry_at[key] = time.time() + RETRY_SECONDS
+            except Exception as e:
+                log.error(f"❌ Greška pri osvježavanju tokena {key[0]}:{key[1]}: {e}")
+                with self._lock:
+                    self._retry_at[key] = time.time() + RETRY_SECONDS
+
+    # ------------------------------------------------------------
+    # Fajl
+    # ------------------------------------------------------------
+    def _load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            log.warning(f"⚠️ Keš tokena nije učitan ({self.path}): {e}")
+            return
+        for item in data.get("tokens", []):
+            try:
+                token = OAuthToken.from_dict(item)
+            except (TypeError, KeyError) as e:
+                log.warning(f"⚠️ Preskačem neispravan token u kešu: {e}")
+                continue
+            self._tokens[token.key] = token
+
+    def _save(self):
+        """Upisuje keš atomski, u fajl koji samo vlasnik može čitati (0600)."""
+        payload = json.dumps({"tokens": [t.to_dict() for t in self._tokens.values()]}, indent=2)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.chmod(tmp, 0o600)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            log.error(f"❌ Keš tokena nije snimljen ({self.path}): {e}")
+
+
+def legacy_token(path: Path, email: str) -> Optional[dict]:
+    """
+    Token iz fajla ranije verzije (jedan fajl po provideru), samo ako je izdat za dati nalog.
+
+    Raniji fajlovi nisu bili vezani za adresu; ako se vlasnik ne može utvrditi
+    (token_owner), token se ne preuzima i nalog se prijavljuje ponovo.
+    """
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        log.warning(f"⚠️ Token iz ranije verzije nije učitan ({path}): {e}")
+        return None
+    if not isinstance(data, dict):
+        return None
+    owner = token_owner(data)
+    if owner is None or owner != (email or "").lower():
+        log.info(f"Token iz {Path(path).name} nije izdat za {email} — potrebna je nova prijava.")
+        return None
+    return data
+
+
+_cache: Optional[TokenCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_token_cache() -> TokenCache:
+    """Zajednički keš tokena (učitava se pri prvom pozivu)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TokenCache()
+    return _cache
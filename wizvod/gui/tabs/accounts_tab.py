@@ -192,17 +192,18 @@ class AccountsTab:
     # ================================================================
     def connect_gmail_oauth(self):
         try:
-            token = EmailAuthManager.get_auth_method("gmail", "user")[1]
+            address = "gmail_user@google.com"  # isti ključ u kešu tokena kao pri sinhronizaciji
+            token = EmailAuthManager.get_auth_method("gmail", address)[1]
             if not token:
                 messagebox.showerror("Greška", "Nije moguće dobiti Gmail token.")
                 return
             self.db.add_mail_account(
                 provider="Gmail (OAuth2)",
-                email="gmail_user@google.com",
+                email=address,
                 imap_host="imap.gmail.com",
                 imap_port=993,
                 use_ssl=True,
-                username="gmail_user@google.com",
+                username=address,
                 secret_encrypted=encrypt_secret(token)
             )
             messagebox.showinfo("Uspjeh", "✅ Gmail nalog je uspješno povezan.")
@@ -213,17 +214,18 @@ class AccountsTab:
 
     def connect_outlook_oauth(self):
         try:
-            token = EmailAuthManager.get_auth_method("outlook", "user")[1]
+            address = "outlook_user@outlook.com"  # isti ključ u kešu tokena kao pri sinhronizaciji
+            token = EmailAuthManager.get_auth_method("outlook", address)[1]
             if not token:
                 messagebox.showerror("Greška", "Nije moguće dobiti Outlook token.")
                 return
             self.db.add_mail_account(
                 provider="Outlook (OAuth2)",
-                email="outlook_user@outlook.com",
+                email=address,
                 imap_host="outlook.office365.com",
                 imap_port=993,
                 use_ssl=True,
-                username="outlook_user@outlook.com",
+                username=address,
                 secret_encrypted=encrypt_secret(token)
             )
             messagebox.showinfo("Uspjeh", "✅ Outlook nalog je uspješno povezan.")
@@ -234,17 +236,18 @@ class AccountsTab:
 
     def connect_yahoo_oauth(self):
         try:
-            token = EmailAuthManager.get_auth_method("yahoo", "user")[1]
+            address = "yahoo_user@yahoo.com"  # isti ključ u kešu tokena kao pri sinhronizaciji
+            token = EmailAuthManager.get_auth_method("yahoo", address)[1]
             if not token:
                 messagebox.showerror("Greška", "Nije moguće dobiti Yahoo token.")
                 return
             self.db.add_mail_account(
                 provider="Yahoo (OAuth2)",
-                email="yahoo_user@yahoo.com",
+                email=address,
                 imap_host="imap.mail.yahoo.com",
                 imap_port=993,
                 use_ssl=True,
-                username="yahoo_user@yahoo.com",
+                username=address,
                 secret_encrypted=encrypt_secret(token)
             )
             messagebox.showinfo("Uspjeh", "✅ Yahoo nalog je uspješno povezan.")
@@ -211,7 +211,7 @@ class DashboardTab:
     def _run_sync_thread(self):
         try:
             log.info("Dashboard: Pokrenuta manualna sinhronizacija")
-            run_once()
+            run_once(self.db)  # ista baza (i nit za upis) kao GUI
             status_text = "✅ Uspješno završeno"
             status_color = "#059669"
         except Exception as e:
@@ -282,7 +282,7 @@ class DashboardTab:
             from wizvod.worker import run_worker
             from wizvod.core.sync_sessions import SyncSessionManager
 
-            run_worker()
+            run_worker(self.db)  # ista baza (i nit za upis) kao GUI
 
             session_mgr = SyncSessionManager(self.db)
             sessions = session_mgr.get_sessions(limit=1)
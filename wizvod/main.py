@@ -1,4 +1,8 @@
+import multiprocessing
+
 from wizvod.gui.main_window import run_app
 
 if __name__ == "__main__":
+    # Potrebno za ProcessPoolExecutor u zamrznutom (PyInstaller) exe-u
+    multiprocessing.freeze_support()
     run_app()
@@ -1,11 +1,25 @@
 import os
+import argparse
+import hashlib
+import multiprocessing
+import signal
+import threading
+import time
 import traceback
 from datetime import datetime, timedelta
+from functools import partial
 from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-from wizvod.core.db import Database
-from wizvod.core.email_fetcher import EmailFetcher
-from wizvod.core.pdf_parser import PDFParser
+from wizvod.core.db import LOG_BATCH_SIZE, Database, normalize_account
+from wizvod.core.email_fetcher import IDLE_RENEW_SECONDS, NOOP_POLL_SECONDS, EmailFetcher
+from wizvod.core.async_email_fetcher import AsyncEmailFetcher, ImapEventLoop, LoopBoundFetcher
+from wizvod.core.pdf_parser import PARSER_VERSION, ParsePool, parse_cache_key
+from wizvod.core.bank_rules import all_rule_versions, get_rule_info
+from wizvod.core.pipeline import DEFAULT_QUEUE_SIZE, Pipeline
+from wizvod.core.routing import AccountRouter, routing_key
+from wizvod.core.email_auth_manager import EmailAuthManager
+from wizvod.core.token_cache import get_token_cache
 from wizvod.core.logger import get_logger
 from wizvod.core.license_manager import LicenseManager
 from wizvod.core.config_manager import AppConfig
@@ -14,46 +28,802 @@ from wizvod.core.sync_sessions import SyncSession
 log = get_logger("worker")
 
 
-def run_worker():
-    """Glavna funkcija workera — automatsko preuzimanje izvoda sa podrškom za sesije."""
-    log.info("Pokrećem worker proces...")
+# Podrazumijevani broj paralelnih IMAP konekcija (jedna po nalogu)
+DEFAULT_IMAP_WORKERS = 4
 
-    from wizvod.core.db import DB_PATH
+# Ograničenja po IMAP hostu, format "host=n, host=n" (Gmail ograničava istovremene konekcije)
+DEFAULT_HOST_LIMITS = "imap.gmail.com=2"
 
-    log.info(f"🧭 Trenutni radni direktorij: {os.getcwd()}")
-    log.info(f"👤 Korisnički HOME: {Path.home()}")
-    log.info(f"📦 Baza: {DB_PATH}")
+# Daemon režim: pauza između ciklusa (sekunde)
+DEFAULT_DAEMON_INTERVAL = 300
 
-    # === Inicijalizacija modula ===
-    db = Database()
-    cfg = AppConfig(db)
-    lic = LicenseManager(db)
+# Konekcija koja je duže od ovoga bila neaktivna se otvara iznova (server je gasi nakon ~30 min, RFC 3501)
+DEFAULT_IMAP_IDLE_RECONNECT = 25 * 60
+
+# Daemon režim: koliko često se ponovo provjerava licenca (sekunde)
+LICENSE_RECHECK_SECONDS = 6 * 3600
+
+# Koliko pokretanja poruka bez klijenta zadržava UID watermark; nakon toga se
+# preskače, a ponovo se traži tek kad se promijene računi klijenata (_senders_hash)
+ROUTE_RETRY_ATTEMPTS = 3
+
+
+def _parse_host_limits(value: str) -> Dict[str, int]:
+    """'imap.gmail.com=2, outlook.office365.com=4' -> {'imap.gmail.com': 2, 'outlook.office365.com': 4}"""
+    limits: Dict[str, int] = {}
+    for item in (value or "").replace(";", ",").split(","):
+        host, _, n = item.partition("=")
+        host = host.strip().lower()
+        if host and n.strip().isdigit():
+            limits[host] = max(1, int(n))
+    return limits
+
+
+def _build_sender_plan(clients: List[dict]) -> Dict[str, List[dict]]:
+    """
+    Grupiše klijente po pošiljaocu izvoda.
+
+    Više klijenata često dobija izvode sa iste adrese banke; plan omogućava
+    jednu pretragu i jedno preuzimanje po pošiljaocu umjesto po klijentu.
+
+    Returns:
+        Dictionary {sender_email (lowercase): [klijent, ...]}
+    """
+    plan: Dict[str, List[dict]] = {}
+    for client in clients:
+        sender_list = [s.strip().lower() for s in (client["sender_email"] or "").split(",") if s.strip()]
+        if not sender_list:
+            log.warning(f"⚠️ Klijent '{client['name']}' nema definisan sender_email.")
+            continue
+        for sender in sender_list:
+            bucket = plan.setdefault(sender, [])
+            if client not in bucket:
+                bucket.append(client)
+    return plan
+
+
+def _senders_hash(plan: Dict[str, List[dict]]) -> str:
+    """
+    Otisak liste pošiljalaca i računa njihovih klijenata — promjena poništava UID watermark.
+
+    Novi račun klijenta tako ponovo otvara i poruke koje ranije nisu mogle biti raspoređene.
+    """
+    lines = [f"{sender} {' '.join(sorted(routing_key(c.get('account_number')) for c in clients))}"
+             for sender, clients in plan.items()]
+    return hashlib.sha1("\n".join(sorted(lines)).encode("utf-8")).hexdigest()
+
+
+def _next_watermark(previous: int, seen: Iterable[int], failed: Iterable[int]) -> int:
+    """
+    Računa novi najveći obrađeni UID.
+
+    Watermark ne prelazi prvu poruku čija obrada nije uspjela, da bi se ona
+    ponovo pokušala u sljedećem pokretanju.
+    """
+    new_last = max([previous, *seen])
+    failed = list(failed)
+    if failed:
+        new_last = min(new_last, min(failed) - 1)
+    return max(previous, new_last)
+
+
+class _HostLimiter:
+    """Ograničava broj istovremenih IMAP konekcija prema istom serveru."""
+
+    def __init__(self, limits: Dict[str, int]):
+        self.limits = limits
+        self._lock = threading.Lock()
+        self._semaphores: Dict[str, threading.Semaphore] = {}
+
+    def slot(self, host: str) -> threading.Semaphore:
+        """Semafor za host; koristi se kao `with limiter.slot(host): ...`."""
+        host = (host or "").strip().lower()
+        with self._lock:
+            if host not in self._semaphores:
+                # Host bez posebnog limita ograničava samo ukupni broj workera
+                self._semaphores[host] = threading.Semaphore(self.limits.get(host, 1000))
+            return self._semaphores[host]
+
+
+def _watermark_holds(db: Database, job: "_AccountJob", folder: str, uidvalidity: int) -> Set[int]:
+    """
+    UID-ovi ispred kojih se watermark zaustavlja.
+
+    To su poruke čija obrada nije uspjela i poruke bez klijenta dok nisu
+    pokušane ROUTE_RETRY_ATTEMPTS puta — poruka koja nikako ne može biti
+    raspoređena ne smije zauvijek zadržati inkrementalni sync.
+    """
+    attempts = db.record_retry_uids(job.acc["id"], folder, uidvalidity, job.retry_uids, job.seen_uids)
+    held = {uid for uid, n in attempts.items() if n < ROUTE_RETRY_ATTEMPTS}
+    if len(held) < len(attempts):
+        log.warning(f"   [{job.acc.get('email')}] ⚠️ {len(attempts) - len(held)} poruka bez klijenta nakon "
+                    f"{ROUTE_RETRY_ATTEMPTS} pokušaja — preskačem ih do promjene računa klijenata.")
+    return job.failed_uids | held
+
+
+class _AccountJob:
+    """
+    Praćenje poruka jednog naloga kroz pipeline.
+
+    Fetch faza čeka da sve poruke naloga prođu kroz pipeline, pa tek onda
+    označava pročitane poruke i pomjera UID watermark na istoj konekciji.
+    """
+
+    def __init__(self, acc: dict, fetcher: EmailFetcher):
+        self.acc = acc
+        self.fetcher = fetcher
+        self.seen_uids: List[int] = []
+        self.read_uids: Set[int] = set()
+        self.failed_uids: Set[int] = set()
+        self.retry_uids: Set[int] = set()  # poruke bez klijenta — ponovo u sljedećem pokretanju
+        self._pending = 0
+        self._cond = threading.Condition()
+
+    def track(self, uid: Optional[int]):
+        """Nova poruka ulazi u pipeline."""
+        with self._cond:
+            self._pending += 1
+            if uid is not None:
+                self.seen_uids.append(uid)
+
+    def expand(self, n: int):
+        """Poruka je razbijena na n priloga (n - 1 dodatnih stavki)."""
+        with self._cond:
+            self._pending += n
+
+    def release(self, uid: Optional[int], status: Optional[str] = None, retry: bool = False):
+        """
+        Stavka je završila obradu sa datim statusom.
+
+        Args:
+            retry: Poruka nije raspoređena klijentu — watermark ne prelazi preko
+                   nje najviše ROUTE_RETRY_ATTEMPTS pokretanja (vidi _fetch_stage)
+        """
+        with self._cond:
+            self._pending -= 1
+            if uid is not None:
+                if status == "ok":
+                    self.read_uids.add(uid)
+                elif status == "error":
+                    self.failed_uids.add(uid)
+                if retry:
+                    self.retry_uids.add(uid)
+            if self._pending <= 0:
+                self._cond.notify_all()
+
+    def wait(self, abort: threading.Event):
+        with self._cond:
+            while self._pending > 0 and not abort.is_set():
+                self._cond.wait(0.5)
+
+
+class _Work:
+    """Stavka koja putuje kroz pipeline: poruka, a nakon extract faze jedan PDF prilog."""
+
+    def __init__(self, job: _AccountJob, uid: Optional[int], subject: str, sender_addr: str,
+                 sender_clients: List[dict], msg=None):
+        self.job = job
+        self.uid = uid
+        self.subject = subject
+        self.sender_addr = sender_addr
+        self.sender_clients = sender_clients
+        self.msg = msg
+        self.fname: Optional[str] = None
+        self.content: Optional[bytes] = None
+        self.sha256: Optional[str] = None
+        self.register_hash = False
+        self.parsed = None
+        self.cache_key: Optional[tuple] = None
+        self.hash_versions: tuple = ()  # (pravilo, verzija pravila, PARSER_VERSION) za registar priloga
+        self.parsed_fresh = False
+        self.client_id: Optional[int] = None
+        self.account_number: Optional[str] = None
+        self.stmt_no: Optional[str] = None
+        self.file_path: Optional[str] = None
+        self.status: Optional[str] = None
+        self.message = ""
+        self.retry = False
+        self.error: Optional[Exception] = None
+        self.error_trace = ""
+
+    def for_attachment(self, fname: str, content: bytes) -> "_Work":
+        work = _Work(self.job, self.uid, self.subject, self.sender_addr, self.sender_clients)
+        work.fname = fname
+        work.content = content
+        return work
+
+
+def _account_signature(acc: dict) -> tuple:
+    """Podaci naloga od kojih zavisi konekcija — izmjena naloga znači novu konekciju."""
+    return tuple(acc.get(k) for k in ("imap_host", "imap_port", "use_ssl", "username", "email",
+                                      "provider", "secret_encrypted"))
+
+
+class _WorkerResources:
+    """
+    Resursi koji ne zavise od podataka jednog pokretanja: IMAP engine, ParsePool i konekcije.
+
+    U daemon režimu (persistent=True) žive između ciklusa: prijavljene IMAP
+    konekcije se vraćaju u pool i ponovo koriste u sljedećem ciklusu, a
+    procesi za parsiranje ostaju "topli". Inače se svaka konekcija zatvara
+    nakon obrade naloga (ponašanje kao ranije).
+    """
+
+    # Podešavanja čija izmjena zahtijeva nove resurse
+    KEYS = ("imap_engine", "fetch_mode", "parse_workers", "pdf_text_mode")
+
+    def __init__(self, settings: Dict[str, str], persistent: bool = False):
+        self.settings = {k: settings.get(k) for k in self.KEYS}
+        self.persistent = persistent
+        self.fetch_mode = settings.get("fetch_mode", "bodystructure")
+        # "imaplib" (nit po konekciji) ili "asyncio" (sve konekcije na jednom event loop-u, pipelined FETCH)
+        self.imap_engine = settings.get("imap_engine", "imaplib")
+        self.imap_loop = ImapEventLoop() if self.imap_engine == "asyncio" else None
+        self.idle_reconnect = int(settings.get("imap_idle_reconnect", DEFAULT_IMAP_IDLE_RECONNECT))
+        # "header": pravila prvo vide samo prvu stranicu; "full": tekst svih stranica
+        self.parse_pool = ParsePool(ParsePool.resolve_workers(settings.get("parse_workers", "0")),
+                                    text_mode=settings.get("pdf_text_mode", "header"))
+        self._idle: Dict[int, tuple] = {}  # id naloga -> (fetcher, potpis naloga, vrijeme zadnje upotrebe)
+        self._lock = threading.Lock()
+
+    def compatible(self, settings: Dict[str, str]) -> bool:
+        return self.settings == {k: settings.get(k) for k in self.KEYS}
+
+    def new_fetcher(self):
+        """IMAP klijent za jedan nalog prema podešenom engine-u (isti interfejs za oba)."""
+        if self.imap_loop is not None:
+            return LoopBoundFetcher(self.imap_loop, AsyncEmailFetcher(fetch_mode=self.fetch_mode))
+        return EmailFetcher(fetch_mode=self.fetch_mode)
+
+    def acquire(self, acc: dict):
+        """
+        Povezan IMAP klijent za nalog.
+
+        Postojeća konekcija iz poola se koristi ako nalog nije mijenjan i nije
+        predugo neaktivna; SELECT osvježava stanje foldera (nove poruke,
+        UIDVALIDITY) i ujedno provjerava da je konekcija živa.
+
+        Raises:
+            Exception: Ako povezivanje ili prijava nisu uspjeli
+        """
+        with self._lock:
+            entry = self._idle.pop(acc["id"], None)
+        if entry is not None:
+            fetcher, signature, last_used = entry
+            idle = time.monotonic() - last_used
+            if signature == _account_signature(acc) and idle < self.idle_reconnect:
+                try:
+                    fetcher.select_folder(fetcher.folder)
+                    log.info(f"♻️ Koristim postojeću konekciju za {acc.get('email')}")
+                    return fetcher
+                except Exception as e:
+                    log.info(f"🔌 Konekcija za {acc.get('email')} više nije aktivna ({e}) — povezujem ponovo.")
+            fetcher.close()
+
+        fetcher = self.new_fetcher()
+        try:
+            fetcher.connect_imap(acc)
+        except Exception:
+            fetcher.close()
+            raise
+        return fetcher
+
+    def release(self, acc: dict, fetcher, healthy: bool = True):
+        """Vraća konekciju u pool (daemon režim) ili je zatvara."""
+        if not (self.persistent and healthy):
+            fetcher.close()
+            return
+        with self._lock:
+            old = self._idle.pop(acc["id"], None)
+            self._idle[acc["id"]] = (fetcher, _account_signature(acc), time.monotonic())
+        if old is not None:
+            old[0].close()
+
+    def prune(self, account_ids: Iterable[int]):
+        """Zatvara konekcije naloga koji više ne postoje."""
+        keep = set(account_ids)
+        with self._lock:
+            stale = [self._idle.pop(k) for k in list(self._idle) if k not in keep]
+        for fetcher, _, _ in stale:
+            fetcher.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = list(self._idle.values()), {}
+        for fetcher, _, _ in idle:
+            fetcher.close()
+        self.parse_pool.shutdown()
+        if self.imap_loop is not None:
+            self.imap_loop.shutdown()
+
+
+class _SyncContext:
+    """Podešavanja i zajednički resursi jednog pokretanja workera (dijele ih sve faze pipeline-a)."""
+
+    def __init__(self, db: Database, session: SyncSession, settings: Dict[str, str], plan: Dict[str, List[dict]],
+                 router: AccountRouter, resources: _WorkerResources):
+        self.db = db
+        self.session = session
+        self.resources = resources
+        self.plan = plan
+        self.router = router
+        self.senders_hash = _senders_hash(plan)
+
+        self.lookback_days = int(settings.get("lookback_days", 7))
+        self.since = datetime.now() - timedelta(days=self.lookback_days)
+        self.unread_only = settings.get("read_mode", "unread") == "unread"
+        self.mark_as_read = settings.get("mark_as_read", "1") == "1"
+        self.batched_search = settings.get("search_mode", "batched") == "batched"
+        self.incremental = settings.get("incremental_sync", "1") == "1"
+        self.imap_workers = int(settings.get("imap_workers", DEFAULT_IMAP_WORKERS))
+        self.queue_size = int(settings.get("pipeline_queue_size", DEFAULT_QUEUE_SIZE))
+        self.limiter = _HostLimiter(_parse_host_limits(settings.get("imap_host_limits", DEFAULT_HOST_LIMITS)))
+        self.parse_pool = resources.parse_pool
+        # Keš rezultata parsiranja po (SHA-256, pravilo, verzija pravila)
+        self.parse_cache = settings.get("parse_cache", "1") == "1"
+        # registar priloga se koristi i bez keša parsiranja, pa se čisti uvijek (prije učitavanja ispod)
+        pruned = db.prune_parse_cache(all_rule_versions(), PARSER_VERSION)
+        if pruned:
+            log.info(f"🧹 Obrisano {pruned} zastarjelih rezultata parsiranja (promijenjena pravila).")
+
+        # SQLite konekcija je zajednička: upisi idu samo iz log faze, a sva ostala čitanja pod ovim lock-om
+        self.db_lock = threading.RLock()
+        # Logovi se upisuju u grupama (jedan commit po grupi umjesto po redu)
+        self.logs = db.log_writer(batch_size=int(settings.get("log_batch_size", LOG_BATCH_SIZE)))
+        # Svi preuzeti izvodi (client_id, račun, broj izvoda) — provjera duplikata bez upita na logs
+        self.downloaded: Set[Tuple[int, str, str]] = db.load_downloaded_statements()
+        # Registar obrađenih PDF-ova po SHA-256 — ponovljeni prilog se preskače prije parsiranja
+        self.attachment_hashes: Dict[str, tuple] = db.load_attachment_hashes()
+        # Sadržaj foldera klijenata (jedan scandir po folderu umjesto exists() po prilogu)
+        self.folders = _FolderIndex()
+        self.counts = {"ok": 0, "skipped": 0, "error": 0}
+        self._counts_lock = threading.Lock()
+        self.abort = threading.Event()
+
+    def close(self):
+        with self.db_lock:
+            self.logs.flush()
+
+    def count(self, status: str, n: int = 1):
+        with self._counts_lock:
+            self.counts[status] += n
+
+
+# ============================================================
+# FAZE PIPELINE-A: fetch → extract → parse → save → log
+# ============================================================
+def _fetch_stage(ctx: _SyncContext, acc: dict) -> Iterator[_Work]:
+    """
+    Faza 1 (IMAP): pretraga i preuzimanje poruka jednog naloga na vlastitoj konekciji.
+
+    Nakon što sve poruke naloga prođu kroz pipeline, označava uspješno
+    obrađene poruke kao pročitane (jednom komandom) i čuva UID watermark.
+    """
+    email = acc.get("email")
+
+    with ctx.limiter.slot(acc.get("imap_host")):
+        log.info(f"🔍 Provjeravam nalog {email} — broj pošiljalaca: {len(ctx.plan)}")
+        try:
+            fetcher = ctx.resources.acquire(acc)
+            log.info(f"✅ Povezan na {email}")
+        except Exception as e:
+            log.error(f"❌ Neuspjelo povezivanje za {email}: {e}")
+            ctx.count("error")
+            return
+
+        job = _AccountJob(acc, fetcher)
+        healthy = False  # konekcija se vraća u pool samo ako je nalog obrađen bez greške
+        try:
+            # Inkrementalni sync: traži samo UID-ove iznad zadnjeg obrađenog
+            min_uid = 0
+            state = None
+            if ctx.incremental:
+                with ctx.db_lock:
+                    state = ctx.db.get_sync_state(acc["id"], fetcher.folder)
+            if state and state["uidvalidity"] == fetcher.uidvalidity and state["senders_hash"] == ctx.senders_hash:
+                min_uid = state["last_uid"] + 1
+                log.info(f"   [{email}] ⏩ Inkrementalna pretraga od UID {min_uid}")
+            elif state:
+                log.info(f"   [{email}] 🔁 UIDVALIDITY ili lista pošiljalaca promijenjena — pretražujem cijeli period.")
+
+            account_ok = True
+            # Poruke se preuzimaju jedna po jedna (iter_messages) — pun red pipeline-a
+            # zaustavlja preuzimanje, pa memorija ne zavisi od broja poruka
+            groups = [list(ctx.plan)] if ctx.batched_search else [[sender] for sender in ctx.plan]
+            while groups:
+                senders = groups.pop(0)
+                found = dict.fromkeys(senders, 0)
+                try:
+                    if len(senders) == 1:
+                        log.info(f"   [{email}] 📧 Tražim poruke od: {senders[0]} "
+                                 f"(klijenata: {len(ctx.plan[senders[0]])})")
+                    for sender, msg in fetcher.iter_messages(ctx.since, senders, ctx.unread_only, min_uid=min_uid):
+                        found[sender] += 1
+                        uid = fetcher.get_uid(msg)
+                        job.track(uid)
+                        yield _Work(job, uid, fetcher.get_subject(msg), msg.get("From", ""), ctx.plan[sender], msg=msg)
+                        msg = None
+                except Exception as e:
+                    if len(senders) > 1 and not any(found.values()):
+                        log.warning(f"⚠️ Grupna pretraga nije uspjela za {email} ({e}) — tražim po pošiljaocu.")
+                        groups = [[sender] for sender in senders] + groups
+                        continue
+                    ctx.count("error")
+                    account_ok = False
+                    log.error(f"❌ Greška kod pošiljaoca {', '.join(senders)} ({email}): {e}")
+                    continue
+
+                for sender, n in found.items():
+                    log.info(f"   [{email}] 📨 Pronađeno {n} poruka od {sender} "
+                             f"u zadnjih {ctx.lookback_days} dana")
+
+            # Sačekaj da sve poruke naloga prođu kroz pipeline
+            job.wait(ctx.abort)
+            if ctx.abort.is_set():
+                return
+
+            if ctx.mark_as_read and job.read_uids:
+                fetcher.mark_uids_as_read(sorted(job.read_uids))
+
+            if ctx.incremental and account_ok and fetcher.uidvalidity is not None:
+                previous = min_uid - 1 if min_uid else 0
+                with ctx.db_lock:
+                    holds = _watermark_holds(ctx.db, job, fetcher.folder, fetcher.uidvalidity)
+                last_uid = _next_watermark(previous, job.seen_uids, holds)
+                with ctx.db_lock:
+                    # watermark se pomjera tek kad su logovi njegovih poruka upisani
+                    ctx.logs.flush()
+                    ctx.db.save_sync_state(acc["id"], fetcher.folder, fetcher.uidvalidity,
+                                           last_uid, ctx.senders_hash)
+            healthy = account_ok
+        finally:
+            ctx.resources.release(acc, fetcher, healthy)
+
+
+def _extract_stage(ctx: _SyncContext, work: _Work) -> List[_Work]:
+    """Faza 2 (MIME): razbija poruku na PDF priloge."""
+    attachments = work.job.fetcher.extract_attachments(work.msg)
+    work.msg = None  # poruka više nije potrebna
+    if not attachments:
+        work.job.release(work.uid)
+        return []
+
+    items = []
+    versions = _rule_versions(work.sender_addr)
+    for fname, content in attachments:
+        item = work.for_attachment(fname, content)
+        item.sha256 = hashlib.sha256(content).hexdigest()
+        with ctx.db_lock:
+            hit = ctx.attachment_hashes.get(item.sha256)
+        if hit is not None and tuple(hit[3:]) != versions:
+            hit = None  # obrađen starijim pravilom/parserom (npr. pravila ponovo učitana tokom rada)
+        if hit is not None:
+            # isti PDF je već obrađen — bez parsiranja i snimanja
+            item.client_id, item.stmt_no = hit[0], hit[1]
+            item.status = "skipped"
+            item.file_path = fname
+            item.message = f"Isti PDF je već obrađen (izvod {item.stmt_no})."
+            item.content = None
+        items.append(item)
+    # poruka postaje len(items) stavki tek kad su sve napravljene: ako obrada
+    # pukne ranije, u log fazu ide sama poruka (on_error) i brojač ostaje tačan
+    work.job.expand(len(items) - 1)
+    return items
+
+
+def _parse_stage(ctx: _SyncContext, work: _Work) -> List[_Work]:
+    """Faza 3 (CPU): broj računa i broj izvoda iz PDF-a (keš rezultata ili ParsePool)."""
+    if work.error is not None or work.status is not None:
+        return [work]
+
+    if ctx.parse_cache and work.sha256:
+        work.cache_key = parse_cache_key(work.sha256, work.sender_addr, work.subject, work.fname,
+                                         ctx.parse_pool.text_mode)
+        with ctx.db_lock:
+            work.parsed = ctx.db.get_parse_result(work.cache_key)
+        if work.parsed is not None:
+            return [work]
+
+    future = ctx.parse_pool.submit(work.content, work.sender_addr, work.subject, work.fname)
+    work.parsed = ctx.parse_pool.result(future, work.content, work.sender_addr, work.subject, work.fname)
+    work.parsed_fresh = True
+    return [work]
+
+
+class _FolderIndex:
+    """
+    Sadržaj foldera klijenata, učitan jednom po pokretanju.
+
+    Svaki folder se pročita jednim os.scandir pozivom (i kreira ako ne postoji);
+    imena se zatim rezervišu u memoriji, pa izbor slobodnog imena (_2, _3 ...)
+    ne zahtijeva exists()/mkdir pozive po prilogu — bitno za mrežne (SMB) foldere.
+    Imena se porede bez obzira na velika/mala slova (Windows/SMB).
+    """
+
+    def __init__(self):
+        self._names: Dict[str, Set[str]] = {}
+        self._next_suffix: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def _listing(self, folder: Path) -> Set[str]:
+        key = str(folder)
+        names = self._names.get(key)
+        if names is None:
+            try:
+                with os.scandir(folder) as it:
+                    names = {entry.name.lower() for entry in it}
+            except FileNotFoundError:
+                folder.mkdir(parents=True, exist_ok=True)
+                names = set()
+            self._names[key] = names
+        return names
+
+    def reserve(self, folder: Path, base_name: str) -> str:
+        """Rezerviše slobodno ime <base>.pdf, <base>_2.pdf, ... i vraća ga."""
+        with self._lock:
+            names = self._listing(folder)
+            save_name = f"{base_name}.pdf"
+            if save_name.lower() in names:
+                key = (str(folder), base_name.lower())
+                counter = self._next_suffix.get(key, 2)
+                while f"{base_name}_{counter}.pdf".lower() in names:
+                    counter += 1
+                save_name = f"{base_name}_{counter}.pdf"
+                self._next_suffix[key] = counter + 1
+            names.add(save_name.lower())
+            return save_name
 
-    # Provjera licence
+    def add(self, folder: Path, name: str):
+        """Fajl koji je u međuvremenu napravio neko drugi (otkriven pri upisu)."""
+        with self._lock:
+            self._listing(folder).add(name.lower())
+
+
+def _write_pdf(folders: _FolderIndex, client_dir: Path, stmt_no: str, fname: str,
+               content: bytes) -> Tuple[Path, str]:
+    """Snima PDF u folder klijenta pod brojem izvoda (uz _2, _3 ... ako ime već postoji)."""
+    base_name = stmt_no if stmt_no and stmt_no != "unknown" else Path(fname).stem
+    while True:
+        save_name = folders.reserve(client_dir, base_name)
+        pdf_path = client_dir / save_name
+        try:
+            # "xb": nikad ne prepisuje fajl koji je nastao nakon učitavanja foldera
+            with open(pdf_path, "xb") as f:
+                f.write(content)
+            return pdf_path, save_name
+        except FileExistsError:
+            folders.add(client_dir, save_name)
+
+
+def _save_stage(ctx: _SyncContext, work: _Work) -> List[_Work]:
+    """Faza 4 (disk): izbor klijenta, provjera duplikata i snimanje PDF-a u folder klijenta."""
+    if work.error is not None or work.status is not None:
+        return [work]
+
+    acct_no, stmt_no, _ = work.parsed
+    work.stmt_no = stmt_no = stmt_no or "unknown"
+    work.file_path = work.fname
+
+    # odredi klijenta po broju računa
+    client = ctx.router.route(acct_no, work.sender_clients)
+    if client is None:
+        # watermark ne prelazi ovu poruku do ROUTE_RETRY_ATTEMPTS pokretanja, a
+        # novi račun klijenta mijenja _senders_hash, pa se poruka opet pretražuje
+        work.status = "skipped"
+        work.retry = True
+        work.message = (f"Račun {acct_no or '?'} ne pripada nijednom klijentu "
+                        f"(poruka će se ponovo obraditi kad se doda račun klijenta).")
+        return [work]
+    work.client_id = client["id"]
+
+    # provjera duplikata (skup se puni na startu i dopunjava u save fazi, pa log faza smije kasniti)
+    work.account_number = normalize_account(client["account_number"])
+    key = (client["id"], work.account_number, stmt_no)
+    with ctx.db_lock:
+        duplicate = key in ctx.downloaded
+        if not duplicate:
+            ctx.downloaded.add(key)
+    if duplicate:
+        work.status = "skipped"
+        work.message = "Izvod već preuzet."
+        _register_attachment(ctx, work)
+        return [work]
+
+    # spremanje PDF-a
+    try:
+        pdf_path, save_name = _write_pdf(ctx.folders, Path(client["folder_path"]), stmt_no,
+                                         work.fname, work.content)
+    except Exception:
+        with ctx.db_lock:
+            ctx.downloaded.discard(key)
+        raise
+
+    work.content = None
+    work.status = "ok"
+    work.file_path = str(pdf_path)
+    work.message = f"Izvod {stmt_no} preuzet i sačuvan kao {save_name}."
+    _register_attachment(ctx, work)
+    return [work]
+
+
+def _rule_versions(sender_addr: str) -> tuple:
+    """(pravilo, verzija pravila, PARSER_VERSION) kojima se parsira PDF pošiljaoca."""
+    return (*get_rule_info(sender_addr), PARSER_VERSION)
+
+
+def _register_attachment(ctx: _SyncContext, work: _Work):
+    """Dodaje SHA-256 priloga u registar; isti PDF se u narednim porukama ne parsira ponovo."""
+    if not work.sha256:
+        return
+    # verzije uz koje je prilog parsiran — promjena pravila/parsera poništava zapis
+    work.hash_versions = tuple(work.cache_key[1:4]) if work.cache_key else _rule_versions(work.sender_addr)
+    with ctx.db_lock:
+        ctx.attachment_hashes[work.sha256] = (work.client_id, work.stmt_no, work.file_path, *work.hash_versions)
+    work.register_hash = True
+
+
+def _log_stage(ctx: _SyncContext, work: _Work) -> None:
+    """Faza 5 (baza): upis rezultata u logs — jedini upisivač u bazu tokom sinhronizacije."""
+    try:
+        if work.error is not None:
+            work.status = "error"
+            log.error(f"❌ Greška u obradi {work.fname}: {work.error}\n{work.error_trace}")
+            with ctx.db_lock:
+                ctx.logs.add(work.client_id, work.subject, work.sender_addr, "?", work.fname or "?",
+                             "error", str(work.error), session_id=ctx.session.session_id)
+        else:
+            with ctx.db_lock:
+                ctx.logs.add(work.client_id, work.subject, work.sender_addr, work.stmt_no, work.file_path,
+                             work.status, work.message, session_id=ctx.session.session_id)
+                if work.status == "ok":
+                    ctx.logs.add_downloaded(work.client_id, work.account_number, work.stmt_no, work.file_path)
+                if work.register_hash:
+                    ctx.logs.add_attachment(work.sha256, work.client_id, work.stmt_no, work.file_path,
+                                            *work.hash_versions)
+            if work.parsed_fresh and work.cache_key is not None:
+                with ctx.db_lock:
+                    ctx.logs.add_parse_result(work.cache_key, *work.parsed)
+        ctx.count(work.status)
+    finally:
+        work.job.release(work.uid, work.status or "error", retry=work.retry)
+
+
+def _mark_failed(work: _Work, error: Exception) -> List[_Work]:
+    """on_error: stavka nastavlja do log faze označena greškom."""
+    if isinstance(work, _Work):
+        work.error = error
+        work.error_trace = traceback.format_exc()
+        return [work]
+    return []
+
+
+def _build_pipeline(ctx: _SyncContext, account_count: int) -> Pipeline:
+    """Povezuje faze ograničenim redovima (backpressure između mreže, CPU-a i diska)."""
+    pipeline = Pipeline("sync")
+    pipeline.aborted = ctx.abort
+    q = ctx.queue_size
+    pipeline.add_stage("fetch", partial(_fetch_stage, ctx), workers=max(1, min(account_count, ctx.imap_workers)),
+                       maxsize=max(1, account_count))
+    pipeline.add_stage("extract", partial(_extract_stage, ctx), maxsize=q, on_error=_mark_failed)
+    pipeline.add_stage("parse", partial(_parse_stage, ctx), workers=max(1, ctx.parse_pool.workers),
+                       maxsize=q, on_error=_mark_failed)
+    pipeline.add_stage("save", partial(_save_stage, ctx), maxsize=q, on_error=_mark_failed)
+    pipeline.add_stage("log", partial(_log_stage, ctx), maxsize=q)
+    return pipeline
+
+
+class _PushWatcher(threading.Thread):
+    """
+    Nit koja drži IDLE sesiju (ili NOOP provjeru) za jedan nalog.
+
+    Koristi zasebnu imaplib konekciju koja samo čeka obavještenja; kad server
+    javi novu poruku (EXISTS), nalog se prijavljuje daemon petlji koja odmah
+    pokreće inkrementalnu sinhronizaciju tog naloga.
+    """
+
+    RETRY_SECONDS = (5, 30, 60, 300)
+
+    def __init__(self, acc: dict, notify: Callable[[int], None]):
+        super().__init__(name=f"wizvod-push-{acc['id']}", daemon=True)
+        self.acc = acc
+        self.signature = _account_signature(acc)
+        self.notify = notify
+        self.stop = threading.Event()
+
+    def run(self):
+        email = self.acc.get("email")
+        failures = 0
+        while not self.stop.is_set():
+            fetcher = EmailFetcher()
+            try:
+                fetcher.connect_imap(self.acc)
+                mode = "IDLE" if fetcher.supports_idle() else f"NOOP svakih {NOOP_POLL_SECONDS}s"
+                log.info(f"📡 Push za {email} aktivan ({mode}).")
+                failures = 0
+                while not self.stop.is_set():
+                    # wait_for_new_mail obnavlja IDLE najkasnije nakon IDLE_RENEW_SECONDS
+                    if fetcher.wait_for_new_mail(IDLE_RENEW_SECONDS, self.stop):
+                        log.info(f"📬 [{email}] Server javlja novu poštu.")
+                        self.notify(self.acc["id"])
+            except Exception as e:
+                delay = self.RETRY_SECONDS[min(failures, len(self.RETRY_SECONDS) - 1)]
+                failures += 1
+                log.warning(f"⚠️ Push za {email} prekinut ({e}) — novi pokušaj za {delay}s.")
+                self.stop.wait(delay)
+            finally:
+                fetcher.close()
+
+
+class _PushWatchers:
+    """Push niti za sve naloge; prikuplja naloge sa novom poštom za daemon petlju."""
+
+    def __init__(self, wake: threading.Event):
+        self.wake = wake
+        self._watchers: Dict[int, _PushWatcher] = {}
+        self._changed: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def _notify(self, account_id: int):
+        with self._lock:
+            self._changed.add(account_id)
+        self.wake.set()
+
+    def take_changed(self) -> Set[int]:
+        with self._lock:
+            changed, self._changed = self._changed, set()
+        return changed
+
+    def sync(self, accounts: List[dict]):
+        """Pokreće niti za nove (ili izmijenjene) naloge i zaustavlja niti obrisanih naloga."""
+        current = {acc["id"]: acc for acc in accounts}
+        for account_id, watcher in list(self._watchers.items()):
+            acc = current.get(account_id)
+            if acc is None or _account_signature(acc) != watcher.signature or not watcher.is_alive():
+                watcher.stop.set()
+                del self._watchers[account_id]
+        for account_id, acc in current.items():
+            if account_id not in self._watchers:
+                watcher = _PushWatcher(acc, self._notify)
+                self._watchers[account_id] = watcher
+                watcher.start()
+
+    def close(self):
+        for watcher in self._watchers.values():
+            watcher.stop.set()
+        for watcher in self._watchers.values():
+            watcher.join(timeout=5)
+        self._watchers.clear()
+
+
+def _check_license(lic: LicenseManager) -> bool:
     try:
         lic.ensure_valid_or_exit()
     except SystemExit:
         log.error("❌ Licenca nije validna. Worker ne može raditi.")
-        return
+        return False
     log.info("✅ Licenca je validna.")
+    return True
+
 
+def _run_cycle(db: Database, settings: Dict[str, str], resources: _WorkerResources,
+               only_accounts: Optional[Set[int]] = None):
+    """
+    Jedno pokretanje sinhronizacije (sesija) sa datim resursima.
+
+    Args:
+        only_accounts: Ako je zadato, obrađuju se samo ovi nalozi (push obavještenje)
+    """
     # === Kreiraj sesiju sinhronizacije ===
     session = SyncSession(db)
     session.start()
 
     try:
-        settings = cfg.get_settings()
-        lookback_days = int(settings.get("lookback_days", 7))
-        unread_only = settings.get("read_mode", "unread") == "unread"
-        mark_as_read = settings.get("mark_as_read", "1") == "1"
-
-        since = datetime.now() - timedelta(days=lookback_days)
         accounts = db.list_mail_accounts()
         clients = db.list_clients()
-
-        total_downloaded = 0
-        total_skipped = 0
-        total_errors = 0
+        resources.prune(acc["id"] for acc in accounts)
+        if only_accounts is not None:
+            accounts = [acc for acc in accounts if acc["id"] in only_accounts]
+            log.info(f"⚡ Nova pošta na {len(accounts)} naloga — pokrećem sinhronizaciju.")
 
         if not accounts:
             log.warning("⚠️ Nema konfiguriranih email naloga.")
@@ -65,123 +835,27 @@ def run_worker():
             session.end("error")
             return
 
-        fetcher = EmailFetcher()
-        parser = PDFParser()
-
-        for acc in accounts:
-            email = acc.get("email")
-            log.info(f"🔍 Provjeravam nalog {email} — broj klijenata: {len(clients)}")
-
-            try:
-                fetcher.connect_imap(acc)
-                log.info(f"✅ Povezan na {email}")
-            except Exception as e:
-                log.error(f"❌ Neuspjelo povezivanje za {email}: {e}")
-                total_errors += 1
-                continue
-
-            for client in clients:
-                try:
-                    sender_list = [s.strip() for s in client["sender_email"].split(",") if s.strip()]
-                    if not sender_list:
-                        log.warning(f"⚠️ Klijent '{client['name']}' nema definisan sender_email.")
-                        continue
+        plan = _build_sender_plan(clients)
+        router = AccountRouter(clients)
+        log.info(f"📋 Plan: {len(plan)} jedinstvenih pošiljalaca za {len(clients)} klijenata, "
+                 f"{len(router)} računa u indeksu")
 
-                    for sender in sender_list:
-                        log.info(f"   📧 Tražim poruke od: {sender}")
-                        msgs = fetcher.search_messages(since, sender, unread_only)
-                        log.info(f"   📨 Pronađeno {len(msgs)} poruka od {sender} u zadnjih {lookback_days} dana")
-
-                        if not msgs:
-                            continue
-
-                        for msg in msgs:
-                            subj = fetcher.get_subject(msg)
-                            sender_addr = msg.get("From", "")
-                            attachments = fetcher.extract_attachments(msg)
-                            if not attachments:
-                                continue
-
-                            for fname, content in attachments:
-                                try:
-                                    # 1️⃣ pročitaj PDF tekst
-                                    text = parser.read_text_from_pdf_bytes(content)
-
-                                    # 2️⃣ izvuci broj računa i broj izvoda
-                                    acct_no, stmt_no = parser.extract_all(sender_addr, subj, fname, text)
-                                    stmt_no = stmt_no or "unknown"
-
-                                    # 3️⃣ provjera duplikata
-                                    cur = db.conn.execute(
-                                        "SELECT 1 FROM logs WHERE client_id=? AND statement_number=? LIMIT 1",
-                                        (client["id"], stmt_no),
-                                    ).fetchone()
-                                    if cur:
-                                        total_skipped += 1
-                                        db.add_log(
-                                            client["id"],
-                                            subj,
-                                            sender_addr,
-                                            stmt_no,
-                                            fname,
-                                            "skipped",
-                                            "Izvod već preuzet.",
-                                            session_id=session.session_id,
-                                        )
-                                        continue
-
-                                    # 4️⃣ spremanje PDF-a
-                                    client_dir = Path(client["folder_path"])
-                                    client_dir.mkdir(parents=True, exist_ok=True)
-
-                                    base_name = stmt_no if stmt_no and stmt_no != "unknown" else Path(fname).stem
-                                    save_name = f"{base_name}.pdf"
-                                    pdf_path = client_dir / save_name
-
-                                    counter = 2
-                                    while pdf_path.exists():
-                                        save_name = f"{base_name}_{counter}.pdf"
-                                        pdf_path = client_dir / save_name
-                                        counter += 1
-
-                                    pdf_path.write_bytes(content)
-
-                                    db.add_log(
-                                        client["id"],
-                                        subj,
-                                        sender_addr,
-                                        stmt_no,
-                                        str(pdf_path),
-                                        "ok",
-                                        f"Izvod {stmt_no} preuzet i sačuvan kao {save_name}.",
-                                        session_id=session.session_id,
-                                    )
-                                    total_downloaded += 1
-
-                                    if mark_as_read:
-                                        fetcher.mark_as_read(msg)
-
-                                except Exception as e:
-                                    total_errors += 1
-                                    err_text = traceback.format_exc()
-                                    log.error(f"❌ Greška u obradi {fname}: {e}\n{err_text}")
-                                    db.add_log(
-                                        client["id"],
-                                        subj,
-                                        sender_addr,
-                                        "?",
-                                        fname,
-                                        "error",
-                                        str(e),
-                                        session_id=session.session_id,
-                                    )
+        ctx = _SyncContext(db, session, settings, plan, router, resources)
+        pipeline = _build_pipeline(ctx, len(accounts))
+        log.info(f"🧵 Obrađujem {len(accounts)} naloga, do {pipeline.stage('fetch').workers} istovremeno")
 
-                except Exception as e:
-                    total_errors += 1
-                    log.error(f"❌ Greška kod klijenta {client['name']}: {e}")
-                    continue
+        try:
+            pipeline.run(accounts)
+        except BaseException:
+            pipeline.abort()
+            raise
+        finally:
+            ctx.close()
+            pipeline.log_stats()
 
-            fetcher.close()
+        total_downloaded = ctx.counts["ok"]
+        total_skipped = ctx.counts["skipped"]
+        total_errors = ctx.counts["error"]
 
         session.end("completed")
         log.info(f"✅ Worker završio. Preuzeto: {total_downloaded}, Preskočeno: {total_skipped}, Greške: {total_errors}")
@@ -191,8 +865,173 @@ def run_worker():
         session.end("error")
 
 
-if __name__ == "__main__":
+def _startup(mode: str, db: Optional[Database] = None):
+    """
+    Zajednička inicijalizacija: log okruženja, baza, podešavanja i licenca.
+
+    Args:
+        db: Baza pozivaoca (npr. GUI); bez nje se otvara nova, koju zatvara pozivalac _startup-a
+    """
+    log.info(f"Pokrećem worker proces{mode}...")
+
+    from wizvod.core.db import DB_PATH
+
+    log.info(f"🧭 Trenutni radni direktorij: {os.getcwd()}")
+    log.info(f"👤 Korisnički HOME: {Path.home()}")
+    log.info(f"📦 Baza: {DB_PATH}")
+
+    # === Inicijalizacija modula ===
+    db = db or Database()
+    cfg = AppConfig(db)
+    lic = LicenseManager(db)
+    _start_token_refresh(db)
+    return db, cfg, lic
+
+
+def _start_token_refresh(db: Database):
+    """
+    Pokreće osvježavanje OAuth2 tokena u pozadini ako postoje OAuth nalozi.
+
+    Istekli tokeni se osvježavaju dok worker provjerava licencu i priprema
+    plan, pa connect_imap najčešće dobija token iz keša bez čekanja.
+    """
+    if not any(EmailAuthManager.oauth_provider(acc["provider"]) for acc in db.list_mail_accounts()):
+        return
+    try:
+        get_token_cache().start()
+    except Exception as e:
+        log.warning(f"⚠️ Osvježavanje tokena u pozadini nije pokrenuto: {e}")
+
+
+def run_worker(db: Optional[Database] = None):
+    """
+    Glavna funkcija workera — automatsko preuzimanje izvoda sa podrškom za sesije.
+
+    Args:
+        db: Otvorena baza pozivaoca (GUI) — dijeli se, pa proces ima jednu nit
+            za upis; bez nje worker otvara svoju bazu i zatvara je na kraju
+    """
+    own_db = db is None
+    db, cfg, lic = _startup("", db)
     try:
+        # Provjera licence
+        if not _check_license(lic):
+            return
+
+        settings = cfg.get_settings()
+        resources = _WorkerResources(settings)
+        try:
+            _run_cycle(db, settings, resources)
+        finally:
+            resources.close()
+    finally:
+        if own_db:
+            db.close()
+
+
+def run_daemon(interval: Optional[int] = None, stop: Optional[threading.Event] = None,
+               push: Optional[bool] = None):
+    """
+    Worker koji radi stalno: sinhronizacija u ciklusima sa pauzom između njih.
+
+    Proces, baza, pravila banaka, ParsePool i prijavljene IMAP konekcije ostaju
+    aktivni između ciklusa, pa ciklus ne plaća pokretanje Pythona, import
+    PyMuPDF-a, provjeru licence ni TLS prijavu na server. Konekcija koja je
+    bila neaktivna duže od `imap_idle_reconnect` sekundi se otvara iznova.
+
+    U push režimu svaki nalog ima IDLE sesiju (NOOP provjeru ako server ne
+    podržava IDLE); nova poruka odmah pokreće sinhronizaciju tog naloga, a
+    puni ciklusi po intervalu ostaju kao rezerva.
+
+    Args:
+        interval: Sekunde između početaka punih ciklusa (podrazumijevano podešavanje
+                  daemon_interval, inače DEFAULT_DAEMON_INTERVAL)
+        stop: Event koji zaustavlja daemon (podrazumijevano SIGINT/SIGTERM)
+        push: IDLE push režim (podrazumijevano podešavanje push_mode)
+    """
+    db, cfg, lic = _startup(" (daemon)")
+    if not _check_license(lic):
+        db.close()
+        return
+    license_checked = time.monotonic()
+
+    stop = stop or threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    if push is None:
+        push = cfg.get_settings().get("push_mode", "0") == "1"
+    wake = threading.Event()
+    watchers = _PushWatchers(wake) if push else None
+
+    resources: Optional[_WorkerResources] = None
+    only: Optional[Set[int]] = None  # None = puni ciklus, inače samo nalozi sa novom poštom
+    next_full = 0.0
+    try:
+        while not stop.is_set():
+            settings = cfg.get_settings()
+            if resources is None or not resources.compatible(settings):
+                if resources is not None:
+                    log.info("🔁 Podešavanja IMAP-a/parsiranja su promijenjena — nove konekcije.")
+                    resources.close()
+                resources = _WorkerResources(settings, persistent=True)
+
+            if time.monotonic() - license_checked > LICENSE_RECHECK_SECONDS:
+                if not _check_license(lic):
+                    return
+                license_checked = time.monotonic()
+
+            if watchers is not None:
+                watchers.sync(db.list_mail_accounts())
+
+            started = time.monotonic()
+            _run_cycle(db, settings, resources, only_accounts=only)
+            if only is None:
+                pause = interval or int(settings.get("daemon_interval", DEFAULT_DAEMON_INTERVAL))
+                next_full = started + pause
+                log.info(f"💤 Sljedeći ciklus za {max(0.0, next_full - time.monotonic()):.0f}s")
+
+            # Čekanje do sljedećeg punog ciklusa ili push obavještenja
+            only = None
+            while not stop.is_set():
+                remaining = next_full - time.monotonic()
+                if remaining <= 0:
+                    break
+                if wake.wait(min(remaining, 1.0)):
+                    wake.clear()
+                    only = watchers.take_changed()
+                    if only:
+                        break
+                    only = None
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if watchers is not None:
+            watchers.close()
+        if resources is not None:
+            resources.close()
+        db.close()
+        log.info("🛑 Worker daemon zaustavljen.")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m wizvod.worker", description="Wizvod worker")
+    ap.add_argument("--run", action="store_true", help="jedno pokretanje (podrazumijevano)")
+    ap.add_argument("--daemon", action="store_true", help="radi stalno, sa pauzom između ciklusa")
+    ap.add_argument("--interval", type=int, help="sekunde između ciklusa u daemon režimu")
+    ap.add_argument("--push", action="store_true",
+                    help="daemon sa IMAP IDLE obavještenjima (nova pošta se preuzima odmah)")
+    args = ap.parse_args(argv)
+
+    if args.daemon or args.push:
+        run_daemon(interval=args.interval, push=True if args.push else None)
+    else:
         run_worker()
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    try:
+        main()
     except Exception as e:
         log.error(f"❌ Neočekivana greška pri pokretanju workera: {e}\n{traceback.format_exc()}")